@@ -8,6 +8,7 @@ import secrets
 import string
 import subprocess
 import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 import smtplib
@@ -38,7 +39,6 @@ import torch
 # Configurações do app
 # =============================================================================
 app = Flask(__name__)
-execution_lock = threading.Lock()
 
 
 
@@ -298,20 +298,47 @@ import tempfile
 from flask import request, jsonify
 from flask_login import login_required
 
-# Lock para evitar que múltiplas execuções ocorram simultaneamente
-execution_lock = threading.Lock()
+# Limite de execuções simultâneas por worker (cada execução é isolada;
+# o semáforo só evita sobrecarga, não serializa os usuários).
+MAX_EXECUCOES_SIMULTANEAS = int(os.getenv("MAX_EXECUCOES_SIMULTANEAS", "8"))
+execucoes_simultaneas = threading.BoundedSemaphore(MAX_EXECUCOES_SIMULTANEAS)
+
+# Pool de processos pré-aquecidos para execuções Python e do exec_code
+# (sobe sob demanda; o pré-aquecimento fica no `__main__`, porque o forkserver
+# reimporta este arquivo como `__mp_main__` e não pode abrir processos ali)
+from pool_execucao import pool_padrao, TempoExcedido
 
 # --- IMPORTAÇÃO DO INTERPRETADOR ---
 # O caminho para o módulo compiler.py é 'lineax.compiler' porque a pasta 'lineax'
 # precisa ser um pacote Python.
 try:
-    from lineax.compiler import executar_codigo_lineax
+    from lineax.compiler import (
+        executar_codigo_lineax, executar_codigo_lineax_stream, perfilar_codigo_lineax,
+        executar_codigo_lineax_incremental, diagnosticar_codigo_lineax, executar_repl_lineax,
+        cache_compilacao,
+    )
+    # Artefatos .lxc executam código ao serem carregados: nunca dentro das pastas dos usuários.
+    if cache_compilacao.diretorio:
+        _pasta_usuarios = os.path.realpath(app.config["UPLOAD_FOLDER"])
+        if os.path.commonpath([_pasta_usuarios, os.path.realpath(cache_compilacao.diretorio)]) == _pasta_usuarios:
+            print(f"Aviso: LINEX_CACHE_DIR fica dentro de '{_pasta_usuarios}'; artefatos em disco desligados.")
+            cache_compilacao.diretorio = None
 except ImportError as e:
     # Se o interpretador não for encontrado, defina uma função de placeholder
     # para evitar erros, mas com uma mensagem clara para o desenvolvedor.
     print(f"Aviso: O módulo do interpretador Lineax (lineax.compiler) não foi encontrado. Erro: {e}")
-    def executar_codigo_lineax(code):
+    def executar_codigo_lineax(code, input_data=None, **kwargs):
         return [f"Erro: O módulo do interpretador Lineax (lineax.compiler) não foi encontrado."]
+    def executar_codigo_lineax_stream(code, input_data=None, **kwargs):
+        yield from executar_codigo_lineax(code)
+    def perfilar_codigo_lineax(code, input_data=None, **kwargs):
+        return executar_codigo_lineax(code), None
+    def executar_codigo_lineax_incremental(chave, code, input_data=None, **kwargs):
+        return executar_codigo_lineax(code), 0
+    def diagnosticar_codigo_lineax(chave, code):
+        return []
+    def executar_repl_lineax(chave, code, input_data=None, **kwargs):
+        return executar_codigo_lineax(code)
 @app.route("/documentacao")
 def documenacao():
     return render_template("documentacao.html")
@@ -324,6 +351,26 @@ import os
 import threading
 
 
+def _diretorio_arquivos_linex():
+    """Pasta user/<id>/ do usuário logado para os `save` da Linex (None se anônimo)."""
+    if not current_user.is_authenticated:
+        return None
+    return _user_dir()
+
+
+def _chave_documento_linex(documento):
+    """Identifica o documento da IDE (reexecução incremental e diagnósticos).
+
+    Anônimos ganham um id aleatório guardado na sessão do Flask: pelo IP,
+    todos atrás do mesmo proxy/NAT dividiriam o mesmo estado.
+    """
+    if current_user.is_authenticated:
+        dono = f"u{current_user.id}"
+    else:
+        dono = "anon" + session.setdefault("linex_navegador", secrets.token_urlsafe(16))
+    return f"{dono}:{documento}"
+
+
 @app.route('/run-code', methods=['POST'])
 def run_code():
     """
@@ -331,11 +378,12 @@ def run_code():
     Suporta Lineax, Python, e orienta para linguagens de front-end.
     """
     # Lógica de controle de concorrência.
-    # Evita que múltiplas requisições de execução sobrecarreguem o servidor.
-    if not execution_lock.acquire(blocking=False):
-        return jsonify({"output": "Aguarde, outra execução está em andamento."}), 429
+    # Até MAX_EXECUCOES_SIMULTANEAS execuções rodam em paralelo; acima disso
+    # a requisição é recusada em vez de ficar presa esperando.
+    if not execucoes_simultaneas.acquire(blocking=False):
+        return jsonify({"output": "Aguarde, o servidor está com muitas execuções em andamento."}), 429
 
-    # É uma boa prática liberar o lock no bloco `finally` para garantir
+    # É uma boa prática liberar o semáforo no bloco `finally` para garantir
     # que seja sempre liberado, mesmo em caso de erro.
     try:
         data = request.get_json()
@@ -345,7 +393,8 @@ def run_code():
         code = data.get('code', '')
         language = data.get('language', 'plaintext').lower()
 
-        if not code or not language:
+        # `reiniciar` (terminal) pode vir sem código: só esvazia a sessão.
+        if (not code and not data.get('reiniciar')) or not language:
             return jsonify({'output': 'Erro: Código ou linguagem não fornecidos.'}), 400
 
         # --- LÓGICA DE EXECUÇÃO: LINHA LINEAX (LX) ---
@@ -356,7 +405,34 @@ def run_code():
                 # Certifique-se de que a função lida com segurança
                 # o código, sem acesso ao sistema de arquivos, etc.
                 # A saída é um array, portanto, juntamos as linhas.
-                output = executar_codigo_lineax(code)
+                # `silencioso` omite os avisos de status (variável criada, loop...).
+                silencioso = bool(data.get('silencioso', False))
+                # `save`/`load` usam arquivos em memória; os salvos vão para user/<id>/ no fim.
+                diretorio = _diretorio_arquivos_linex()
+                if data.get('perfil'):
+                    # Perfil por linha (execuções, tempo total/próprio) e por função.
+                    output, perfil = perfilar_codigo_lineax(code, silencioso=silencioso, diretorio_arquivos=diretorio)
+                    return jsonify({'output': '\n'.join(output), 'perfil': perfil})
+                if data.get('repl'):
+                    # Terminal da IDE: só o comando novo executa, sobre as
+                    # variáveis e funções que a sessão do usuário já tem.
+                    if not current_user.is_authenticated:
+                        return jsonify({'output': 'Faça login para usar o terminal interativo.'}), 401
+                    output = executar_repl_lineax(
+                        _chave_documento_linex('repl'), code, silencioso=silencioso,
+                        diretorio_arquivos=diretorio, reiniciar=bool(data.get('reiniciar')),
+                    )
+                    return jsonify({'output': '\n'.join(output)})
+                if data.get('incremental') and current_user.is_authenticated:
+                    # A IDE reexecuta só a partir do primeiro comando alterado
+                    # desde a última execução deste documento (anônimos
+                    # executam tudo de novo: o estado só fica para quem tem login).
+                    chave = _chave_documento_linex(data.get('documento', ''))
+                    output, reaproveitados = executar_codigo_lineax_incremental(
+                        chave, code, silencioso=silencioso, diretorio_arquivos=diretorio
+                    )
+                    return jsonify({'output': '\n'.join(output), 'comandos_reaproveitados': reaproveitados})
+                output = executar_codigo_lineax(code, silencioso=silencioso, diretorio_arquivos=diretorio)
                 return jsonify({'output': '\n'.join(output)})
             except Exception as e:
                 # Erros específicos do interpretador Lineax são tratados aqui.
@@ -364,40 +440,21 @@ def run_code():
 
         # --- LÓGICA DE EXECUÇÃO: LINGUAGEM PYTHON ---
         elif language == 'python':
-            temp_filename = None
             try:
-                with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.py', encoding='utf-8') as temp_file:
-                    temp_file.write(code)
-                    temp_filename = temp_file.name
-                
-                # Executa o código Python em um subprocesso.
-                # É uma boa prática usar `sys.executable` para garantir o
-                # uso do mesmo interpretador Python.
-                result = subprocess.run(
-                    [sys.executable, temp_filename],
-                    capture_output=True,
-                    text=True,
-                    timeout=15,
-                    check=True
-                )
-                return jsonify({'output': result.stdout})
-
-            except subprocess.CalledProcessError as e:
-                # Captura erros de execução do código Python (ex: SyntaxError, etc.)
-                return jsonify({'output': f'Erro de execução:\n{e.stderr}'}), 400
-            except subprocess.TimeoutExpired:
-                # Captura timeout de execução.
-                return jsonify({'output': 'Erro: Tempo de execução excedido (15 segundos).'}), 400
-            except FileNotFoundError:
-                # Caso o interpretador Python não seja encontrado.
-                return jsonify({'output': 'Erro: O interpretador Python não foi encontrado.'}), 500
+                # Executa o código Python em um worker do pool pré-aquecido,
+                # com limites de CPU/memória aplicados dentro do worker.
+                result = pool_padrao().executar_python(code)
+                if not result['ok']:
+                    # Captura erros de execução do código Python (ex: SyntaxError, etc.)
+                    return jsonify({'output': f'Erro de execução:\n{result["stderr"]}'}), 400
+                return jsonify({'output': result['stdout']})
+
+            except TempoExcedido as e:
+                # Captura timeout de execução (tempo de parede ou rlimit de CPU).
+                return jsonify({'output': f'Erro: {e}'}), 400
             except Exception as e:
-                # Erros inesperados no processo de criação/execução do arquivo.
+                # Erros inesperados na comunicação com o worker.
                 return jsonify({'output': f'Erro inesperado:\n{str(e)}'}), 500
-            finally:
-                # Garante que o arquivo temporário é sempre removido.
-                if temp_filename and os.path.exists(temp_filename):
-                    os.remove(temp_filename)
 
         # --- ORIENTAÇÃO PARA LINGUAGENS DE FRONT-END ---
         elif language in ['html', 'css', 'javascript']:
@@ -412,8 +469,152 @@ def run_code():
         # Tratamento genérico para erros inesperados no bloco `try` principal.
         return jsonify({'output': f'Erro interno do servidor: {str(e)}'}), 500
     finally:
-        # Garante que o lock é sempre liberado.
-        execution_lock.release()
+        # Garante que a vaga do semáforo é sempre liberada.
+        execucoes_simultaneas.release()
+# --- ROTAS DE EXECUÇÃO COM SAÍDA EM STREAMING (SSE) ---
+from flask import Response, stream_with_context
+
+# Limite de bytes de saída enviados por execução em streaming
+MAX_BYTES_STREAM = int(os.getenv("MAX_BYTES_STREAM", str(1024 * 1024)))
+
+
+def _evento_sse(evento, dados):
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+def _resposta_sse(gerador):
+    """Resposta text/event-stream; o gerador só avança quando o cliente lê."""
+    resposta = Response(stream_with_context(gerador), mimetype="text/event-stream")
+    resposta.headers["Cache-Control"] = "no-cache"
+    resposta.headers["X-Accel-Buffering"] = "no"  # evita buffer no nginx
+    return resposta
+
+
+def _sse_linex(code, input_data=None, silencioso=False, diretorio_arquivos=None):
+    linhas = executar_codigo_lineax_stream(code, input_data, max_bytes=MAX_BYTES_STREAM, silencioso=silencioso,
+                                           diretorio_arquivos=diretorio_arquivos)
+    for linha in linhas:
+        yield _evento_sse("saida", {"canal": "linex", "texto": linha})
+    yield _evento_sse("fim", {"ok": True})
+
+
+def _sse_pool(eventos):
+    for evento, canal, valor in eventos:
+        if evento == "saida":
+            yield _evento_sse("saida", {"canal": canal, "texto": valor})
+        elif evento == "erro":
+            yield _evento_sse("erro", {"texto": valor})
+        else:
+            yield _evento_sse("fim", {"ok": valor})
+
+
+@app.route('/run-code/stream', methods=['POST'])
+def run_code_stream():
+    """
+    Igual ao /run-code, mas envia a saída aos poucos via Server-Sent Events.
+    Eventos: `saida` ({canal, texto}), `erro` ({texto}) e `fim` ({ok}).
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({'output': 'Erro: Dados de entrada não são um JSON válido.'}), 400
+
+    code = data.get('code', '')
+    language = data.get('language', 'plaintext').lower()
+    if not code or not language:
+        return jsonify({'output': 'Erro: Código ou linguagem não fornecidos.'}), 400
+
+    if language in ['lineax', 'lx', 'sq']:
+        eventos = _sse_linex(code, silencioso=bool(data.get('silencioso', False)),
+                             diretorio_arquivos=_diretorio_arquivos_linex())
+    elif language == 'python':
+        eventos = _sse_pool(pool_padrao().executar_python_stream(code, max_bytes=MAX_BYTES_STREAM))
+    else:
+        return jsonify({'output': f'Linguagem "{language}" não suportada para execução em streaming.'}), 400
+
+    if not execucoes_simultaneas.acquire(blocking=False):
+        return jsonify({"output": "Aguarde, o servidor está com muitas execuções em andamento."}), 429
+
+    def gerar():
+        # A vaga do semáforo fica presa enquanto o stream estiver aberto.
+        try:
+            yield from eventos
+        finally:
+            eventos.close()
+            execucoes_simultaneas.release()
+
+    return _resposta_sse(gerar())
+
+
+# --- ROTA DE EXECUÇÃO EM LOTE (CORREÇÃO DE TURMAS) ---
+# Máximo de programas Linex aceitos em uma única requisição de lote
+MAX_PROGRAMAS_LOTE = int(os.getenv("MAX_PROGRAMAS_LOTE", "500"))
+# Cargos que podem corrigir turmas (um lote ocupa vários workers por minutos)
+CARGOS_LOTE = os.getenv("CARGOS_LOTE", "admin,admin_supremer,programador_central").split(",")
+
+
+@app.route('/run-code/batch', methods=['POST'])
+@login_required
+def run_code_batch():
+    """
+    Executa vários programas Linex de uma vez, distribuídos entre os workers do pool.
+    Corpo: {"programas": [{"code": "...", "input": [...]}, ...], "silencioso": false}.
+    Resposta: {"resultados": [{"output": "..."}, ...]}, na mesma ordem dos programas.
+    """
+    if current_user.cargo not in CARGOS_LOTE:
+        return jsonify({'output': f'Acesso negado. Seu cargo "{current_user.cargo}" não pode executar lotes.'}), 403
+
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({'output': 'Erro: Dados de entrada não são um JSON válido.'}), 400
+
+    programas = data.get('programas')
+    if not isinstance(programas, list) or not programas:
+        return jsonify({'output': 'Erro: Envie uma lista não vazia em "programas".'}), 400
+    if len(programas) > MAX_PROGRAMAS_LOTE:
+        return jsonify({'output': f'Erro: No máximo {MAX_PROGRAMAS_LOTE} programas por lote.'}), 400
+
+    pares = []
+    for posicao, programa in enumerate(programas):
+        if not isinstance(programa, dict) or not isinstance(programa.get('code'), str):
+            return jsonify({'output': f'Erro: O programa {posicao} não tem o campo "code".'}), 400
+        entrada = programa.get('input') or None
+        if entrada is not None and not isinstance(entrada, list):
+            return jsonify({'output': f'Erro: O campo "input" do programa {posicao} deve ser uma lista.'}), 400
+        pares.append((programa['code'], entrada))
+
+    # O lote inteiro ocupa uma única vaga; o paralelismo vem dos workers do pool.
+    if not execucoes_simultaneas.acquire(blocking=False):
+        return jsonify({"output": "Aguarde, o servidor está com muitas execuções em andamento."}), 429
+    try:
+        saidas = pool_padrao().executar_linex_lote(pares, silencioso=bool(data.get('silencioso', False)))
+        return jsonify({'resultados': [{'output': '\n'.join(saida)} for saida in saidas]})
+    except Exception as e:
+        return jsonify({'output': f'Erro interno do servidor: {str(e)}'}), 500
+    finally:
+        execucoes_simultaneas.release()
+
+
+# --- ROTA DE DIAGNÓSTICOS DA IDE (ERROS ENQUANTO DIGITA) ---
+@app.route('/linex/diagnosticos', methods=['POST'])
+def linex_diagnosticos():
+    """
+    Analisa o código Linex sem executar: erros de sintaxe, blocos sem 'end'
+    e variáveis/funções não definidas.
+    Corpo: {"code": "...", "documento": "arquivo.lx"}.
+    Resposta: {"diagnosticos": [{"linha", "severidade", "mensagem"}, ...], "tempo_ms": 0.4}.
+    """
+    data = request.get_json(silent=True)
+    if data is None or not isinstance(data.get('code'), str):
+        return jsonify({'output': 'Erro: Envie o código no campo "code".'}), 400
+
+    inicio = time.perf_counter()
+    diagnosticos = diagnosticar_codigo_lineax(_chave_documento_linex(data.get('documento', '')), data['code'])
+    return jsonify({
+        'diagnosticos': diagnosticos,
+        'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+    })
+
+
 # --- ROTA PARA ABRIR A IDE ---
 @app.route("/iride", methods=["POST"])
 @login_required
@@ -681,27 +882,24 @@ def run_command():
     # --- Execução de código via lineax ---
     if command_parts[0] == "exec_code":
         codigo = " ".join(command_parts[1:])
-        import subprocess, tempfile, os, sys
 
-        with tempfile.NamedTemporaryFile(mode="w+", suffix="lx", delete=False) as temp:
-            temp.write(codigo)
-            temp_filename = temp.name
+        if data.get("stream"):
+            return _resposta_sse(_sse_pool(
+                pool_padrao().executar_linex_stream(codigo, timeout=5, max_bytes=MAX_BYTES_STREAM)
+            ))
 
         try:
-            result = subprocess.run(
-              [sys.executable, os.path.join("lineax", "compiler.py"), temp_filename],
-              stdout=subprocess.PIPE,
-              stderr=subprocess.PIPE,
-              text=True,
-              timeout=5
-)
-            output = result.stdout.splitlines()
-            error = result.stderr.splitlines()
-        except subprocess.TimeoutExpired:
+            result = pool_padrao().executar_linex(codigo, timeout=5)
+            if result["ok"]:
+                output = result["output"]
+                error = []
+            else:
+                # Ex.: MemoryError no processo do job (só vem `stderr`)
+                output = []
+                error = [f"❌ {result['stderr']}"]
+        except TempoExcedido:
             output = []
             error = ["❌ Execução excedeu o tempo limite!"]
-        finally:
-            os.remove(temp_filename)
 
         return jsonify({"output": output, "error": error})
 
@@ -1795,4 +1993,5 @@ def get_user_machines(user_id):
 
 if __name__ == "__main__":
     os.makedirs("user", exist_ok=True)
+    pool_padrao().iniciar()
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", 5000)), debug=True)
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Benchmark de montagem de texto em loop (`var s = s + "x"`).
+
+Compara a execução com cordas (padrão) e sem cordas, em que cada `+`
+copia a string inteira. Dobrar N deve dobrar o tempo com cordas (linear)
+e quase quadruplicar sem elas (quadrático).
+
+    python -m lineax.benchmarks.concatenacao [N ...]
+"""
+import sys
+import time
+
+from lineax import compiler
+
+PROGRAMA = """linex init project
+var s = ""
+loop {n} begin
+  var s = s + "linex "
+end loop
+calc len(s)
+"""
+
+
+def medir(n, cordas, repeticoes=3):
+    """Melhor tempo (s) de `repeticoes` execuções do programa com N iterações."""
+    anterior = compiler.USAR_CORDAS
+    compiler.USAR_CORDAS = cordas
+    try:
+        programa = compiler.compilar(PROGRAMA.format(n=n))
+    finally:
+        compiler.USAR_CORDAS = anterior
+    melhor = None
+    for _ in range(repeticoes):
+        interpretador = compiler.LinexInterpreter(silencioso=True, max_passos=10 * n + 100, tempo_limite=0)
+        inicio = time.perf_counter()
+        saida = interpretador.executar_programa(programa)
+        gasto = time.perf_counter() - inicio
+        assert saida[-2] == f"🧮 Resultado: {6 * n}", saida[-2:]
+        melhor = gasto if melhor is None else min(melhor, gasto)
+    return melhor
+
+
+def main(argv):
+    tamanhos = [int(a) for a in argv] or [10000, 20000, 40000, 80000]
+    print(f"{'N':>8}  {'cordas (s)':>11}  {'razão':>6}  {'sem cordas (s)':>14}  {'razão':>6}")
+    anteriores = None
+    for n in tamanhos:
+        tempos = (medir(n, True), medir(n, False))
+        razoes = ["" if anteriores is None else f"{t / a:.1f}x" for t, a in zip(tempos, anteriores or tempos)]
+        print(f"{n:>8}  {tempos[0]:>11.3f}  {razoes[0]:>6}  {tempos[1]:>14.3f}  {razoes[1]:>6}")
+        anteriores = tempos
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
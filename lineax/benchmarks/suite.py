@@ -0,0 +1,183 @@
+"""
+Suíte de benchmarks do interpretador Linex.
+
+Roda os programas de `lineax/benchmarks/programas/` (loop com aritmética,
+montagem de texto, ifs aninhados, cadeias de `call`, propriedades de JSON,
+vetores) e os exemplos reais em `user/*/*.lx`. Para cada programa mede:
+
+- ops/s: comandos Linex executados por segundo (os passos do orçamento);
+- p50/p99: tempo de uma execução, em ms (o programa é compilado uma vez);
+- pico de memória alocada durante uma execução (tracemalloc), em KiB.
+
+    python -m lineax.benchmarks.suite [--repeticoes 20] [--motor vm] [--saida atual.json]
+    python -m lineax.benchmarks.suite --saida novo.json --comparar base.json [--limite 0.10]
+
+Com `--comparar`, termina com código 1 se algum programa ficou mais lento
+(p50) ou passou a alocar mais memória do que `limite` em relação à base.
+Exemplos de `user/` que não compilam (outras linguagens, arquivos vazios)
+são listados e ignorados.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from lineax import compiler
+
+_PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PASTA_PROGRAMAS = os.path.join(_PASTA_BENCHMARKS, "programas")
+PASTA_USUARIOS = os.path.join(os.path.dirname(os.path.dirname(_PASTA_BENCHMARKS)), "user")
+_FIM = "\n**--- Fim da Execução ---**"
+# Diferenças absolutas abaixo disto não contam como regressão (ruído de medição)
+_FOLGA = {"p50_ms": 0.5, "memoria_pico_kib": 64.0}
+
+
+def coletar_programas(pasta_programas=PASTA_PROGRAMAS, pasta_usuarios=PASTA_USUARIOS):
+    """Lista de (nome, caminho): o corpus primeiro, depois `user/<id>/*.lx`."""
+    programas = []
+    for arquivo in sorted(os.listdir(pasta_programas)):
+        if arquivo.endswith(".lx"):
+            programas.append((arquivo[:-3], os.path.join(pasta_programas, arquivo)))
+    if os.path.isdir(pasta_usuarios):
+        for usuario in sorted(os.listdir(pasta_usuarios)):
+            pasta = os.path.join(pasta_usuarios, usuario)
+            if not os.path.isdir(pasta):
+                continue
+            for arquivo in sorted(os.listdir(pasta)):
+                if arquivo.endswith(".lx"):
+                    programas.append((f"user/{usuario}/{arquivo[:-3]}", os.path.join(pasta, arquivo)))
+    return programas
+
+
+def _percentil(valores, p):
+    """Percentil pelo posto mais próximo (`valores` já ordenados)."""
+    indice = max(0, min(len(valores) - 1, round(p / 100 * len(valores) + 0.5) - 1))
+    return valores[indice]
+
+
+def _executar(programa, motor):
+    interpretador = compiler.LinexInterpreter(motor=motor, silencioso=True, tempo_limite=0)
+    saida = interpretador.executar_programa(programa)
+    if not saida or saida[-1] != _FIM:
+        raise RuntimeError(saida[-1] if saida else "sem saída")
+    return interpretador.passos
+
+
+def medir(codigo, repeticoes=20, motor=None):
+    """Mede um programa; devolve o dicionário de métricas gravado no JSON."""
+    inicio = time.perf_counter()
+    programa = compiler.compilar(codigo)
+    compilacao = time.perf_counter() - inicio
+
+    passos = _executar(programa, motor)  # aquecimento (cache de expressões, bytecode)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        _executar(programa, motor)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+
+    # Memória numa execução à parte: o tracemalloc deixa tudo mais lento
+    tracemalloc.start()
+    try:
+        _executar(programa, motor)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    media = sum(tempos) / len(tempos)
+    return {
+        "passos": passos,
+        "repeticoes": repeticoes,
+        "compilacao_ms": compilacao * 1000,
+        "media_ms": media * 1000,
+        "p50_ms": _percentil(tempos, 50) * 1000,
+        "p99_ms": _percentil(tempos, 99) * 1000,
+        "ops_por_s": passos / media if media else 0.0,
+        "memoria_pico_kib": pico / 1024,
+    }
+
+
+def executar_suite(programas, repeticoes=20, motor=None, filtro=None):
+    """Mede todos os programas; devolve (resultados por nome, ignorados por nome)."""
+    resultados = {}
+    ignorados = {}
+    for nome, caminho in programas:
+        if filtro and filtro not in nome:
+            continue
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                codigo = f.read()
+            resultados[nome] = medir(codigo, repeticoes, motor)
+        except (SyntaxError, RuntimeError, UnicodeDecodeError) as e:
+            ignorados[nome] = str(e).strip()
+    return resultados, ignorados
+
+
+def comparar(base, atual, limite=0.10):
+    """Linhas (nome, métrica, antes, depois, razão, regrediu) dos programas em comum."""
+    linhas = []
+    for nome in sorted(set(base) & set(atual)):
+        for metrica in ("p50_ms", "memoria_pico_kib"):
+            antes, depois = base[nome][metrica], atual[nome][metrica]
+            razao = depois / antes if antes else 1.0
+            regrediu = razao > 1 + limite and depois - antes > _FOLGA[metrica]
+            linhas.append((nome, metrica, antes, depois, razao, regrediu))
+    return linhas
+
+
+def _imprimir(resultados, ignorados):
+    print(f"{'programa':<28} {'ops/s':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'pico (KiB)':>11}")
+    for nome, r in resultados.items():
+        print(f"{nome:<28} {r['ops_por_s']:>11,.0f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{r['memoria_pico_kib']:>11.1f}")
+    for nome, motivo in ignorados.items():
+        print(f"{nome:<28} ignorado: {motivo.splitlines()[0]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lineax.benchmarks.suite",
+                                     description="Benchmarks do interpretador Linex.")
+    parser.add_argument("--repeticoes", type=int, default=20, help="execuções medidas por programa")
+    parser.add_argument("--motor", choices=compiler.MOTORES, default=None)
+    parser.add_argument("--filtro", help="só os programas cujo nome contém este texto")
+    parser.add_argument("--saida", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior (base)")
+    parser.add_argument("--limite", type=float, default=0.10,
+                        help="piora máxima aceita em relação à base (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    resultados, ignorados = executar_suite(coletar_programas(), args.repeticoes, args.motor, args.filtro)
+    _imprimir(resultados, ignorados)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "motor": args.motor or compiler.MOTOR_PADRAO,
+                "numpy": compiler.USAR_NUMPY,
+                "programas": resultados,
+                "ignorados": ignorados,
+            }, f, indent=2, ensure_ascii=False)
+
+    if not args.comparar:
+        return 0
+    with open(args.comparar, encoding="utf-8") as f:
+        base = json.load(f)["programas"]
+    regressoes = 0
+    print(f"\n{'programa':<28} {'métrica':<17} {'base':>10} {'atual':>10} {'razão':>7}")
+    for nome, metrica, antes, depois, razao, regrediu in comparar(base, resultados, args.limite):
+        regressoes += regrediu
+        marca = "  ❌ regressão" if regrediu else ""
+        print(f"{nome:<28} {metrica:<17} {antes:>10.2f} {depois:>10.2f} {razao:>6.2f}x{marca}")
+    print(f"\n{regressoes} regressão(ões) acima de {args.limite:.0%}.")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
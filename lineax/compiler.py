@@ -1,348 +1,3844 @@
-import os
-import threading
-import json
-import re
-import requests  # Importação para o novo comando 'http'
-import time
-import math
-import random
-
-# Lock para evitar que múltiplos pedidos de execução rodem ao mesmo tempo
-execution_lock = threading.Lock()
-
-class LinexInterpreter:
-    def __init__(self):
-        self.variaveis = {}
-        self.funcoes = {}
-        self.entrada_simulada = []
-        self.entrada_index = 0
-        self.output = []
-        self.safe_builtins = {
-            'len': len,
-            'str': str,
-            'int': int,
-            'float': float,
-            'bool': bool,
-            'math': math,
-            'random': random
-        }
-
-    def _get_valor(self, expressao):
-        """Obtém o valor de uma expressão ou variável."""
-        expressao = expressao.strip()
-        
-        # Se for uma string literal
-        if expressao.startswith('"') and expressao.endswith('"'):
-            return expressao.strip('"')
-
-        # Se for um número
-        try:
-            if '.' in expressao:
-                return float(expressao)
-            return int(expressao)
-        except ValueError:
-            pass
-
-        # Se for uma variável
-        if expressao in self.variaveis:
-            return self.variaveis[expressao]
-        
-        # Se for acesso a propriedade de objeto JSON
-        match_prop = re.match(r"(\w+)\.(.+)", expressao)
-        if match_prop:
-            var_json, prop = match_prop.groups()
-            if var_json in self.variaveis and isinstance(self.variaveis[var_json], dict):
-                partes = prop.split('.')
-                valor = self.variaveis[var_json]
-                try:
-                    for p in partes:
-                        if isinstance(valor, dict):
-                            valor = valor.get(p)
-                        else:
-                            valor = None
-                            break
-                    if valor is not None:
-                        return valor
-                except (TypeError, KeyError):
-                    pass
-        
-        return None
-
-    def _avaliar_expressao(self, expressao):
-        """Avalia uma expressão com suporte a concatenação, variáveis e funções."""
-        expressao = expressao.strip()
-        
-        # Trata concatenação de strings
-        if '+' in expressao:
-            partes = expressao.split('+')
-            conteudo = ""
-            for p in partes:
-                valor = self._get_valor(p.strip())
-                if valor is not None:
-                    conteudo += str(valor)
-            return conteudo
-        
-        # Tenta avaliar uma expressão matemática complexa
-        try:
-            local_vars = {k: v for k, v in self.variaveis.items() if not isinstance(v, (dict, list))}
-            local_vars.update(self.safe_builtins)
-            return eval(expressao, {"__builtins__": self.safe_builtins}, local_vars)
-        except (NameError, TypeError, SyntaxError):
-            pass
-            
-        # Se não for uma expressão complexa, tenta avaliar como um valor simples
-        valor = self._get_valor(expressao)
-        if valor is not None:
-            return valor
-
-        raise ValueError(f"Expressão inválida ou variável não definida: '{expressao}'")
-
-    def _avaliar_condicao(self, expressao):
-        """Avalia uma condição de forma segura."""
-        expressao = expressao.replace("and", " and ").replace("or", " or ")
-        match = re.match(r"(.+?)\s*(==|!=|>|<|>=|<=)\s*(.+)", expressao.strip())
-        if not match:
-            return bool(self._avaliar_expressao(expressao))
-        
-        left, op, right = match.groups()
-        valor_left = self._avaliar_expressao(left.strip())
-        valor_right = self._avaliar_expressao(right.strip())
-
-        if op == "==": return valor_left == valor_right
-        if op == "!=": return valor_left != valor_right
-        if op == ">": return valor_left > valor_right
-        if op == "<": return valor_left < valor_right
-        if op == ">=": return valor_left >= valor_right
-        if op == "<=": return valor_left <= valor_right
-        return False
-        
-    def _executar_comando(self, comando, linha_num):
-        """Executa um único comando da linguagem Linex."""
-        partes = comando.strip().split(maxsplit=1)
-        if not partes: return
-        comando_principal = partes[0].lower()
-        argumentos = partes[1] if len(partes) > 1 else ""
-
-        if comando_principal == "linex":
-            sub_comando = argumentos.split(maxsplit=1)
-            if sub_comando[0].lower() == "print":
-                if len(sub_comando) < 2:
-                    raise SyntaxError("Uso incorreto. Formato: linex print <expressao>")
-                conteudo = self._avaliar_expressao(sub_comando[1])
-                self.output.append(f"📢 {conteudo}")
-            else:
-                raise SyntaxError(f"Sub-comando '{sub_comando[0]}' desconhecido para 'linex'.")
-        
-        elif comando_principal == "var":
-            match = re.match(r"(\w+)\s*=\s*(.*)", argumentos)
-            if not match: 
-                raise SyntaxError("Uso incorreto. Formato: var nome = valor")
-            nome_var, valor_expr = match.groups()
-            
-            if valor_expr.strip().lower().startswith("calc"):
-                expressao_calc = valor_expr.strip().split(maxsplit=1)[1]
-                valor = self._avaliar_expressao(expressao_calc)
-            else:
-                valor = self._avaliar_expressao(valor_expr)
-            
-            self.variaveis[nome_var] = valor
-            self.output.append(f"✅ Variável '{nome_var}' criada/atualizada.")
-            
-        elif comando_principal == "input":
-            if not argumentos:
-                raise SyntaxError("Uso incorreto. Formato: input <nome_da_variavel>")
-            nome_var = argumentos.strip()
-            if self.entrada_index < len(self.entrada_simulada):
-                valor_input = self.entrada_simulada[self.entrada_index]
-                self.entrada_index += 1
-            else:
-                valor_input = "Entrada do usuário"
-            self.variaveis[nome_var] = valor_input
-            self.output.append(f"⌨️ Variável '{nome_var}' recebeu entrada '{valor_input}'")
-
-        elif comando_principal == "calc":
-            if not argumentos:
-                raise SyntaxError("Uso incorreto. Formato: calc <expressao>")
-            resultado = self._avaliar_expressao(argumentos)
-            self.output.append(f"🧮 Resultado: {resultado}")
-            
-        elif comando_principal == "save":
-            match = re.match(r'"(.*)"', argumentos)
-            if not match:
-                raise SyntaxError("Uso incorreto. Formato: save \"nome_do_arquivo\"")
-            filename = match.groups()[0]
-            with open(f"{filename}.json", "w") as f:
-                json.dump(self.variaveis, f, indent=4)
-            self.output.append(f"💾 Variáveis salvas em {filename}.json")
-
-        elif comando_principal == "load":
-            match = re.match(r'"(.*)"', argumentos)
-            if not match:
-                raise SyntaxError("Uso incorreto. Formato: load \"nome_do_arquivo\"")
-            filename = match.groups()[0]
-            if not os.path.exists(f"{filename}.json"):
-                raise FileNotFoundError(f"Arquivo '{filename}.json' não encontrado.")
-            with open(f"{filename}.json", "r") as f:
-                data = json.load(f)
-                self.variaveis.update(data)
-            self.output.append(f"📂 Variáveis carregadas de {filename}.json")
-
-        elif comando_principal == "json":
-            match = re.match(r"load\s+(\w+)\s+to\s+(\w+)", argumentos, re.IGNORECASE)
-            if not match:
-                raise SyntaxError("Uso incorreto. Formato: json load <variavel_string> to <variavel_json>")
-            
-            var_origem, var_destino = match.groups()
-            if var_origem not in self.variaveis:
-                raise NameError(f"Variável de origem '{var_origem}' não definida.")
-            
-            try:
-                json_data = json.loads(self.variaveis[var_origem])
-                self.variaveis[var_destino] = json_data
-                self.output.append(f"📄 Conteúdo da variável '{var_origem}' carregado em formato JSON para '{var_destino}'.")
-            except json.JSONDecodeError:
-                raise ValueError(f"Conteúdo da variável '{var_origem}' não é um JSON válido.")
-
-        elif comando_principal == "http":
-            match = re.match(r"get\s+\"(.*?)\"\s+to\s+(\w+)", argumentos, re.IGNORECASE)
-            if not match:
-                raise SyntaxError("Uso incorreto. Formato: http get \"url\" to <nome_variavel>")
-            url, nome_var = match.groups()
-            try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                self.variaveis[nome_var] = response.text
-                self.output.append(f"🌐 Requisição GET para `{url}` bem-sucedida. Conteúdo salvo em `{nome_var}`.")
-            except requests.exceptions.RequestException as e:
-                self.variaveis[nome_var] = None
-                raise RuntimeError(f"Erro na requisição para `{url}`: {e}")
-
-        elif comando_principal == "call":
-            if not argumentos:
-                raise SyntaxError("Uso incorreto. Formato: call <nome_funcao>")
-            nome_funcao = argumentos.strip()
-            if nome_funcao not in self.funcoes:
-                raise NameError(f"Função '{nome_funcao}' não definida.")
-            self.output.append(f"➡️ Chamando função '{nome_funcao}'...")
-            self._executar_bloco(self.funcoes[nome_funcao], 0)
-            self.output.append(f"⬅️ Finalizado função '{nome_funcao}'.")
-            
-        else:
-            raise SyntaxError(f"Comando desconhecido: '{comando_principal}'")
-
-    def _executar_bloco(self, bloco, linha_inicial):
-        """Executa um bloco de código (código principal, função, if, loop)."""
-        i = 0
-        while i < len(bloco):
-            linha = bloco[i].strip()
-            linha_num_real = linha_inicial + i
-            if not linha or linha.startswith("#"):
-                i += 1
-                continue
-            
-            partes = linha.split(maxsplit=1)
-            comando_principal = partes[0].lower()
-            argumentos = partes[1] if len(partes) > 1 else ""
-
-            if comando_principal == "func":
-                match = re.match(r"(\w+)\s+begin", argumentos, re.IGNORECASE)
-                if not match: raise SyntaxError(f"Uso incorreto. Formato: func <nome_funcao> begin (linha {linha_num_real})")
-                nome_funcao = match.groups()[0]
-                
-                bloco_func = []; j = i + 1
-                while j < len(bloco) and not bloco[j].strip().lower().startswith("end func"):
-                    bloco_func.append(bloco[j])
-                    j += 1
-                if j >= len(bloco): raise SyntaxError(f"Bloco da função '{nome_funcao}' não fechado com 'end func' (linha {linha_num_real})")
-                
-                self.funcoes[nome_funcao] = bloco_func
-                self.output.append(f"📦 Função '{nome_funcao}' definida.")
-                i = j + 1
-            
-            elif comando_principal == "if":
-                match = re.match(r"(.*)\s+begin", argumentos, re.IGNORECASE)
-                if not match: raise SyntaxError(f"Uso incorreto. Formato: if <condicao> begin (linha {linha_num_real})")
-                condicao_expr = match.groups()[0]
-                
-                try:
-                    condicao_eh_verdadeira = self._avaliar_condicao(condicao_expr)
-                except Exception as e:
-                    raise type(e)(f"Erro na condição do 'if': {e} (linha {linha_num_real})")
-                
-                bloco_if = []; j = i + 1
-                bloco_else = []
-                while j < len(bloco) and not bloco[j].strip().lower().startswith("else") and not bloco[j].strip().lower().startswith("end if"):
-                    bloco_if.append(bloco[j])
-                    j += 1
-                
-                if j < len(bloco) and bloco[j].strip().lower().startswith("else"):
-                    k = j + 1
-                    while k < len(bloco) and not bloco[k].strip().lower().startswith("end if"):
-                        bloco_else.append(bloco[k])
-                        k += 1
-                    j = k
-                    
-                if j >= len(bloco) or not bloco[j].strip().lower().startswith("end if"): 
-                    raise SyntaxError(f"Bloco 'if' não fechado com 'end if' (linha {linha_num_real})")
-                
-                if condicao_eh_verdadeira:
-                    self.output.append(f"✅ Condição verdadeira. Executando bloco 'if'...")
-                    self._executar_bloco(bloco_if, linha_num_real)
-                else:
-                    self.output.append(f"❌ Condição falsa. Pulando para o bloco 'else'...")
-                    self._executar_bloco(bloco_else, linha_num_real)
-                
-                i = j + 1
-            
-            elif comando_principal == "loop":
-                match = re.match(r"(\d+)\s+begin", argumentos, re.IGNORECASE)
-                if not match: raise SyntaxError(f"Uso incorreto. Formato: loop <numero_vezes> begin (linha {linha_num_real})")
-                
-                try:
-                    vezes = int(match.groups()[0])
-                except ValueError:
-                    raise ValueError(f"O número de repetições deve ser um número inteiro (linha {linha_num_real})")
-                
-                bloco_loop = []; j = i + 1
-                while j < len(bloco) and not bloco[j].strip().lower().startswith("end loop"):
-                    bloco_loop.append(bloco[j])
-                    j += 1
-                if j >= len(bloco): raise SyntaxError(f"Bloco 'loop' não fechado com 'end loop' (linha {linha_num_real})")
-                
-                self.output.append(f"🔄 Iniciando loop por {vezes} vezes...")
-                for _ in range(vezes):
-                    self._executar_bloco(bloco_loop, linha_num_real)
-                self.output.append("✅ Loop finalizado.")
-                i = j + 1
-            else:
-                try:
-                    self._executar_comando(linha, linha_num_real)
-                except (SyntaxError, ValueError, NameError, FileNotFoundError) as e:
-                    raise type(e)(f"{e} (linha {linha_num_real})")
-                except Exception as e:
-                    raise Exception(f"Erro inesperado: {e} (linha {linha_num_real})")
-                i += 1
-
-    def executar_codigo_lineax(self, codigo, input_data=None):
-        self.variaveis = {}; self.funcoes = {}; self.output = []
-        if input_data:
-            self.entrada_simulada = list(input_data)
-        self.entrada_index = 0
-        
-        linhas = [linha for linha in codigo.splitlines() if linha.strip() and not linha.strip().startswith("#")]
-        
-        if not linhas or not linhas[0].strip().lower().startswith("linex init project"):
-            return ["Erro: O projeto deve começar com 'linex init project'."]
-        
-        try:
-            self.output.append("✅ Projeto iniciado com sucesso!")
-            self._executar_bloco(linhas[1:], 1)
-            self.output.append("\n**--- Fim da Execução ---**")
-            return self.output
-        except Exception as e:
-            return [f"❌ Erro na execução: {str(e)}"]
-
-def executar_codigo_lineax(codigo, input_data=None):
-    with execution_lock:
-        interpretador = LinexInterpreter()
-        return interpretador.executar_codigo_lineax(codigo, input_data)
\ No newline at end of file
+import os
+import threading
+import json
+import re
+import hashlib
+import ast
+import functools
+import copy
+import queue
+import sys
+import marshal
+import struct
+import types
+import array
+import itertools
+import operator
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import http.cookiejar
+import requests  # Importação para o novo comando 'http'
+import time
+import math
+import random
+
+# =============================================================================
+# Vetores numéricos: `array([...])`, `arange(n)` e operações no vetor inteiro
+# =============================================================================
+try:
+    import numpy as np  # opcional: quando instalado, guarda e opera os vetores
+except ImportError:
+    np = None
+
+# LINEX_NUMPY=0 força o array.array mesmo com o NumPy instalado
+USAR_NUMPY = np is not None and os.getenv("LINEX_NUMPY", "1") != "0"
+MAX_ITENS_VETOR = int(os.getenv("LINEX_MAX_ITENS_VETOR", str(10_000_000)))
+_MAX_ITENS_TEXTO = 100  # itens mostrados por `linex print` antes de abreviar
+
+
+def _numero_texto(x):
+    return str(int(x)) if x.is_integer() and abs(x) < 1e16 else repr(x)
+
+
+class Vetor:
+    """Vetor de números (float) da Linex.
+
+    Os dados ficam num `numpy.ndarray` quando o NumPy está disponível, senão
+    num `array.array("d")`. Aritmética com o vetor inteiro (`v * 2`, `v + w`),
+    reduções (`sum`, `min`, `max`, `mean`) e fatias (`v[10:20]`) são uma
+    chamada nativa cada, sem o interpretador passar item por item.
+    É imutável: toda operação devolve outro vetor, então fatias podem
+    compartilhar os dados sem cópia.
+    """
+    __slots__ = ("dados",)
+
+    def __init__(self, dados):
+        if len(dados) > MAX_ITENS_VETOR:
+            raise LimiteExcedido(f"Vetor com mais de {MAX_ITENS_VETOR} itens.")
+        self.dados = dados
+
+    @classmethod
+    def de(cls, valores):
+        """`array(valores)`: lista (ou lista JSON) de números."""
+        if type(valores) is Vetor:
+            return valores
+        if not isinstance(valores, (list, tuple)):
+            raise TypeError(f"array() espera uma lista de números, não {type(valores).__name__}")
+        if len(valores) > MAX_ITENS_VETOR:
+            raise LimiteExcedido(f"Vetor com mais de {MAX_ITENS_VETOR} itens.")
+        try:
+            dados = array.array("d", valores)  # valida os tipos em C (texto e None são recusados)
+        except TypeError:
+            raise TypeError("array() aceita apenas números")
+        return cls(np.frombuffer(dados, dtype=np.float64) if USAR_NUMPY else dados)
+
+    @classmethod
+    def intervalo(cls, inicio, fim=None, passo=1):
+        """`arange(fim)` / `arange(inicio, fim, passo)`, como o `range` do Python."""
+        if fim is None:
+            inicio, fim = 0, inicio
+        if passo == 0:
+            raise ValueError("arange() com passo zero")
+        quantidade = max(0, math.ceil((fim - inicio) / passo))
+        if quantidade > MAX_ITENS_VETOR:
+            raise LimiteExcedido(f"Vetor com mais de {MAX_ITENS_VETOR} itens.")
+        if USAR_NUMPY:
+            return cls(np.arange(quantidade, dtype=np.float64) * passo + inicio)
+        if all(type(n) is int for n in (inicio, fim, passo)):
+            return cls(array.array("d", range(inicio, fim, passo)))
+        indices = array.array("d", range(quantidade))
+        return cls(array.array("d", map(operator.add, map(operator.mul, indices, itertools.repeat(passo)),
+                                        itertools.repeat(inicio))))
+
+    def _operar(self, outro, operacao, reverso=False):
+        a = self.dados
+        if type(outro) is Vetor:
+            b = outro.dados
+            if len(b) != len(a):
+                raise TypeError(f"vetores de tamanhos diferentes ({len(a)} e {len(b)})")
+        elif isinstance(outro, (int, float)):
+            b = outro
+        else:
+            return NotImplemented
+        if reverso:
+            a, b = b, a
+        if USAR_NUMPY:
+            with np.errstate(all="raise"):  # 1/0 dá erro, como nos números da Linex
+                return Vetor(operacao(a, b))
+        if not isinstance(a, array.array):
+            a = itertools.repeat(a)
+        if not isinstance(b, array.array):
+            b = itertools.repeat(b)
+        return Vetor(array.array("d", map(operacao, a, b)))
+
+    def __add__(self, outro): return self._operar(outro, operator.add)
+    def __radd__(self, outro): return self._operar(outro, operator.add, True)
+    def __sub__(self, outro): return self._operar(outro, operator.sub)
+    def __rsub__(self, outro): return self._operar(outro, operator.sub, True)
+    def __mul__(self, outro): return self._operar(outro, operator.mul)
+    def __rmul__(self, outro): return self._operar(outro, operator.mul, True)
+    def __truediv__(self, outro): return self._operar(outro, operator.truediv)
+    def __rtruediv__(self, outro): return self._operar(outro, operator.truediv, True)
+    def __floordiv__(self, outro): return self._operar(outro, operator.floordiv)
+    def __rfloordiv__(self, outro): return self._operar(outro, operator.floordiv, True)
+    def __mod__(self, outro): return self._operar(outro, operator.mod)
+    def __rmod__(self, outro): return self._operar(outro, operator.mod, True)
+    def __pow__(self, outro): return self._operar(outro, operator.pow)
+    def __rpow__(self, outro): return self._operar(outro, operator.pow, True)
+
+    def __neg__(self):
+        return Vetor(-self.dados if USAR_NUMPY else array.array("d", map(operator.neg, self.dados)))
+
+    def __abs__(self):
+        return Vetor(abs(self.dados) if USAR_NUMPY else array.array("d", map(abs, self.dados)))
+
+    def __eq__(self, outro):
+        # Igualdade do vetor inteiro (bool), nunca item a item
+        if type(outro) is not Vetor:
+            return False
+        if USAR_NUMPY:
+            return bool(np.array_equal(self.dados, outro.dados))
+        return self.dados == outro.dados
+
+    __hash__ = None
+
+    def __len__(self):
+        return len(self.dados)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return Vetor(self.dados[indice])
+        if isinstance(indice, int):
+            return float(self.dados[indice])
+        raise TypeError("índice de vetor deve ser inteiro ou fatia")
+
+    def __iter__(self):
+        return map(float, self.dados)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def sum(self):
+        return float(self.dados.sum()) if USAR_NUMPY else math.fsum(self.dados)
+
+    def min(self):
+        if not len(self.dados):
+            raise ValueError("min() de um vetor vazio")
+        return float(self.dados.min()) if USAR_NUMPY else min(self.dados)
+
+    def max(self):
+        if not len(self.dados):
+            raise ValueError("max() de um vetor vazio")
+        return float(self.dados.max()) if USAR_NUMPY else max(self.dados)
+
+    def mean(self):
+        if not len(self.dados):
+            raise ValueError("mean() de um vetor vazio")
+        return self.sum() / len(self.dados)
+
+    def tolist(self):
+        return self.dados.tolist()
+
+    def __str__(self):
+        n = len(self.dados)
+        if n <= _MAX_ITENS_TEXTO:
+            return "[" + ", ".join(map(_numero_texto, self.tolist())) + "]"
+        metade = _MAX_ITENS_TEXTO // 2
+        inicio = ", ".join(map(_numero_texto, self.dados[:metade].tolist()))
+        fim = ", ".join(map(_numero_texto, self.dados[n - metade:].tolist()))
+        return f"[{inicio}, ..., {fim}] ({n} itens)"
+
+    __repr__ = __str__
+
+
+def _soma(valores, inicio=0):
+    if type(valores) is Vetor:
+        return valores.sum() + inicio
+    return sum(valores, inicio)
+
+
+def _minimo(*valores):
+    if len(valores) == 1 and type(valores[0]) is Vetor:
+        return valores[0].min()
+    return min(*valores)
+
+
+def _maximo(*valores):
+    if len(valores) == 1 and type(valores[0]) is Vetor:
+        return valores[0].max()
+    return max(*valores)
+
+
+def _media(valores):
+    if type(valores) is Vetor:
+        return valores.mean()
+    if not valores:
+        raise ValueError("mean() de uma lista vazia")
+    return math.fsum(valores) / len(valores)
+
+
+def _json_padrao(valor):
+    """`default` do json.dumps: vetores são salvos como listas."""
+    if type(valor) is Vetor:
+        return valor.tolist()
+    raise TypeError(f"Valor do tipo {type(valor).__name__} não pode ser salvo em JSON")
+
+
+# =============================================================================
+# Expressões: compiladas uma única vez para um code object restrito
+# =============================================================================
+SAFE_BUILTINS = {
+    'len': len,
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'math': math,
+    'random': random,
+    'array': Vetor.de,
+    'arange': Vetor.intervalo,
+    'sum': _soma,
+    'min': _minimo,
+    'max': _maximo,
+    'mean': _media,
+}
+
+# Nós de AST aceitos em uma expressão Linex; qualquer outro é recusado na compilação.
+_NOS_PERMITIDOS = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.keyword, ast.Name, ast.Load, ast.Constant, ast.Attribute,
+    ast.Subscript, ast.Slice, ast.List, ast.Tuple, ast.Dict,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+)
+# Atributos que permitiriam escapar do sandbox (ex.: "{0.__class__}".format)
+_ATRIBUTOS_PROIBIDOS = {"format", "format_map", "mro"}
+
+
+# Tamanho máximo dos valores criados por `*`, `**`, `<<` e `+` durante a execução:
+# o orçamento de passos só é conferido entre comandos, e uma única expressão
+# como `9 ** 9 ** 7` ou `"ab" * 10**9` prenderia o processo sozinha.
+MAX_BITS_NUMERO = int(os.getenv("LINEX_MAX_BITS_NUMERO", str(100_000)))
+MAX_ITENS_SEQUENCIA = int(os.getenv("LINEX_MAX_ITENS_SEQUENCIA", str(10_000_000)))
+
+
+def _numero_grande():
+    return LimiteExcedido(f"Número com mais de {MAX_BITS_NUMERO} bits.")
+
+
+def _sequencia_grande():
+    return LimiteExcedido(f"Texto ou lista com mais de {MAX_ITENS_SEQUENCIA} itens.")
+
+
+def _somar(a, b):
+    """`+` da Linex: soma números; concatena texto (valores None são ignorados)."""
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a + b
+    if isinstance(a, list) and isinstance(b, list):
+        resultado = a + b
+    elif type(a) is Vetor and not isinstance(b, str) or type(b) is Vetor and not isinstance(a, str):
+        return a + b
+    else:
+        resultado = ("" if a is None else str(a)) + ("" if b is None else str(b))
+    # No máximo o dobro de um valor que já cabia, mas `s + s` em loop cresce exponencialmente
+    if len(resultado) > MAX_ITENS_SEQUENCIA:
+        raise _sequencia_grande()
+    return resultado
+
+
+def _multiplicar(a, b):
+    """`*` da Linex: recusa `"ab" * 10**9` ou um inteiro gigante antes de criá-lo."""
+    if type(a) is int and type(b) is int:
+        if a.bit_length() + b.bit_length() > MAX_BITS_NUMERO:
+            raise _numero_grande()
+    elif isinstance(a, (str, bytes, list, tuple)) and isinstance(b, int):
+        if len(a) * b > MAX_ITENS_SEQUENCIA:
+            raise _sequencia_grande()
+    elif isinstance(b, (str, bytes, list, tuple)) and isinstance(a, int):
+        if len(b) * a > MAX_ITENS_SEQUENCIA:
+            raise _sequencia_grande()
+    return a * b
+
+
+def _potencia(a, b):
+    """`**` da Linex, com o tamanho do resultado estimado antes da conta."""
+    if isinstance(a, int) and isinstance(b, int) and b > 1 and a.bit_length() * b > MAX_BITS_NUMERO:
+        if a not in (0, 1, -1):
+            raise _numero_grande()
+    return a ** b
+
+
+def _deslocar(a, b):
+    """`<<` da Linex: `1 << 10**9` também é um número gigante."""
+    if isinstance(a, int) and isinstance(b, int) and a and a.bit_length() + b > MAX_BITS_NUMERO:
+        raise _numero_grande()
+    return a << b
+
+
+# Largura e precisão de cada `%...` de um texto de formatação (`%(nome)08.3f`)
+_RE_LARGURA_FORMATO = re.compile(r"%(?:\([^)]*\))?[-#0 +]*(\*|\d*)(?:\.(\*|\d*))?")
+
+
+def _resto(a, b):
+    """`%` da Linex: `"%900000000d" % 1` também criaria um texto gigante."""
+    if isinstance(a, (str, bytes)):
+        texto = a if isinstance(a, str) else a.decode("latin-1")
+        tamanho = len(texto)
+        argumentos = b if isinstance(b, tuple) else (b,)
+        for largura, precisao in _RE_LARGURA_FORMATO.findall(texto):
+            for numero in (largura, precisao):
+                if numero == "*":
+                    tamanho += max((abs(n) for n in argumentos if type(n) is int), default=0)
+                elif numero:
+                    tamanho += int(numero)
+            if tamanho > MAX_ITENS_SEQUENCIA:
+                raise _sequencia_grande()
+    return a % b
+
+
+# Operadores trocados por uma função com limite de tamanho (o nome volta no dump)
+_OPERADORES_LIMITADOS = {ast.Mult: "_multiplicar", ast.Pow: "_potencia", ast.LShift: "_deslocar",
+                         ast.Mod: "_resto"}
+_FUNCOES_OPERADORES = {nome: tipo for tipo, nome in _OPERADORES_LIMITADOS.items()}
+
+
+# Métodos e funções de módulo cujo resultado pode ser muito maior que os
+# argumentos (`"a".ljust(10**9)`, `math.factorial(10**6)`): `_atributo` devolve
+# uma versão que confere o tamanho antes de chamar o original.
+def _conferir_itens(quantidade):
+    if quantidade > MAX_ITENS_SEQUENCIA:
+        raise _sequencia_grande()
+
+
+def _conferir_bits(bits):
+    if bits > MAX_BITS_NUMERO:
+        raise _numero_grande()
+
+
+def _bits_fatorial(n):
+    """log2(n!) estimado com lgamma, sem calcular o fatorial."""
+    try:
+        return math.lgamma(n + 1) / math.log(2) if n > 1 else 0
+    except OverflowError:
+        return math.inf
+
+
+def _alinhar(nome):
+    def alinhar(texto, largura, *resto):
+        _conferir_itens(largura)
+        return getattr(texto, nome)(largura, *resto)
+    return alinhar
+
+
+def _expandir_tabs(texto, tabsize=8):
+    _conferir_itens(len(texto) + texto.count("\t" if isinstance(texto, str) else b"\t") * tabsize)
+    return texto.expandtabs(tabsize)
+
+
+def _substituir(texto, velho, novo, vezes=-1):
+    if len(novo) > len(velho):
+        ocorrencias = texto.count(velho) if velho else len(texto) + 1
+        if vezes >= 0:
+            ocorrencias = min(ocorrencias, vezes)
+        _conferir_itens(len(texto) + ocorrencias * (len(novo) - len(velho)))
+    return texto.replace(velho, novo, vezes)
+
+
+def _juntar(separador, itens):
+    itens = list(itens)
+    _conferir_itens(len(separador) * max(len(itens) - 1, 0)
+                    + sum(len(item) for item in itens if isinstance(item, (str, bytes))))
+    return separador.join(itens)
+
+
+def _traduzir(texto, tabela):
+    if isinstance(tabela, dict):
+        maior = max((len(v) for v in tabela.values() if isinstance(v, str)), default=1)
+        _conferir_itens(len(texto) * maior)
+    return texto.translate(tabela)
+
+
+def _estender(lista, itens):
+    if hasattr(itens, "__len__"):
+        _conferir_itens(len(lista) + len(itens))
+    return lista.extend(itens)
+
+
+def _para_bytes(numero, length=1, byteorder="big", *, signed=False):
+    _conferir_itens(length)
+    return numero.to_bytes(length, byteorder, signed=signed)
+
+
+def _fatorial(n):
+    if isinstance(n, int):
+        _conferir_bits(_bits_fatorial(n))
+    return math.factorial(n)
+
+
+def _combinacoes(n, k):
+    if isinstance(n, int) and isinstance(k, int) and 0 <= k <= n:
+        _conferir_bits(_bits_fatorial(n) - _bits_fatorial(k) - _bits_fatorial(n - k))
+    return math.comb(n, k)
+
+
+def _permutacoes(n, k=None):
+    if isinstance(n, int) and (k is None or isinstance(k, int) and 0 <= k <= n):
+        _conferir_bits(_bits_fatorial(n) - _bits_fatorial(n - (n if k is None else k)))
+    return math.perm(n, k)
+
+
+def _soma_bits(numeros):
+    """Limite dos bits de um produto (ou mmc): a soma dos bits dos fatores."""
+    return sum(abs(n).bit_length() for n in numeros if isinstance(n, int))
+
+
+def _produto(itens, *, start=1):
+    itens = list(itens)
+    _conferir_bits(_soma_bits(itens) + _soma_bits([start]))
+    return math.prod(itens, start=start)
+
+
+def _mmc(*numeros):
+    _conferir_bits(_soma_bits(numeros))
+    return math.lcm(*numeros)
+
+
+def _escolhas(populacao, weights=None, *, cum_weights=None, k=1):
+    _conferir_itens(k)
+    return random.choices(populacao, weights, cum_weights=cum_weights, k=k)
+
+
+def _amostra(populacao, k, *, counts=None):
+    _conferir_itens(k)
+    return random.sample(populacao, k, counts=counts)
+
+
+def _bytes_aleatorios(n):
+    _conferir_itens(n)
+    return random.randbytes(n)
+
+
+def _bits_aleatorios(k):
+    _conferir_bits(k)
+    return random.getrandbits(k)
+
+
+_METODOS_TEXTO = {
+    "ljust": _alinhar("ljust"), "rjust": _alinhar("rjust"), "center": _alinhar("center"),
+    "zfill": _alinhar("zfill"), "expandtabs": _expandir_tabs, "replace": _substituir, "join": _juntar,
+}
+_METODOS_LIMITADOS = {
+    str: dict(_METODOS_TEXTO, translate=_traduzir),
+    bytes: _METODOS_TEXTO,
+    list: {"extend": _estender},
+    int: {"to_bytes": _para_bytes},
+    bool: {"to_bytes": _para_bytes},
+}
+_FUNCOES_MODULO_LIMITADAS = {
+    math: {"factorial": _fatorial, "comb": _combinacoes, "perm": _permutacoes,
+           "prod": _produto, "lcm": _mmc},
+    random: {"choices": _escolhas, "sample": _amostra, "randbytes": _bytes_aleatorios,
+             "getrandbits": _bits_aleatorios},
+}
+
+
+def _atributo(objeto, nome):
+    """`obj.campo`: chave de objeto JSON (dict) ou atributo público (math.pi)."""
+    if isinstance(objeto, dict):
+        return objeto.get(nome)
+    valor = getattr(objeto, nome)
+    limitados = _METODOS_LIMITADOS.get(type(objeto))
+    if limitados is not None:
+        metodo = limitados.get(nome)
+        if metodo is not None:
+            return functools.partial(metodo, objeto)
+    elif objeto is math or objeto is random:
+        return _FUNCOES_MODULO_LIMITADAS[objeto].get(nome, valor)
+    return valor
+
+
+def _acessar(objeto, nomes):
+    """`obj.a.b.c` com os nomes já separados na compilação (uma tupla constante).
+
+    Objetos JSON são lidos direto por índice, uma consulta de dict por nome.
+    Se algo no caminho não for dict (chave ausente, `math.pi`, método de
+    lista), refaz a leitura com `_atributo`, com o mesmo resultado de sempre.
+    """
+    valor = objeto
+    try:
+        for nome in nomes:
+            valor = valor[nome]
+        return valor
+    except (KeyError, TypeError):
+        for nome in nomes:
+            objeto = _atributo(objeto, nome)
+        return objeto
+
+
+class _Acessores(dict):
+    """`_acessores[nomes]`: função `f(obj)` que lê `obj.a.b.c`, gerada uma vez por caminho.
+
+    O corpo gerado é `obj["a"]["b"]["c"]` (só consultas de dict); qualquer
+    exceção no caminho cai no `_acessar`, que dá o resultado de sempre.
+    """
+    MAX_CAMINHOS = 4096
+
+    def __missing__(self, nomes):
+        if len(self) >= self.MAX_CAMINHOS:
+            self.clear()
+        indices = "".join(f"[{nome!r}]" for nome in nomes)  # nomes são identificadores (ast.Attribute)
+        fonte = (
+            "def acessar(o):\n"
+            "    try:\n"
+            f"        return o{indices}\n"
+            "    except (KeyError, TypeError):\n"
+            "        return _acessar(o, nomes)\n"
+        )
+        escopo = {"_acessar": _acessar, "nomes": nomes}
+        exec(compile(fonte, "<linex-caminho>", "exec"), escopo)
+        funcao = self[nomes] = escopo["acessar"]
+        return funcao
+
+
+_acessores = _Acessores()
+
+
+def _caminho(objeto, partes):
+    """Acesso legado `obj.a.1.b` para chaves que não são identificadores válidos."""
+    valor = objeto
+    for p in partes:
+        if not isinstance(valor, dict):
+            return None
+        valor = valor.get(p)
+    return valor
+
+
+def _icar(slots, slot, funcao):
+    """Primeira avaliação de uma subexpressão içada para fora de um loop."""
+    valor = slots[slot] = funcao(slots)
+    return valor
+
+
+_GLOBAIS_EXPRESSAO = dict(SAFE_BUILTINS)
+_GLOBAIS_EXPRESSAO.update({
+    "__builtins__": {},
+    "_somar": _somar,
+    "_multiplicar": _multiplicar,
+    "_potencia": _potencia,
+    "_deslocar": _deslocar,
+    "_resto": _resto,
+    "_atributo": _atributo,
+    "_acessar": _acessar,
+    "_acessores": _acessores,
+    "_caminho": _caminho,
+    "_icar": _icar,
+})
+
+
+class _Reescritor(ast.NodeTransformer):
+    """Valida a AST e troca `+` e `.` pelas versões da Linex."""
+
+    def generic_visit(self, node):
+        if not isinstance(node, _NOS_PERMITIDOS):
+            raise SyntaxError(f"construção não permitida: {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id.startswith("_"):
+            raise SyntaxError(f"nome não permitido: {node.id}")
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Add):
+            return ast.Call(ast.Name("_somar", ast.Load()), [node.left, node.right], [])
+        nome = _OPERADORES_LIMITADOS.get(type(node.op))
+        if nome is not None:
+            return ast.Call(ast.Name(nome, ast.Load()), [node.left, node.right], [])
+        return node
+
+    def visit_Attribute(self, node):
+        if node.attr.startswith("_") or node.attr in _ATRIBUTOS_PROIBIDOS:
+            raise SyntaxError(f"atributo não permitido: {node.attr}")
+        self.generic_visit(node)
+        base = node.value
+        if isinstance(base, ast.Call) and isinstance(base.func, ast.Name) and base.func.id in ("_atributo", "_acessar"):
+            # `a.b.c`: um único `_acessar(a, ("b", "c"))` em vez de `_atributo` aninhado
+            anteriores = base.args[1].value
+            nomes = anteriores + (node.attr,) if base.func.id == "_acessar" else (anteriores, node.attr)
+            return ast.Call(ast.Name("_acessar", ast.Load()), [base.args[0], ast.Constant(nomes)], [])
+        return ast.Call(ast.Name("_atributo", ast.Load()), [base, ast.Constant(node.attr)], [])
+
+
+_RE_CAMINHO = re.compile(r"^(\w+)\.([^\s.]+(?:\.[^\s.]+)*)$")
+
+
+class _Indefinido:
+    """Marca de slot de variável ainda não atribuída."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<indefinido>"
+
+
+_INDEFINIDO = _Indefinido()
+
+
+class _Corda:
+    """Texto montado aos pedaços por `var s = s + ...` (rope simples).
+
+    Os pedaços ficam em lista e só são juntados quando alguém lê `s`, então
+    acrescentar em loop custa tempo linear em vez de quadrático. Nunca sai
+    do slot: quem lê a variável recebe sempre um `str`.
+    """
+    __slots__ = ("partes", "tamanho")
+
+    def __init__(self, inicio):
+        self.partes = [inicio]
+        self.tamanho = len(inicio)
+
+    def anexar(self, textos):
+        tamanho = self.tamanho + sum(map(len, textos))
+        if tamanho > MAX_ITENS_SEQUENCIA:
+            raise _sequencia_grande()
+        self.partes.extend(textos)
+        self.tamanho = tamanho
+
+    def texto(self):
+        if len(self.partes) > 1:
+            self.partes = ["".join(self.partes)]
+        return self.partes[0]
+
+
+# Textos a partir deste tamanho são decodificados pelo `json load` só na primeira leitura
+JSON_PREGUICOSO_MIN_BYTES = int(os.getenv("LINEX_JSON_PREGUICOSO_MIN_BYTES", str(64 * 1024)))
+
+
+class _JsonPreguicoso:
+    """Resultado de um `json load` de texto grande, ainda não decodificado.
+
+    O `json.loads` roda na primeira vez que alguém lê a variável, e o valor
+    decodificado toma o lugar deste objeto no slot; se o programa nunca usa
+    a variável, o documento nunca é decodificado. Como `_Corda`, nunca sai
+    do slot. Um texto inválido só dá erro nessa primeira leitura.
+    """
+    __slots__ = ("texto", "origem", "dados")
+
+    def __init__(self, texto, origem):
+        self.texto = texto
+        self.origem = origem  # variável do texto, para a mensagem de erro
+        self.dados = _INDEFINIDO
+
+    def valor(self):
+        if self.dados is _INDEFINIDO:
+            try:
+                self.dados = json.loads(self.texto)
+            except json.JSONDecodeError:
+                raise ValueError(f"Conteúdo da variável '{self.origem}' não é um JSON válido.")
+            self.texto = None
+        return self.dados
+
+
+def _materializar(valor):
+    tipo = type(valor)
+    if tipo is _Corda:
+        return valor.texto()
+    if tipo is _JsonPreguicoso:
+        return valor.valor()
+    return valor
+
+
+class Expressao:
+    """Expressão Linex compilada para uma função Python `f(slots)`.
+
+    As variáveis já vêm resolvidas para índices da lista de slots do
+    interpretador, então ler `x` é um `slots[i]`, sem dicionário nem cópia.
+    """
+    __slots__ = ("fonte", "funcao", "leituras", "arvore", "constante")
+
+    def __init__(self, fonte, funcao, leituras, arvore=None, constante=_INDEFINIDO):
+        self.fonte = fonte
+        self.funcao = funcao
+        self.leituras = leituras  # slots lidos pela expressão
+        self.arvore = arvore  # AST já otimizada, ainda com nomes (para o otimizador e o dump)
+        self.constante = constante  # valor conhecido na compilação, ou _INDEFINIDO
+
+    def avaliar(self, slots):
+        for i in self.leituras:
+            valor = slots[i]
+            if valor is _INDEFINIDO:
+                raise ValueError(f"Expressão inválida ou variável não definida: '{self.fonte}'")
+            tipo = type(valor)
+            if tipo is _Corda or tipo is _JsonPreguicoso:
+                slots[i] = _materializar(valor)
+        try:
+            return self.funcao(slots)
+        except TypeError as e:
+            raise ValueError(f"Expressão inválida: '{self.fonte}' ({e})")
+
+
+# Passo de otimização após o parse (dobra de constantes, ramos mortos, hoisting)
+OTIMIZAR = os.getenv("LINEX_OTIMIZAR", "1") != "0"
+# Imprime o programa otimizado em stderr a cada compilação (depuração)
+DUMP_OTIMIZADO = os.getenv("LINEX_DUMP_OTIMIZADO", "0") == "1"
+
+# `var s = s + ...` acumula texto numa corda em vez de copiar a string toda vez
+USAR_CORDAS = os.getenv("LINEX_CORDAS", "1") != "0"
+
+# Funções sem efeito colateral: podem ser dobradas na compilação e içadas de loops.
+_FUNCOES_PURAS = {"len", "str", "int", "float", "bool", "sum", "min", "max", "mean", "_somar", "_multiplicar",
+                  "_potencia", "_deslocar", "_resto", "_atributo", "_acessar", "_caminho"}
+_MODULOS_PUROS = {"math"}
+# Puras, mas caras demais para rodar durante a compilação (math.factorial(10**6))
+_MATH_CARAS = {"factorial", "comb", "perm", "prod"}
+_NOS_DOBRAVEIS = (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.Subscript)
+_MAX_CONSTANTE = 10000  # tamanho máximo de texto/número produzido pela dobra
+
+
+def _chamada_pura(func):
+    """`len`, `_somar`... ou uma função de `math` (`_atributo(math, "sqrt")`)."""
+    if isinstance(func, ast.Name):
+        return func.id in _FUNCOES_PURAS
+    return (
+        isinstance(func, ast.Call) and isinstance(func.func, ast.Name) and func.func.id == "_atributo"
+        and isinstance(func.args[0], ast.Name) and func.args[0].id in _MODULOS_PUROS
+        and isinstance(func.args[1], ast.Constant) and func.args[1].value not in _MATH_CARAS
+    )
+
+
+def _eh_puro(node):
+    """A expressão só lê valores: nada de random, métodos ou listas/dicts mutáveis."""
+    for filho in ast.walk(node):
+        if isinstance(filho, ast.Call):
+            if filho.keywords or not _chamada_pura(filho.func):
+                return False
+        elif isinstance(filho, (ast.List, ast.Dict, ast.Attribute)):
+            return False
+    return True
+
+
+def _operando_constante(node):
+    return isinstance(node, ast.Constant) or (isinstance(node, ast.Name) and node.id in _MODULOS_PUROS)
+
+
+def _pode_dobrar(node):
+    if isinstance(node, ast.Call):
+        if node.keywords or not _chamada_pura(node.func) or not all(map(_operando_constante, node.args)):
+            return False
+        nome = node.func.id if isinstance(node.func, ast.Name) else None
+        if nome not in ("_potencia", "_deslocar", "_multiplicar"):
+            return True
+        # Evita materializar valores grandes na compilação ("a" * 10**6, 2 ** 10**5)
+        esquerda, direita = node.args[0].value, node.args[1].value
+        if nome != "_multiplicar":
+            return not isinstance(direita, int) or abs(direita) <= 64
+        return not any(
+            isinstance(a, (str, bytes, tuple)) and isinstance(b, int) and b > _MAX_CONSTANTE
+            for a, b in ((esquerda, direita), (direita, esquerda))
+        )
+    filhos = [f for f in ast.iter_child_nodes(node) if isinstance(f, ast.expr)]
+    return all(isinstance(f, ast.Constant) for f in filhos)
+
+
+def _valor_constante(node):
+    """Avalia `node` na compilação; `_INDEFINIDO` se falhar ou não couber numa constante."""
+    try:
+        codigo = compile(ast.fix_missing_locations(ast.Expression(node)), "<linex>", "eval")
+        valor = eval(codigo, _GLOBAIS_EXPRESSAO)
+    except Exception:
+        # O erro fica para a execução, com a linha certa na mensagem.
+        return _INDEFINIDO
+    if valor is None or isinstance(valor, (bool, float)):
+        return valor
+    if isinstance(valor, int) and valor.bit_length() <= _MAX_CONSTANTE:
+        return valor
+    if isinstance(valor, str) and len(valor) <= _MAX_CONSTANTE:
+        return valor
+    return _INDEFINIDO
+
+
+class _Dobrador(ast.NodeTransformer):
+    """Dobra de constantes: `2 * 60`, `"a" + "b"` e `math.sqrt(16)` viram literais."""
+
+    def generic_visit(self, node):
+        super().generic_visit(node)
+        if isinstance(node, _NOS_DOBRAVEIS) and _pode_dobrar(node):
+            valor = _valor_constante(node)
+            if valor is not _INDEFINIDO:
+                return ast.copy_location(ast.Constant(valor), node)
+        return node
+
+
+@functools.lru_cache(maxsize=4096)
+def _analisar_expressao(fonte):
+    """Parse, validação e dobra de constantes de uma expressão (memoizado entre programas).
+
+    A AST devolvida é compartilhada: quem for alterá-la deve copiar antes.
+    """
+    arvore = _validar_expressao(fonte)
+    if OTIMIZAR:
+        arvore = _Dobrador().visit(copy.deepcopy(arvore))
+    return arvore
+
+
+@functools.lru_cache(maxsize=4096)
+def _validar_expressao(fonte):
+    """Só parse e validação, sem a dobra (que executa as partes constantes).
+
+    Basta para os diagnósticos da IDE, que só querem os erros e os nomes lidos.
+    """
+    fonte = fonte.strip()
+    try:
+        arvore = ast.parse(fonte, mode="eval")
+    except SyntaxError:
+        arvore = None
+
+    if arvore is None:
+        # Formas aceitas pelo interpretador antigo que não são Python válido
+        match_caminho = _RE_CAMINHO.match(fonte)
+        if match_caminho:
+            var_json, prop = match_caminho.groups()
+            arvore = ast.Expression(ast.Call(
+                ast.Name("_caminho", ast.Load()),
+                [ast.Name(var_json, ast.Load()), ast.Constant(tuple(prop.split(".")))],
+                [],
+            ))
+        elif len(fonte) >= 2 and fonte.startswith('"') and fonte.endswith('"'):
+            arvore = ast.Expression(ast.Constant(fonte.strip('"')))
+        else:
+            raise SyntaxError(f"Expressão inválida: '{fonte}'")
+    else:
+        try:
+            arvore = _Reescritor().visit(arvore)
+        except SyntaxError as e:
+            raise SyntaxError(f"Expressão inválida: '{fonte}' ({e})")
+    return arvore
+
+
+def _lambda_slots(corpo):
+    argumentos = ast.arguments(posonlyargs=[], args=[ast.arg("_s")], kwonlyargs=[], kw_defaults=[], defaults=[])
+    return ast.Expression(ast.Lambda(argumentos, corpo))
+
+
+def _ler_slot(i):
+    return ast.Subscript(ast.Name("_s", ast.Load()), ast.Constant(i), ast.Load())
+
+
+class _ParaSlots(ast.NodeTransformer):
+    """Troca cada variável `x` por `_s[i]`, registrando o slot na tabela."""
+
+    def __init__(self, tabela):
+        self.tabela = tabela
+        self.leituras = []
+        self.globais = None  # funções das subexpressões içadas, se houver
+
+    def visit_Name(self, node):
+        if node.id in _GLOBAIS_EXPRESSAO:
+            return node
+        i = self.tabela.slot(node.id)
+        if i not in self.leituras:
+            self.leituras.append(i)
+        return _ler_slot(i)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id == "_acessar":
+            # _acessar(obj, nomes) -> _acessores[nomes](obj)
+            self.generic_visit(node)
+            return ast.Call(ast.Subscript(ast.Name("_acessores", ast.Load()), node.args[1], ast.Load()), [node.args[0]], [])
+        if not (isinstance(node.func, ast.Name) and node.func.id == "_icado"):
+            return self.generic_visit(node)
+        # _icado(h, sub) -> (_s[h] if _s[h] is not _INDEFINIDO else _icar(_s, h, _iN))
+        slot = node.args[0].value
+        funcao = _lambda_slots(self.visit(node.args[1]))
+        ast.fix_missing_locations(funcao)
+        if self.globais is None:
+            self.globais = dict(_GLOBAIS_EXPRESSAO, _INDEFINIDO=_INDEFINIDO)
+        nome = f"_i{len(self.globais)}"
+        self.globais[nome] = eval(compile(funcao, "<linex>", "eval"), _GLOBAIS_EXPRESSAO)
+        return ast.IfExp(
+            ast.Compare(_ler_slot(slot), [ast.IsNot()], [ast.Name("_INDEFINIDO", ast.Load())]),
+            _ler_slot(slot),
+            ast.Call(ast.Name("_icar", ast.Load()),
+                     [ast.Name("_s", ast.Load()), ast.Constant(slot), ast.Name(nome, ast.Load())], []),
+        )
+
+
+class TabelaSimbolos:
+    """Nomes de variáveis de um programa e o slot (índice) de cada um."""
+
+    def __init__(self):
+        self.indices = {}
+        self.nomes = []
+        self._expressoes = {}
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def slot(self, nome):
+        i = self.indices.get(nome)
+        if i is None:
+            i = self.indices[nome] = len(self.nomes)
+            self.nomes.append(nome)
+        return i
+
+    def copia(self):
+        nova = TabelaSimbolos()
+        nova.indices = dict(self.indices)
+        nova.nomes = list(self.nomes)
+        nova._expressoes = dict(self._expressoes)
+        return nova
+
+    def expressao(self, fonte, arvore=None):
+        """Compila `fonte` para uma `Expressao` ligada aos slots desta tabela.
+
+        `arvore` substitui a AST de `fonte` (usado pelo otimizador); nesse
+        caso o resultado não entra no cache da tabela.
+        """
+        expressao = self._expressoes.get(fonte) if arvore is None else None
+        if expressao is None:
+            original = _analisar_expressao(fonte) if arvore is None else arvore
+            conversor = _ParaSlots(self)
+            corpo = conversor.visit(copy.deepcopy(original).body)
+            funcao = _lambda_slots(corpo)
+            ast.fix_missing_locations(funcao)
+            funcao = eval(compile(funcao, "<linex>", "eval"), conversor.globais or _GLOBAIS_EXPRESSAO)
+            constante = original.body.value if isinstance(original.body, ast.Constant) else _INDEFINIDO
+            expressao = Expressao(fonte.strip(), funcao, tuple(conversor.leituras), original, constante)
+            if arvore is None:
+                self._expressoes[fonte] = expressao
+        return expressao
+
+
+# =============================================================================
+# Cliente HTTP compartilhado (comando `http get`)
+# =============================================================================
+HTTP_TIMEOUT = 10
+HTTP_MAX_CONEXOES = int(os.getenv("LINEX_HTTP_MAX_CONEXOES", "16"))
+# TTL (segundos) do cache de respostas por execução; 0 desliga o cache
+HTTP_CACHE_TTL = float(os.getenv("LINEX_HTTP_CACHE_TTL", "0"))
+
+_sessao_http = None
+_executor = None
+_http_lock = threading.Lock()
+
+
+def _sessao():
+    """Sessão `requests` compartilhada, reaproveitando conexões keep-alive.
+
+    A sessão serve todas as execuções, de todos os usuários: ela não guarda
+    cookies, senão o `Set-Cookie` recebido por um programa seria enviado
+    pelos programas seguintes.
+    """
+    global _sessao_http
+    if _sessao_http is None:
+        with _http_lock:
+            if _sessao_http is None:
+                sessao = requests.Session()
+                sessao.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+                adaptador = requests.adapters.HTTPAdapter(
+                    pool_connections=HTTP_MAX_CONEXOES, pool_maxsize=HTTP_MAX_CONEXOES
+                )
+                sessao.mount("http://", adaptador)
+                sessao.mount("https://", adaptador)
+                _sessao_http = sessao
+    return _sessao_http
+
+
+def _executor_http():
+    """Threads para baixar em paralelo as URLs de um `http get` em lote."""
+    global _executor
+    if _executor is None:
+        with _http_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HTTP_MAX_CONEXOES, thread_name_prefix="linex-http")
+    return _executor
+
+
+def _baixar(url, timeout):
+    response = _sessao().get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.text
+
+
+MOTORES = ("arvore", "vm")
+MOTOR_PADRAO = os.getenv("LINEX_MOTOR", "arvore")
+
+
+# Limites padrão da saída de uma execução (ver `SaidaLimitada`)
+MAX_LINHAS_SAIDA = int(os.getenv("LINEX_MAX_LINHAS", "10000"))
+MAX_BYTES_SAIDA = int(os.getenv("LINEX_MAX_BYTES_SAIDA", str(1024 * 1024)))
+
+# Orçamentos de execução: passos (comandos/instruções), tempo de parede e
+# profundidade de `call`. Estourar qualquer um levanta `LimiteExcedido`.
+MAX_PASSOS = int(os.getenv("LINEX_MAX_PASSOS", "5000000"))
+TEMPO_LIMITE = float(os.getenv("LINEX_TEMPO_LIMITE", "10"))
+MAX_PROFUNDIDADE = int(os.getenv("LINEX_MAX_PROFUNDIDADE", "100"))
+# O relógio é consultado a cada N passos, não em todos
+_INTERVALO_VERIFICACAO = 1024
+
+
+class SaidaLimitada:
+    """Buffer circular de saída: guarda só as últimas linhas dentro do limite.
+
+    Quando o limite de linhas ou de bytes estoura, as linhas mais antigas são
+    descartadas e `linhas()` coloca um aviso de truncamento no início, então
+    a memória fica estável mesmo com milhões de iterações.
+    """
+
+    def __init__(self, max_linhas=MAX_LINHAS_SAIDA, max_bytes=MAX_BYTES_SAIDA):
+        self.max_linhas = max_linhas
+        self.max_bytes = max_bytes
+        self._linhas = deque()
+        self._bytes = 0
+        self.descartadas = 0
+
+    def append(self, linha):
+        self._linhas.append(linha)
+        self._bytes += len(linha.encode("utf-8"))
+        while len(self._linhas) > self.max_linhas or (self._bytes > self.max_bytes and len(self._linhas) > 1):
+            self._bytes -= len(self._linhas.popleft().encode("utf-8"))
+            self.descartadas += 1
+
+    def __len__(self):
+        return len(self._linhas)
+
+    def __iter__(self):
+        return iter(self.linhas())
+
+    def linhas(self):
+        if not self.descartadas:
+            return list(self._linhas)
+        aviso = f"⚠️ Saída truncada: {self.descartadas} linhas anteriores foram descartadas."
+        return [aviso] + list(self._linhas)
+
+
+# Total de bytes (JSON compacto) que os `save` de uma execução podem guardar
+MAX_BYTES_ARQUIVOS = int(os.getenv("LINEX_MAX_BYTES_ARQUIVOS", str(10 * 1024 * 1024)))
+_RE_NOME_ARQUIVO = re.compile(r"^[\w\- ]+(\.[\w\- ]+)*$")
+
+
+class ArquivosVirtuais:
+    """Arquivos dos comandos `save`/`load` de uma execução, guardados em memória.
+
+    Cada execução tem os seus, então programas rodando ao mesmo tempo não
+    disputam os mesmos arquivos. Com `diretorio` (a pasta `user/<id>/`), o
+    `load` também lê os arquivos que já estão lá e `descarregar` grava de uma
+    vez só, no fim da execução, os que foram alterados.
+    """
+
+    def __init__(self, diretorio=None, max_bytes=MAX_BYTES_ARQUIVOS):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self.arquivos = {}  # nome -> texto JSON compacto
+        self.bytes = 0
+        self._alterados = set()
+
+    @staticmethod
+    def _validar_nome(nome):
+        if not _RE_NOME_ARQUIVO.match(nome):
+            raise ValueError(f"Nome de arquivo inválido: '{nome}'.")
+
+    def gravar(self, nome, variaveis):
+        self._validar_nome(nome)
+        texto = json.dumps(variaveis, separators=(",", ":"), ensure_ascii=False, default=_json_padrao)
+        bytes_novos = self.bytes - len(self.arquivos.get(nome, "")) + len(texto)
+        if bytes_novos > self.max_bytes:
+            raise LimiteExcedido(f"Limite de {self.max_bytes} bytes para arquivos salvos excedido.")
+        self.arquivos[nome] = texto
+        self.bytes = bytes_novos
+        self._alterados.add(nome)
+
+    def ler(self, nome):
+        """Variáveis do arquivo `nome`; lê do disco só na primeira vez."""
+        self._validar_nome(nome)
+        texto = self.arquivos.get(nome)
+        if texto is None and self.diretorio:
+            try:
+                with open(os.path.join(self.diretorio, f"{nome}.json"), encoding="utf-8") as f:
+                    texto = f.read()
+            except OSError:
+                texto = None
+            if texto is not None:
+                self.arquivos[nome] = texto
+                self.bytes += len(texto)
+        if texto is None:
+            raise FileNotFoundError(f"Arquivo '{nome}.json' não encontrado.")
+        try:
+            dados = json.loads(texto)
+        except json.JSONDecodeError:
+            raise ValueError(f"Arquivo '{nome}.json' não é um JSON válido.")
+        if not isinstance(dados, dict):
+            raise ValueError(f"Arquivo '{nome}.json' não contém um objeto JSON.")
+        return dados
+
+    def descarregar(self):
+        """Grava no `diretorio` os arquivos alterados; devolve os caminhos gravados."""
+        gravados = []
+        if not self.diretorio:
+            return gravados
+        os.makedirs(self.diretorio, exist_ok=True)
+        for nome in sorted(self._alterados):
+            caminho = os.path.join(self.diretorio, f"{nome}.json")
+            temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.write(self.arquivos[nome])
+            os.replace(temporario, caminho)
+            gravados.append(caminho)
+        self._alterados.clear()
+        return gravados
+
+
+class PerfilLinex:
+    """Contagens e tempos por linha do fonte, preenchidos no modo `perfilar`.
+
+    O tempo total de uma linha inclui os blocos aninhados (corpo do loop,
+    função chamada); o tempo próprio desconta o que foi gasto nas linhas
+    filhas. Em recursão, o total só conta a chamada mais externa.
+    """
+
+    def __init__(self):
+        self.linhas = {}  # linha -> [execucoes, tempo_total, tempo_proprio]
+        self.funcoes = {}  # nome -> [chamadas, tempo_total]
+        self.tempo_total = 0.0
+        self._filhos = []  # tempo gasto pelos filhos do nó em execução, por nível
+        self._ativos = {}  # linha ou ("call", nome) -> execuções em andamento
+
+    def entrar(self, chave):
+        self._filhos.append(0.0)
+        self._ativos[chave] = self._ativos.get(chave, 0) + 1
+
+    def _sair_ativo(self, chave):
+        restantes = self._ativos[chave] - 1
+        self._ativos[chave] = restantes
+        return restantes == 0
+
+    def sair(self, no, decorrido):
+        filhos = self._filhos.pop()
+        if self._filhos:
+            self._filhos[-1] += decorrido
+        dados = self.linhas.get(no.linha)
+        if dados is None:
+            dados = self.linhas[no.linha] = [0, 0.0, 0.0]
+        dados[0] += 1
+        dados[2] += decorrido - filhos
+        if self._sair_ativo(no.linha):
+            dados[1] += decorrido
+
+    def chamada(self, nome, decorrido, fim):
+        """Registra um `call`; `fim` é False na entrada e True na saída."""
+        if not fim:
+            dados = self.funcoes.setdefault(nome, [0, 0.0])
+            dados[0] += 1
+            self._ativos[("call", nome)] = self._ativos.get(("call", nome), 0) + 1
+        elif self._sair_ativo(("call", nome)):
+            self.funcoes[nome][1] += decorrido
+
+    def relatorio(self):
+        """Dicionário serializável em JSON (tempos em milissegundos)."""
+        return {
+            "tempo_total_ms": round(self.tempo_total * 1000, 3),
+            "linhas": [
+                {"linha": linha, "execucoes": execucoes,
+                 "tempo_total_ms": round(total * 1000, 3), "tempo_proprio_ms": round(proprio * 1000, 3)}
+                for linha, (execucoes, total, proprio) in sorted(self.linhas.items())
+            ],
+            "funcoes": [
+                {"nome": nome, "chamadas": chamadas, "tempo_total_ms": round(total * 1000, 3)}
+                for nome, (chamadas, total) in sorted(self.funcoes.items())
+            ],
+        }
+
+
+class LinexInterpreter:
+    def __init__(self, motor=None, silencioso=False, max_linhas=MAX_LINHAS_SAIDA, max_bytes=MAX_BYTES_SAIDA,
+                 max_passos=MAX_PASSOS, tempo_limite=TEMPO_LIMITE, max_profundidade=MAX_PROFUNDIDADE,
+                 http_cache_ttl=HTTP_CACHE_TTL, perfilar=False, diretorio_arquivos=None):
+        self.motor = motor or MOTOR_PADRAO
+        if self.motor not in MOTORES:
+            raise ValueError(f"Motor Linex desconhecido: '{self.motor}'. Use um de: {', '.join(MOTORES)}.")
+        # Modo silencioso: só as saídas de print/calc, sem os avisos de status
+        self.silencioso = silencioso
+        self.max_linhas = max_linhas
+        self.max_bytes = max_bytes
+        self.max_passos = max_passos
+        self.tempo_limite = tempo_limite
+        self.max_profundidade = max_profundidade
+        self.http_cache_ttl = http_cache_ttl
+        self._cache_http = {}  # url -> (expira_em, texto), zerado a cada execução
+        # save/load: arquivos em memória, recriados a cada execução
+        self.diretorio_arquivos = diretorio_arquivos
+        self.arquivos = ArquivosVirtuais(diretorio_arquivos)
+        self.passos = 0
+        self.profundidade = 0
+        self.prazo = None
+        self._proxima_verificacao = 0
+        # Variáveis: cada nome tem um slot fixo, resolvido na compilação
+        self.tabela = TabelaSimbolos()
+        self._tabela_propria = True
+        self.slots = []
+        self._extras = {}  # variáveis vindas de `load` que o programa não usa
+        self.funcoes = {}
+        self.entrada_simulada = []
+        self.entrada_index = 0
+        self.output = []
+        self.safe_builtins = SAFE_BUILTINS
+        # Perfil: troca o laço de blocos por uma versão instrumentada só nesta
+        # instância, então sem `perfilar` não há custo nenhum. Mede por linha
+        # do fonte, por isso sempre usa o motor de árvore.
+        self.perfilar = perfilar
+        self.perfil = None
+        if perfilar:
+            self._executar_bloco = self._executar_bloco_perfilado
+
+    @property
+    def variaveis(self):
+        """Cópia das variáveis definidas, como dicionário nome -> valor."""
+        resultado = dict(self._extras)
+        for nome, i in self.tabela.indices.items():
+            if nome.startswith("#"):
+                continue  # slots internos (invariantes içados de loops)
+            if i < len(self.slots) and self.slots[i] is not _INDEFINIDO:
+                resultado[nome] = _materializar(self.slots[i])
+        return resultado
+
+    def _tabela_editavel(self):
+        """A tabela do programa é compartilhada (cache); copia antes de alterar."""
+        if not self._tabela_propria:
+            self.tabela = self.tabela.copia()
+            self._tabela_propria = True
+        return self.tabela
+
+    def _ajustar_slots(self):
+        faltam = len(self.tabela) - len(self.slots)
+        if faltam > 0:
+            self.slots.extend([_INDEFINIDO] * faltam)
+
+    def definir(self, nome, valor):
+        i = self.tabela.indices.get(nome)
+        if i is None:
+            self._extras[nome] = valor
+        else:
+            self.slots[i] = valor
+
+    def obter(self, nome, padrao=None):
+        i = self.tabela.indices.get(nome)
+        if i is None:
+            return self._extras.get(nome, padrao)
+        valor = self.slots[i]
+        return padrao if valor is _INDEFINIDO else _materializar(valor)
+
+    def _avaliar_expressao(self, expressao):
+        """Avalia uma expressão com suporte a concatenação, variáveis e funções."""
+        tabela = self.tabela if expressao in self.tabela._expressoes else self._tabela_editavel()
+        compilada = tabela.expressao(expressao)
+        self._ajustar_slots()
+        return compilada.avaliar(self.slots)
+
+    def _avaliar_condicao(self, expressao):
+        """Avalia uma condição de forma segura."""
+        return bool(self._avaliar_expressao(expressao))
+
+    def _iniciar_orcamento(self):
+        self.passos = 0
+        self.profundidade = 0
+        self.prazo = time.monotonic() + self.tempo_limite if self.tempo_limite else None
+        self._proxima_verificacao = 0
+
+    def _verificar_limites(self):
+        """Chamado a cada `_INTERVALO_VERIFICACAO` passos (e no último permitido)."""
+        if self.passos > self.max_passos:
+            raise LimiteExcedido(f"Limite de {self.max_passos} passos de execução excedido.")
+        if self.prazo is not None and time.monotonic() > self.prazo:
+            raise LimiteExcedido(f"Tempo limite de execução ({self.tempo_limite:g}s) excedido.")
+        self._proxima_verificacao = min(self.passos + _INTERVALO_VERIFICACAO, self.max_passos + 1)
+
+    def _executar_bloco(self, nos):
+        """Executa uma lista de nós já compilados (programa, função, if, loop)."""
+        # A entrada no bloco conta como um passo: assim até um loop vazio gasta orçamento.
+        self.passos += 1
+        if self.passos >= self._proxima_verificacao:
+            self._verificar_limites()
+        for no in nos:
+            self.passos += 1
+            if self.passos >= self._proxima_verificacao:
+                self._verificar_limites()
+            try:
+                no.executar(self)
+            except Exception as e:
+                raise _anotar_erro(e, no.linha)
+
+    def _executar_bloco_perfilado(self, nos):
+        """`_executar_bloco` com contagem e tempo por linha (modo `perfilar`)."""
+        self.passos += 1
+        if self.passos >= self._proxima_verificacao:
+            self._verificar_limites()
+        perfil = self.perfil
+        relogio = time.perf_counter
+        for no in nos:
+            self.passos += 1
+            if self.passos >= self._proxima_verificacao:
+                self._verificar_limites()
+            eh_chamada = type(no) is NoCall
+            perfil.entrar(no.linha)
+            inicio = relogio()
+            if eh_chamada:
+                perfil.chamada(no.nome, 0.0, False)
+            try:
+                no.executar(self)
+            except Exception as e:
+                raise _anotar_erro(e, no.linha)
+            finally:
+                decorrido = relogio() - inicio
+                if eh_chamada:
+                    perfil.chamada(no.nome, decorrido, True)
+                perfil.sair(no, decorrido)
+
+    def executar_programa(self, programa, input_data=None, saida=None):
+        """Executa um programa já compilado por `compilar`.
+
+        `saida` pode ser qualquer objeto com `append` (ex.: `SaidaFila`);
+        por padrão as linhas vão para uma `SaidaLimitada`.
+        """
+        self.tabela = programa.tabela
+        self._tabela_propria = False
+        self.slots = [_INDEFINIDO] * len(programa.tabela)
+        self._extras = {}
+        self.funcoes = {}
+        if saida is None:
+            saida = SaidaLimitada(self.max_linhas, self.max_bytes)
+        self.output = saida
+        if input_data:
+            self.entrada_simulada = list(input_data)
+        self.entrada_index = 0
+        self._cache_http = {}
+        self.arquivos = ArquivosVirtuais(self.diretorio_arquivos)
+        self._iniciar_orcamento()
+        if self.perfilar:
+            self.perfil = PerfilLinex()
+
+        try:
+            self.output.append("✅ Projeto iniciado com sucesso!")
+            if self.perfilar:
+                inicio = time.perf_counter()
+                try:
+                    self._executar_bloco(programa.nos)
+                finally:
+                    self.perfil.tempo_total = time.perf_counter() - inicio
+            elif self.motor == "vm":
+                _executar_bytecode(self, programa.bytecode())
+            else:
+                self._executar_bloco(programa.nos)
+            self.output.append("\n**--- Fim da Execução ---**")
+            if isinstance(self.output, SaidaLimitada):
+                return self.output.linhas()
+            return self.output
+        except Exception as e:
+            return [f"❌ Erro na execução: {str(e)}"]
+        finally:
+            # Os `save` feitos até aqui vão para o disco uma única vez, no fim.
+            try:
+                self.arquivos.descarregar()
+            except OSError:
+                pass
+
+    def executar_incremental(self, programa, codigo, input_data=None, anteriores=None):
+        """Executa reaproveitando o estado de uma execução anterior do mesmo documento.
+
+        `anteriores` é o dicionário de checkpoints devolvido pela execução
+        anterior (hash do prefixo -> `_Checkpoint`). Retoma do último comando
+        do nível principal cujo prefixo do fonte não mudou e devolve
+        (linhas de saída, novos checkpoints, comandos reaproveitados).
+        Usa sempre o motor de árvore.
+        """
+        anteriores = anteriores or {}
+        hashes = _hashes_prefixos(codigo, programa.fins, input_data, self.silencioso)
+        retomar = 0
+        for i in range(len(hashes) - 1, -1, -1):
+            if hashes[i] in anteriores:
+                retomar = i + 1
+                break
+
+        self.tabela = programa.tabela
+        self._tabela_propria = False
+        self.slots = [_INDEFINIDO] * len(programa.tabela)
+        self._extras = {}
+        self.funcoes = {}
+        self.entrada_simulada = list(input_data) if input_data else []
+        self.entrada_index = 0
+        self._cache_http = {}
+        self.arquivos = ArquivosVirtuais(self.diretorio_arquivos)
+        self._iniciar_orcamento()
+        destino = SaidaLimitada(self.max_linhas, self.max_bytes)
+        self.output = gravador = _SaidaGravada(destino, MAX_BYTES_CHECKPOINTS)
+        caminhos = _caminhos_funcoes(programa.nos)
+        alteram = _comandos_que_alteram(programa.nos)
+        novos = {}
+        # id(valor vivo) -> cópia já feita por um checkpoint anterior (memo do deepcopy)
+        copiados = {}
+
+        try:
+            self.output.append("✅ Projeto iniciado com sucesso!")
+            for i in range(retomar):
+                checkpoint = anteriores[hashes[i]]
+                gravador.reproduzir(checkpoint.saida)
+                gravador.bytes += checkpoint.tamanho
+                novos[hashes[i]] = checkpoint
+            if retomar:
+                anteriores[hashes[retomar - 1]].restaurar(self, programa)
+            gravador.novo_trecho()
+
+            self.passos += 1
+            for i in range(retomar, len(programa.nos)):
+                no = programa.nos[i]
+                self.passos += 1
+                if self.passos >= self._proxima_verificacao:
+                    self._verificar_limites()
+                try:
+                    no.executar(self)
+                except Exception as e:
+                    raise _anotar_erro(e, no.linha)
+                trecho = gravador.fechar_trecho()
+                if trecho is not None and len(novos) < MAX_CHECKPOINTS:
+                    if alteram[i]:
+                        copiados = {}  # o comando pode ter mudado valores no lugar: copia tudo
+                    variaveis, tamanho = _copiar_estado(self, copiados, gravador)
+                    if variaveis is not None:
+                        novos[hashes[i]] = _Checkpoint(self, caminhos, trecho, variaveis, tamanho)
+                    # Copiar o estado também gasta o tempo da execução
+                    self._verificar_limites()
+            self.output.append("\n**--- Fim da Execução ---**")
+            return destino.linhas(), novos, retomar
+        except Exception as e:
+            return [f"❌ Erro na execução: {str(e)}"], novos, retomar
+        finally:
+            try:
+                self.arquivos.descarregar()
+            except OSError:
+                pass
+
+    def executar_trecho(self, codigo, input_data=None):
+        """Executa comandos soltos sobre o estado atual do interpretador (REPL).
+
+        Variáveis, funções e arquivos da chamada anterior continuam valendo;
+        só os comandos de `codigo` são compilados e executados, com orçamento
+        de passos e de tempo próprio. Se um comando falhar, o que os
+        anteriores do trecho fizeram fica, como num terminal. Usa sempre o
+        motor de árvore: as funções da VM apontam para posições do bytecode
+        de uma execução, e aqui cada trecho é compilado à parte.
+        """
+        try:
+            nos = compilar_trecho(codigo, self._tabela_editavel())
+        except SyntaxError as e:
+            return [f"❌ Erro na execução: {str(e)}"]
+        self._ajustar_slots()
+        self.output = SaidaLimitada(self.max_linhas, self.max_bytes)
+        self.entrada_simulada = list(input_data) if input_data else []
+        self.entrada_index = 0
+        self._iniciar_orcamento()
+
+        try:
+            self._executar_bloco(nos)
+            return self.output.linhas()
+        except Exception as e:
+            return self.output.linhas() + [f"❌ Erro na execução: {str(e)}"]
+        finally:
+            try:
+                self.arquivos.descarregar()
+            except OSError:
+                pass
+
+    def executar_codigo_lineax(self, codigo, input_data=None, saida=None):
+        programa, erro = _compilar_ou_erro(codigo)
+        if erro is not None:
+            return erro
+        return self.executar_programa(programa, input_data, saida)
+
+
+def _compilar_ou_erro(codigo):
+    """(programa, None) ou (None, linhas de saída com o erro de compilação)."""
+    try:
+        return cache_compilacao.obter(codigo), None
+    except ProjetoNaoIniciado as e:
+        return None, [str(e)]
+    except SyntaxError as e:
+        return None, [f"❌ Erro na execução: {str(e)}"]
+
+
+# =============================================================================
+# Erros
+# =============================================================================
+class ProjetoNaoIniciado(SyntaxError):
+    """O código não começa com 'linex init project'."""
+
+
+class LimiteExcedido(RuntimeError):
+    """A execução passou de um dos limites configurados (saída, tempo, passos...)."""
+
+
+class ExecucaoCancelada(RuntimeError):
+    """Quem consumia a execução (ex.: cliente do streaming) desistiu dela."""
+
+
+def _anotar_erro(e, linha):
+    """Anexa o número da linha ao erro uma única vez (o nó mais interno vence)."""
+    if getattr(e, "linha_linex", None) is not None:
+        return e
+    novo = None
+    if isinstance(e, (SyntaxError, ValueError, NameError, FileNotFoundError, LimiteExcedido, ExecucaoCancelada)):
+        try:
+            novo = type(e)(f"{e} (linha {linha})")
+        except TypeError:
+            # Exceções com construtor próprio (ex.: JSONDecodeError)
+            novo = None
+    if novo is None:
+        novo = Exception(f"Erro inesperado: {e} (linha {linha})")
+    novo.linha_linex = linha
+    return novo
+
+
+# =============================================================================
+# Nós da árvore (AST) da Linex
+# =============================================================================
+class No:
+    """Nó base: guarda a linha do código-fonte para mensagens de erro."""
+    __slots__ = ("linha",)
+
+    def __init__(self, linha):
+        self.linha = linha
+
+    def executar(self, interp):
+        raise NotImplementedError
+
+
+class NoPrint(No):
+    __slots__ = ("expr",)
+
+    def __init__(self, linha, expr):
+        super().__init__(linha)
+        self.expr = expr
+
+    def executar(self, interp):
+        conteudo = self.expr.avaliar(interp.slots)
+        interp.output.append(f"📢 {conteudo}")
+
+
+class NoVar(No):
+    __slots__ = ("nome", "slot", "expr")
+
+    def __init__(self, linha, nome, slot, expr):
+        super().__init__(linha)
+        self.nome = nome
+        self.slot = slot
+        self.expr = expr
+
+    def executar(self, interp):
+        interp.slots[self.slot] = self.expr.avaliar(interp.slots)
+        if not interp.silencioso:
+            interp.output.append(f"✅ Variável '{self.nome}' criada/atualizada.")
+
+
+class NoAnexar(NoVar):
+    """`var s = s + a + b`: com `s` texto, acrescenta os pedaços numa `_Corda`.
+
+    Para outros tipos (número, lista) cai na expressão completa, igual ao `var`.
+    """
+    __slots__ = ("partes",)
+
+    def __init__(self, linha, nome, slot, expr, partes):
+        super().__init__(linha, nome, slot, expr)
+        self.partes = partes  # Expressao de cada termo somado depois de `s`
+
+    def executar(self, interp):
+        slots = interp.slots
+        if slots[self.slot] is _INDEFINIDO:
+            raise ValueError(f"Expressão inválida ou variável não definida: '{self.expr.fonte}'")
+        # Os termos podem ler `s` (o que junta a corda), então vêm antes
+        valores = [parte.avaliar(slots) for parte in self.partes]
+        atual = slots[self.slot]
+        if type(atual) is _Corda:
+            corda = atual
+        elif isinstance(atual, str):
+            corda = slots[self.slot] = _Corda(atual)
+        else:
+            NoVar.executar(self, interp)
+            return
+        corda.anexar(["" if v is None else str(v) for v in valores])
+        if not interp.silencioso:
+            interp.output.append(f"✅ Variável '{self.nome}' criada/atualizada.")
+
+
+class NoInput(No):
+    __slots__ = ("nome", "slot")
+
+    def __init__(self, linha, nome, slot):
+        super().__init__(linha)
+        self.nome = nome
+        self.slot = slot
+
+    def executar(self, interp):
+        if interp.entrada_index < len(interp.entrada_simulada):
+            valor_input = interp.entrada_simulada[interp.entrada_index]
+            interp.entrada_index += 1
+        else:
+            valor_input = "Entrada do usuário"
+        interp.slots[self.slot] = valor_input
+        if not interp.silencioso:
+            interp.output.append(f"⌨️ Variável '{self.nome}' recebeu entrada '{valor_input}'")
+
+
+class NoCalc(No):
+    __slots__ = ("expr",)
+
+    def __init__(self, linha, expr):
+        super().__init__(linha)
+        self.expr = expr
+
+    def executar(self, interp):
+        resultado = self.expr.avaliar(interp.slots)
+        interp.output.append(f"🧮 Resultado: {resultado}")
+
+
+class NoSave(No):
+    __slots__ = ("arquivo",)
+
+    def __init__(self, linha, arquivo):
+        super().__init__(linha)
+        self.arquivo = arquivo
+
+    def executar(self, interp):
+        interp.arquivos.gravar(self.arquivo, interp.variaveis)
+        if not interp.silencioso:
+            interp.output.append(f"💾 Variáveis salvas em {self.arquivo}.json")
+
+
+class NoLoad(No):
+    __slots__ = ("arquivo",)
+
+    def __init__(self, linha, arquivo):
+        super().__init__(linha)
+        self.arquivo = arquivo
+
+    def executar(self, interp):
+        for nome, valor in interp.arquivos.ler(self.arquivo).items():
+            interp.definir(nome, valor)
+        if not interp.silencioso:
+            interp.output.append(f"📂 Variáveis carregadas de {self.arquivo}.json")
+
+
+class NoJsonLoad(No):
+    __slots__ = ("origem", "destino", "slot_origem", "slot_destino")
+
+    def __init__(self, linha, origem, destino, slot_origem, slot_destino):
+        super().__init__(linha)
+        self.origem = origem
+        self.destino = destino
+        self.slot_origem = slot_origem
+        self.slot_destino = slot_destino
+
+    def executar(self, interp):
+        texto = _materializar(interp.slots[self.slot_origem])
+        if texto is _INDEFINIDO:
+            raise NameError(f"Variável de origem '{self.origem}' não definida.")
+        try:
+            if isinstance(texto, str) and len(texto) >= JSON_PREGUICOSO_MIN_BYTES:
+                interp.slots[self.slot_destino] = _JsonPreguicoso(texto, self.origem)
+            else:
+                interp.slots[self.slot_destino] = json.loads(texto)
+            if not interp.silencioso:
+                interp.output.append(f"📄 Conteúdo da variável '{self.origem}' carregado em formato JSON para '{self.destino}'.")
+        except json.JSONDecodeError:
+            raise ValueError(f"Conteúdo da variável '{self.origem}' não é um JSON válido.")
+
+
+class NoHttpGet(No):
+    """`http get "url" to var` — aceita vários pares separados por vírgula,
+    que são baixados em paralelo."""
+    __slots__ = ("pedidos",)
+
+    def __init__(self, linha, pedidos):
+        super().__init__(linha)
+        self.pedidos = pedidos  # lista de (url, nome_variavel, slot)
+
+    def executar(self, interp):
+        # Não espera pela rede além do que resta do tempo limite da execução
+        timeout = HTTP_TIMEOUT
+        if interp.prazo is not None:
+            timeout = max(0.1, min(timeout, interp.prazo - time.monotonic()))
+
+        agora = time.monotonic()
+        respostas = {}
+        pendentes = []
+        for url, _, _ in self.pedidos:
+            em_cache = interp._cache_http.get(url)
+            if em_cache is not None and em_cache[0] > agora:
+                respostas[url] = em_cache[1]
+            elif url not in pendentes:
+                pendentes.append(url)
+
+        erros = {}
+        if len(pendentes) == 1:
+            try:
+                respostas[pendentes[0]] = _baixar(pendentes[0], timeout)
+            except requests.exceptions.RequestException as e:
+                erros[pendentes[0]] = e
+        elif pendentes:
+            futuros = {url: _executor_http().submit(_baixar, url, timeout) for url in pendentes}
+            for url, futuro in futuros.items():
+                try:
+                    respostas[url] = futuro.result()
+                except requests.exceptions.RequestException as e:
+                    erros[url] = e
+
+        if interp.http_cache_ttl:
+            for url in pendentes:
+                if url in respostas:
+                    interp._cache_http[url] = (agora + interp.http_cache_ttl, respostas[url])
+
+        for url, destino, slot in self.pedidos:
+            if url in erros:
+                interp.slots[slot] = None
+                continue
+            interp.slots[slot] = respostas[url]
+            if not interp.silencioso:
+                interp.output.append(f"🌐 Requisição GET para `{url}` bem-sucedida. Conteúdo salvo em `{destino}`.")
+        for url, e in erros.items():
+            raise RuntimeError(f"Erro na requisição para `{url}`: {e}")
+
+
+class NoCall(No):
+    __slots__ = ("nome",)
+
+    def __init__(self, linha, nome):
+        super().__init__(linha)
+        self.nome = nome
+
+    def executar(self, interp):
+        if self.nome not in interp.funcoes:
+            raise NameError(f"Função '{self.nome}' não definida.")
+        if interp.profundidade >= interp.max_profundidade:
+            raise LimiteExcedido(f"Profundidade máxima de chamadas ({interp.max_profundidade}) excedida em '{self.nome}'.")
+        if not interp.silencioso:
+            interp.output.append(f"➡️ Chamando função '{self.nome}'...")
+        interp.profundidade += 1
+        try:
+            interp._executar_bloco(interp.funcoes[self.nome])
+        finally:
+            interp.profundidade -= 1
+        if not interp.silencioso:
+            interp.output.append(f"⬅️ Finalizado função '{self.nome}'.")
+
+
+class NoFunc(No):
+    __slots__ = ("nome", "corpo")
+
+    def __init__(self, linha, nome, corpo):
+        super().__init__(linha)
+        self.nome = nome
+        self.corpo = corpo
+
+    def executar(self, interp):
+        interp.funcoes[self.nome] = self.corpo
+        if not interp.silencioso:
+            interp.output.append(f"📦 Função '{self.nome}' definida.")
+
+
+class NoIf(No):
+    __slots__ = ("condicao", "corpo_if", "corpo_else", "decidido")
+
+    def __init__(self, linha, condicao, corpo_if, corpo_else):
+        super().__init__(linha)
+        self.condicao = condicao
+        self.corpo_if = corpo_if
+        self.corpo_else = corpo_else
+        self.decidido = None  # True/False quando o otimizador conhece a condição
+
+    def executar(self, interp):
+        if self.decidido is not None:
+            condicao_eh_verdadeira = self.decidido
+        else:
+            try:
+                condicao_eh_verdadeira = bool(self.condicao.avaliar(interp.slots))
+            except Exception as e:
+                erro = type(e)(f"Erro na condição do 'if': {e} (linha {self.linha})")
+                erro.linha_linex = self.linha
+                raise erro
+
+        if condicao_eh_verdadeira:
+            if not interp.silencioso:
+                interp.output.append(f"✅ Condição verdadeira. Executando bloco 'if'...")
+            interp._executar_bloco(self.corpo_if)
+        else:
+            if not interp.silencioso:
+                interp.output.append(f"❌ Condição falsa. Pulando para o bloco 'else'...")
+            interp._executar_bloco(self.corpo_else)
+
+
+class NoLoop(No):
+    __slots__ = ("vezes", "corpo", "icados")
+
+    def __init__(self, linha, vezes, corpo):
+        super().__init__(linha)
+        self.vezes = vezes
+        self.corpo = corpo
+        self.icados = ()  # slots das subexpressões içadas pelo otimizador
+
+    def executar(self, interp):
+        if not interp.silencioso:
+            interp.output.append(f"🔄 Iniciando loop por {self.vezes} vezes...")
+        # Invariantes são recalculados (sob demanda) a cada entrada no loop
+        for slot in self.icados:
+            interp.slots[slot] = _INDEFINIDO
+        for _ in range(self.vezes):
+            interp._executar_bloco(self.corpo)
+        if not interp.silencioso:
+            interp.output.append("✅ Loop finalizado.")
+
+
+def _iterador_for(valor, fonte):
+    """Iterador do `for each` direto sobre o valor, sem cópia: os itens de
+    uma lista (ou vetor) ou os pares (chave, valor) de um objeto JSON."""
+    if isinstance(valor, dict):
+        return iter(valor.items()), len(valor)
+    if isinstance(valor, (list, tuple, Vetor)):
+        return iter(valor), len(valor)
+    raise TypeError(f"'for each' espera uma lista ou um objeto JSON em '{fonte}', não {type(valor).__name__}")
+
+
+class NoForEach(No):
+    """`for each item in lista begin ... end for`; o número de voltas vem dos dados."""
+    __slots__ = ("nome", "slot", "iteravel", "corpo", "icados")
+
+    def __init__(self, linha, nome, slot, iteravel, corpo):
+        super().__init__(linha)
+        self.nome = nome
+        self.slot = slot
+        self.iteravel = iteravel
+        self.corpo = corpo
+        self.icados = ()  # slots das subexpressões içadas pelo otimizador
+
+    def executar(self, interp):
+        iterador, quantidade = _iterador_for(self.iteravel.avaliar(interp.slots), self.iteravel.fonte)
+        if not interp.silencioso:
+            interp.output.append(f"🔄 Percorrendo {quantidade} itens de '{self.iteravel.fonte}'...")
+        for slot in self.icados:
+            interp.slots[slot] = _INDEFINIDO
+        for item in iterador:
+            interp.slots[self.slot] = item
+            interp._executar_bloco(self.corpo)
+        if not interp.silencioso:
+            interp.output.append("✅ For each finalizado.")
+
+
+class ProgramaLinex:
+    """Resultado da compilação: a árvore de nós do programa, pronta para executar."""
+
+    def __init__(self, nos, tabela, tamanho_fonte=0, fins=None):
+        self.nos = nos
+        self.tabela = tabela
+        self.tamanho_fonte = tamanho_fonte
+        # Última linha do fonte de cada comando do nível principal (o `end`
+        # dos blocos), usada pela reexecução incremental.
+        self.fins = fins or []
+        self._bytecode = None
+
+    def bytecode(self):
+        """Versão em bytecode do programa, gerada na primeira vez que é pedida."""
+        if self._bytecode is None:
+            self._bytecode = gerar_bytecode(self.nos)
+        return self._bytecode
+
+    def contar_nos(self):
+        total = 0
+        pendentes = list(self.nos)
+        while pendentes:
+            no = pendentes.pop()
+            total += 1
+            for atributo in ("corpo", "corpo_if", "corpo_else"):
+                pendentes.extend(getattr(no, atributo, ()))
+        return total
+
+    def tamanho_estimado(self):
+        """Estimativa (em bytes) da memória ocupada pela árvore compilada."""
+        return self.tamanho_fonte + self.contar_nos() * _BYTES_POR_NO
+
+    def despejar(self):
+        """Listagem legível do programa (já otimizado), útil para depuração."""
+        linhas = []
+        _despejar_bloco(self.nos, 0, linhas)
+        return "\n".join(linhas)
+
+
+# =============================================================================
+# Parser: transforma o código-fonte em árvore uma única vez
+# =============================================================================
+_RE_PEDIDO_HTTP = re.compile(r'\s*"(.*?)"\s+to\s+(\w+)\s*(,|$)', re.IGNORECASE)
+# Cabeçalhos de bloco (usados também pelos diagnósticos da IDE)
+_RE_FUNC = re.compile(r"(\w+)\s+begin", re.IGNORECASE)
+_RE_IF = re.compile(r"(.*)\s+begin", re.IGNORECASE)
+_RE_LOOP = re.compile(r"(\d+)\s+begin", re.IGNORECASE)
+_RE_FOR = re.compile(r"each\s+(\w+)\s+in\s+(.*)\s+begin", re.IGNORECASE)
+_USO_BLOCOS = {
+    "func": "Uso incorreto. Formato: func <nome_funcao> begin",
+    "if": "Uso incorreto. Formato: if <condicao> begin",
+    "loop": "Uso incorreto. Formato: loop <numero_vezes> begin",
+    "for": "Uso incorreto. Formato: for each <item> in <lista_ou_objeto> begin",
+}
+_RE_VAR = re.compile(r"(\w+)\s*=\s*(.*)")
+_RE_VALOR_CALC = re.compile(r"calc\b\s*(.*)", re.IGNORECASE)
+_RE_ARQUIVO = re.compile(r'"(.*)"')
+_RE_JSON_LOAD = re.compile(r"load\s+(\w+)\s+to\s+(\w+)", re.IGNORECASE)
+_RE_HTTP_GET = re.compile(r"get\s+(.*)", re.IGNORECASE)
+
+# Palavra-chave do comando -> tratador(parser, linha_num, argumentos) que devolve o nó
+_COMANDOS = {}
+
+
+def registrar_comando(palavra):
+    """Decorador que registra o tratador do comando `palavra`.
+
+    O parser escolhe o tratador pela primeira palavra da linha, com uma
+    consulta ao dicionário. Plugins usam o mesmo decorador para acrescentar
+    comandos: basta devolver um `No` com `executar(interp)` (a VM roda nós
+    que não conhece com EXEC).
+    """
+    def registrar(tratador):
+        _COMANDOS[palavra.lower()] = tratador
+        return tratador
+    return registrar
+
+
+def _erro_sintaxe(mensagem, linha_num):
+    return SyntaxError(f"{mensagem} (linha {linha_num})")
+
+
+def _parse_pedidos_http(texto):
+    """Lê `"url" to var, "url2" to var2` e devolve [(url, var), ...] ou None."""
+    pedidos = []
+    posicao = 0
+    while posicao < len(texto):
+        match = _RE_PEDIDO_HTTP.match(texto, posicao)
+        if not match:
+            return None
+        pedidos.append((match.group(1), match.group(2)))
+        posicao = match.end()
+        if not match.group(3):
+            break
+    return pedidos if posicao >= len(texto.rstrip()) else None
+
+
+def _termos_anexados(arvore, nome):
+    """Para `nome + a + b` devolve as ASTs [a, b]; senão None."""
+    termos = []
+    no = arvore.body
+    while isinstance(no, ast.Call) and isinstance(no.func, ast.Name) and no.func.id == "_somar":
+        termos.append(no.args[1])
+        no = no.args[0]
+    if termos and isinstance(no, ast.Name) and no.id == nome:
+        return termos[::-1]
+    return None
+
+
+def _eh_fim(texto, bloco):
+    """Verifica se a linha é `end <bloco>`."""
+    partes = texto.lower().split()
+    return len(partes) >= 2 and partes[0] == "end" and partes[1] == bloco
+
+
+class _Parser:
+    def __init__(self, linhas, tabela):
+        # linhas: lista de (numero_da_linha_no_fonte, texto_sem_espacos)
+        self.linhas = linhas
+        self.tabela = tabela
+        self.pos = 0
+        self.fins = []  # última linha de cada comando do nível principal
+
+    def parse_bloco(self, fim=None, aceita_else=False):
+        """Lê comandos até encontrar `end <fim>` (ou `else`, se permitido)."""
+        nos = []
+        while self.pos < len(self.linhas):
+            linha_num, texto = self.linhas[self.pos]
+            if fim is not None and _eh_fim(texto, fim):
+                return nos, "end"
+            if aceita_else and texto.split(maxsplit=1)[0].lower() == "else":
+                return nos, "else"
+            self.pos += 1
+            nos.append(self.parse_comando(linha_num, texto))
+            if fim is None:
+                self.fins.append(self.linhas[self.pos - 1][0])
+        return nos, None
+
+    def _parse_corpo(self, bloco, linha_num, descricao, aceita_else=False):
+        corpo, terminador = self.parse_bloco(bloco, aceita_else)
+        if terminador is None:
+            raise _erro_sintaxe(f"{descricao} não fechado com 'end {bloco}'", linha_num)
+        self.pos += 1
+        return corpo, terminador
+
+    def expressao(self, fonte, linha_num):
+        try:
+            return self.tabela.expressao(fonte)
+        except SyntaxError as e:
+            raise _erro_sintaxe(e, linha_num)
+
+    def parse_comando(self, linha_num, texto):
+        partes = texto.split(maxsplit=1)
+        comando_principal = partes[0].lower()
+        tratador = _COMANDOS.get(comando_principal)
+        if tratador is None:
+            raise _erro_sintaxe(f"Comando desconhecido: '{comando_principal}'", linha_num)
+        return tratador(self, linha_num, partes[1] if len(partes) > 1 else "")
+
+
+@registrar_comando("func")
+def _comando_func(parser, linha_num, argumentos):
+    match = _RE_FUNC.match(argumentos)
+    if not match: raise _erro_sintaxe(_USO_BLOCOS["func"], linha_num)
+    nome_funcao = match.groups()[0]
+    corpo, _ = parser._parse_corpo("func", linha_num, f"Bloco da função '{nome_funcao}'")
+    return NoFunc(linha_num, nome_funcao, corpo)
+
+
+@registrar_comando("if")
+def _comando_if(parser, linha_num, argumentos):
+    match = _RE_IF.match(argumentos)
+    if not match: raise _erro_sintaxe(_USO_BLOCOS["if"], linha_num)
+    corpo_if, terminador = parser._parse_corpo("if", linha_num, "Bloco 'if'", aceita_else=True)
+    corpo_else = []
+    if terminador == "else":
+        corpo_else, _ = parser._parse_corpo("if", linha_num, "Bloco 'if'")
+    condicao = parser.expressao(match.groups()[0], linha_num)
+    return NoIf(linha_num, condicao, corpo_if, corpo_else)
+
+
+@registrar_comando("loop")
+def _comando_loop(parser, linha_num, argumentos):
+    match = _RE_LOOP.match(argumentos)
+    if not match: raise _erro_sintaxe(_USO_BLOCOS["loop"], linha_num)
+    corpo, _ = parser._parse_corpo("loop", linha_num, "Bloco 'loop'")
+    return NoLoop(linha_num, int(match.groups()[0]), corpo)
+
+
+@registrar_comando("for")
+def _comando_for(parser, linha_num, argumentos):
+    match = _RE_FOR.match(argumentos)
+    if not match: raise _erro_sintaxe(_USO_BLOCOS["for"], linha_num)
+    nome_item, fonte = match.groups()
+    corpo, _ = parser._parse_corpo("for", linha_num, "Bloco 'for'")
+    iteravel = parser.expressao(fonte, linha_num)
+    return NoForEach(linha_num, nome_item, parser.tabela.slot(nome_item), iteravel, corpo)
+
+
+@registrar_comando("linex")
+def _comando_linex(parser, linha_num, argumentos):
+    sub_comando = argumentos.split(maxsplit=1)
+    if not sub_comando:
+        raise _erro_sintaxe("Uso incorreto. Formato: linex print <expressao>", linha_num)
+    if sub_comando[0].lower() == "print":
+        if len(sub_comando) < 2:
+            raise _erro_sintaxe("Uso incorreto. Formato: linex print <expressao>", linha_num)
+        return NoPrint(linha_num, parser.expressao(sub_comando[1], linha_num))
+    raise _erro_sintaxe(f"Sub-comando '{sub_comando[0]}' desconhecido para 'linex'.", linha_num)
+
+
+@registrar_comando("var")
+def _comando_var(parser, linha_num, argumentos):
+    match = _RE_VAR.match(argumentos)
+    if not match:
+        raise _erro_sintaxe("Uso incorreto. Formato: var nome = valor", linha_num)
+    nome_var, valor_expr = match.groups()
+    match_calc = _RE_VALOR_CALC.match(valor_expr.strip())
+    if match_calc:
+        valor_expr = match_calc.groups()[0]
+    slot = parser.tabela.slot(nome_var)
+    expr = parser.expressao(valor_expr, linha_num)
+    partes = _termos_anexados(expr.arvore, nome_var) if USAR_CORDAS else None
+    if partes:
+        partes = [parser.tabela.expressao(expr.fonte, ast.Expression(p)) for p in partes]
+        return NoAnexar(linha_num, nome_var, slot, expr, partes)
+    return NoVar(linha_num, nome_var, slot, expr)
+
+
+@registrar_comando("input")
+def _comando_input(parser, linha_num, argumentos):
+    if not argumentos:
+        raise _erro_sintaxe("Uso incorreto. Formato: input <nome_da_variavel>", linha_num)
+    nome_var = argumentos.strip()
+    return NoInput(linha_num, nome_var, parser.tabela.slot(nome_var))
+
+
+@registrar_comando("calc")
+def _comando_calc(parser, linha_num, argumentos):
+    if not argumentos:
+        raise _erro_sintaxe("Uso incorreto. Formato: calc <expressao>", linha_num)
+    return NoCalc(linha_num, parser.expressao(argumentos, linha_num))
+
+
+def _arquivo(classe, comando_principal, linha_num, argumentos):
+    match = _RE_ARQUIVO.match(argumentos)
+    if not match:
+        raise _erro_sintaxe(f"Uso incorreto. Formato: {comando_principal} \"nome_do_arquivo\"", linha_num)
+    return classe(linha_num, match.groups()[0])
+
+
+@registrar_comando("save")
+def _comando_save(parser, linha_num, argumentos):
+    return _arquivo(NoSave, "save", linha_num, argumentos)
+
+
+@registrar_comando("load")
+def _comando_load(parser, linha_num, argumentos):
+    return _arquivo(NoLoad, "load", linha_num, argumentos)
+
+
+@registrar_comando("json")
+def _comando_json(parser, linha_num, argumentos):
+    match = _RE_JSON_LOAD.match(argumentos)
+    if not match:
+        raise _erro_sintaxe("Uso incorreto. Formato: json load <variavel_string> to <variavel_json>", linha_num)
+    origem, destino = match.groups()
+    return NoJsonLoad(linha_num, origem, destino, parser.tabela.slot(origem), parser.tabela.slot(destino))
+
+
+@registrar_comando("http")
+def _comando_http(parser, linha_num, argumentos):
+    match = _RE_HTTP_GET.match(argumentos)
+    pedidos = _parse_pedidos_http(match.groups()[0]) if match else None
+    if not pedidos:
+        raise _erro_sintaxe(
+            "Uso incorreto. Formato: http get \"url\" to <nome_variavel>[, \"url\" to <nome_variavel> ...]", linha_num
+        )
+    return NoHttpGet(linha_num, [(url, nome, parser.tabela.slot(nome)) for url, nome in pedidos])
+
+
+@registrar_comando("call")
+def _comando_call(parser, linha_num, argumentos):
+    if not argumentos:
+        raise _erro_sintaxe("Uso incorreto. Formato: call <nome_funcao>", linha_num)
+    return NoCall(linha_num, argumentos.strip())
+
+
+def _linhas_comandos(codigo):
+    """(número da linha, texto) das linhas com comando: sem vazias e comentários."""
+    return [
+        (numero, linha.strip())
+        for numero, linha in enumerate(codigo.splitlines(), start=1)
+        if linha.strip() and not linha.strip().startswith("#")
+    ]
+
+
+def compilar(codigo):
+    """Faz o parse do código Linex uma única vez e devolve um `ProgramaLinex`.
+
+    Levanta `ProjetoNaoIniciado` se faltar o cabeçalho e `SyntaxError` para
+    blocos mal formados ou comandos desconhecidos.
+    """
+    linhas = _linhas_comandos(codigo)
+    if not linhas or not linhas[0][1].lower().startswith("linex init project"):
+        raise ProjetoNaoIniciado("Erro: O projeto deve começar com 'linex init project'.")
+
+    tabela = TabelaSimbolos()
+    parser = _Parser(linhas[1:], tabela)
+    nos, _ = parser.parse_bloco()
+    programa = ProgramaLinex(nos, tabela, len(codigo), parser.fins)
+    if OTIMIZAR:
+        otimizar(programa)
+    if DUMP_OTIMIZADO:
+        print(programa.despejar(), file=sys.stderr)
+    return programa
+
+
+def compilar_trecho(codigo, tabela):
+    """Compila comandos soltos (sem o cabeçalho) sobre uma tabela já existente.
+
+    Usado pelo REPL: os nomes que já têm slot em `tabela` continuam no mesmo
+    slot, e os novos são acrescentados no fim. Um `linex init project` no
+    começo é aceito e ignorado, para o usuário poder colar um programa
+    inteiro. Devolve a lista de nós, já otimizada.
+    """
+    linhas = _linhas_comandos(codigo)
+    if linhas and linhas[0][1].lower().startswith("linex init project"):
+        linhas = linhas[1:]
+    nos, _ = _Parser(linhas, tabela).parse_bloco()
+    if OTIMIZAR:
+        _podar_ramos(nos)
+        _icar_invariantes(nos, tabela)
+    return nos
+
+
+# =============================================================================
+# Otimizador: ramos mortos e hoisting de invariantes de loop
+# =============================================================================
+# (a dobra de constantes acontece antes, em `_analisar_expressao`)
+def _expressoes_do_no(no):
+    """Pares (atributo, Expressao) avaliados diretamente pelo nó."""
+    if isinstance(no, (NoVar, NoPrint, NoCalc)):
+        return [("expr", no.expr)]
+    if isinstance(no, NoIf) and no.decidido is None:
+        return [("condicao", no.condicao)]
+    if isinstance(no, NoForEach):
+        return [("iteravel", no.iteravel)]
+    return []
+
+
+def _podar_ramos(nos):
+    """Descarta o ramo de um `if` cuja condição é conhecida na compilação.
+
+    O nó continua existindo para manter as mensagens de status da execução.
+    """
+    for no in nos:
+        if isinstance(no, NoIf):
+            if no.decidido is None and no.condicao.constante is not _INDEFINIDO:
+                no.decidido = bool(no.condicao.constante)
+                if no.decidido:
+                    no.corpo_else = []
+                else:
+                    no.corpo_if = []
+            _podar_ramos(no.corpo_if)
+            _podar_ramos(no.corpo_else)
+        elif isinstance(no, NoLoop):
+            if no.vezes == 0:
+                no.corpo = []
+            _podar_ramos(no.corpo)
+        elif isinstance(no, (NoFunc, NoForEach)):
+            _podar_ramos(no.corpo)
+
+
+def _tem_efeito(arvore):
+    """Chamada que pode alterar estado (random, métodos como `lista.append`)."""
+    return any(
+        isinstance(n, ast.Call) and not _chamada_pura(n.func)
+        and not (isinstance(n.func, ast.Name) and n.func.id == "_icado")
+        for n in ast.walk(arvore)
+    )
+
+
+def _analisar_corpo_loop(nos, escritos, sitios):
+    """Coleta as variáveis escritas e as expressões de um corpo de loop.
+
+    Devolve False se o corpo tiver efeitos que o otimizador não acompanha
+    (`call` pode escrever qualquer variável, `load` idem, e chamadas
+    impuras como random ou métodos podem alterar objetos).
+    """
+    for no in nos:
+        if isinstance(no, (NoCall, NoLoad)):
+            return False
+        if isinstance(no, (NoVar, NoInput, NoForEach)):
+            escritos.add(no.nome)
+        elif isinstance(no, NoJsonLoad):
+            escritos.add(no.destino)
+        elif isinstance(no, NoHttpGet):
+            escritos.update(nome for _, nome, _ in no.pedidos)
+        for atributo, expressao in _expressoes_do_no(no):
+            if _tem_efeito(expressao.arvore):
+                return False
+            sitios.append((no, atributo, expressao))
+        for corpo in (getattr(no, "corpo_if", None), getattr(no, "corpo_else", None),
+                      no.corpo if isinstance(no, (NoLoop, NoForEach)) else None):
+            if corpo and not _analisar_corpo_loop(corpo, escritos, sitios):
+                return False
+    return True
+
+
+def _custo(node):
+    custo = 0
+    for n in ast.walk(node):
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == "_acessar":
+            custo += len(n.args[1].value)  # uma leitura por nome do caminho
+        elif isinstance(n, (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.Call)):
+            custo += 1
+    return custo
+
+
+class _Icador(ast.NodeTransformer):
+    """Marca como `_icado(slot, sub)` as maiores subexpressões invariantes."""
+
+    def __init__(self, tabela, escritos, icados):
+        self.tabela = tabela
+        self.escritos = escritos
+        self.icados = icados
+
+    def visit(self, node):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "_icado":
+            return node
+        if (isinstance(node, ast.expr) and _custo(node) >= 2 and _eh_puro(node)
+                and not any(isinstance(n, ast.Name) and n.id in self.escritos for n in ast.walk(node))):
+            # Nome com '#' nunca colide com uma variável do usuário
+            slot = self.tabela.slot(f"#icado{len(self.tabela)}")
+            self.icados.append(slot)
+            return ast.Call(ast.Name("_icado", ast.Load()), [ast.Constant(slot), node], [])
+        return self.generic_visit(node)
+
+
+def _icar_invariantes(nos, tabela):
+    """Tira de dentro dos loops as subexpressões que não mudam entre iterações.
+
+    O valor é calculado na primeira vez que a iteração precisa dele (e não na
+    entrada do loop), então um `if` que protege a expressão continua valendo.
+    """
+    for no in nos:
+        if isinstance(no, (NoLoop, NoForEach)):
+            # O item do `for each` muda a cada volta, como uma variável escrita no corpo
+            escritos, sitios = ({no.nome} if isinstance(no, NoForEach) else set()), []
+            varias_voltas = isinstance(no, NoForEach) or no.vezes > 1
+            if varias_voltas and _analisar_corpo_loop(no.corpo, escritos, sitios):
+                icados = []
+                for dono, atributo, expressao in sitios:
+                    quantos = len(icados)
+                    arvore = _Icador(tabela, escritos, icados).visit(copy.deepcopy(expressao.arvore))
+                    if len(icados) > quantos:
+                        setattr(dono, atributo, tabela.expressao(expressao.fonte, arvore))
+                no.icados = tuple(icados)
+            _icar_invariantes(no.corpo, tabela)
+        elif isinstance(no, NoIf):
+            _icar_invariantes(no.corpo_if, tabela)
+            _icar_invariantes(no.corpo_else, tabela)
+        elif isinstance(no, NoFunc):
+            _icar_invariantes(no.corpo, tabela)
+
+
+def otimizar(programa):
+    """Otimiza a árvore de `programa` no lugar (chamado por `compilar`)."""
+    _podar_ramos(programa.nos)
+    _icar_invariantes(programa.nos, programa.tabela)
+    programa._bytecode = None
+    return programa
+
+
+class _ParaTexto(ast.NodeTransformer):
+    """Desfaz `_somar`/`_atributo`/`_acessar` para o dump ficar parecido com o fonte."""
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name):
+            if node.func.id == "_somar":
+                return ast.BinOp(node.args[0], ast.Add(), node.args[1])
+            if node.func.id in _FUNCOES_OPERADORES:
+                return ast.BinOp(node.args[0], _FUNCOES_OPERADORES[node.func.id](), node.args[1])
+            if node.func.id == "_atributo":
+                return ast.Attribute(node.args[0], node.args[1].value, ast.Load())
+            if node.func.id == "_acessar":
+                resultado = node.args[0]
+                for nome in node.args[1].value:
+                    resultado = ast.Attribute(resultado, nome, ast.Load())
+                return resultado
+            if node.func.id == "_icado":
+                return ast.Call(ast.Name(f"icado#{node.args[0].value}", ast.Load()), [node.args[1]], [])
+        return node
+
+
+def _texto_expressao(expressao):
+    if expressao.arvore is None:
+        return expressao.fonte
+    return ast.unparse(_ParaTexto().visit(copy.deepcopy(expressao.arvore.body)))
+
+
+def _despejar_bloco(nos, nivel, linhas):
+    recuo = "  " * nivel
+    for no in nos:
+        prefixo = f"{no.linha:4d}  {recuo}"
+        if isinstance(no, NoVar):
+            anexo = "  # acumula em corda" if isinstance(no, NoAnexar) else ""
+            linhas.append(f"{prefixo}var {no.nome} = {_texto_expressao(no.expr)}{anexo}")
+        elif isinstance(no, NoPrint):
+            linhas.append(f"{prefixo}linex print {_texto_expressao(no.expr)}")
+        elif isinstance(no, NoCalc):
+            linhas.append(f"{prefixo}calc {_texto_expressao(no.expr)}")
+        elif isinstance(no, NoInput):
+            linhas.append(f"{prefixo}input {no.nome}")
+        elif isinstance(no, (NoSave, NoLoad)):
+            linhas.append(f'{prefixo}{"save" if isinstance(no, NoSave) else "load"} "{no.arquivo}"')
+        elif isinstance(no, NoJsonLoad):
+            linhas.append(f"{prefixo}json load {no.origem} to {no.destino}")
+        elif isinstance(no, NoHttpGet):
+            linhas.append(f"{prefixo}http get " + ", ".join(f'"{url}" to {nome}' for url, nome, _ in no.pedidos))
+        elif isinstance(no, NoCall):
+            linhas.append(f"{prefixo}call {no.nome}")
+        elif isinstance(no, NoFunc):
+            linhas.append(f"{prefixo}func {no.nome} begin")
+            _despejar_bloco(no.corpo, nivel + 1, linhas)
+            linhas.append(f"      {recuo}end func")
+        elif isinstance(no, NoIf):
+            if no.decidido is None:
+                linhas.append(f"{prefixo}if {_texto_expressao(no.condicao)} begin")
+            else:
+                linhas.append(f"{prefixo}if <{no.decidido}> begin  # condição constante, ramo morto removido")
+            _despejar_bloco(no.corpo_if, nivel + 1, linhas)
+            if no.corpo_else:
+                linhas.append(f"      {recuo}else")
+                _despejar_bloco(no.corpo_else, nivel + 1, linhas)
+            linhas.append(f"      {recuo}end if")
+        elif isinstance(no, NoLoop):
+            icados = f"  # içados: {', '.join(f'icado#{s}' for s in no.icados)}" if no.icados else ""
+            linhas.append(f"{prefixo}loop {no.vezes} begin{icados}")
+            _despejar_bloco(no.corpo, nivel + 1, linhas)
+            linhas.append(f"      {recuo}end loop")
+        elif isinstance(no, NoForEach):
+            icados = f"  # içados: {', '.join(f'icado#{s}' for s in no.icados)}" if no.icados else ""
+            linhas.append(f"{prefixo}for each {no.nome} in {_texto_expressao(no.iteravel)} begin{icados}")
+            _despejar_bloco(no.corpo, nivel + 1, linhas)
+            linhas.append(f"      {recuo}end for")
+        else:
+            linhas.append(f"{prefixo}{type(no).__name__}")
+
+
+# =============================================================================
+# Cache de compilação (LRU, endereçado pelo hash do código-fonte)
+# =============================================================================
+# Custo aproximado de um nó da árvore (objeto + slots + strings de expressão)
+_BYTES_POR_NO = 256
+# Pasta dos artefatos .lxc; deve ser do servidor, fora de qualquer pasta de usuário
+DIRETORIO_CACHE = os.getenv("LINEX_CACHE_DIR") or None
+
+
+def diretorio_cache_confiavel(diretorio):
+    """Cria (se preciso) a pasta de artefatos e diz se ela é segura para ler.
+
+    Um artefato executa o código que está nele, então a pasta tem de ser do
+    usuário do servidor e não pode ser gravável por grupo ou outros.
+    """
+    try:
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        info = os.stat(diretorio)
+    except OSError:
+        return False
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        return False
+    return not info.st_mode & 0o022
+
+
+class CacheCompilacao:
+    """Cache LRU de programas compilados, com limite de itens e de memória.
+
+    A chave é o SHA-256 do código-fonte, então o mesmo arquivo reexecutado
+    pela IDE reaproveita a árvore já construída em vez de refazer o parse.
+    """
+
+    def __init__(self, max_itens=256, max_bytes=32 * 1024 * 1024, diretorio=None):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        # Segundo nível opcional: artefatos `<hash>.lxc` em disco, que
+        # sobrevivem ao reinício do processo (ver `salvar_artefato`).
+        if diretorio and not diretorio_cache_confiavel(diretorio):
+            print(f"Aviso: LINEX_CACHE_DIR '{diretorio}' não é do servidor ou é gravável por outros; "
+                  f"artefatos em disco desligados.", file=sys.stderr)
+            diretorio = None
+        self.diretorio = diretorio
+        self._itens = OrderedDict()  # hash -> (programa, tamanho)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hits_disco = 0
+
+    @staticmethod
+    def chave(codigo):
+        return hashlib.sha256(codigo.encode("utf-8")).hexdigest()
+
+    def obter(self, codigo):
+        """Devolve o programa compilado, compilando e guardando se necessário."""
+        chave = self.chave(codigo)
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return item[0]
+            self.misses += 1
+
+        # O parse roda fora do lock; erros de sintaxe não são guardados.
+        programa = None
+        if self.diretorio:
+            caminho = os.path.join(self.diretorio, f"{chave}.lxc")
+            programa = carregar_artefato(caminho, codigo)
+            if programa is not None:
+                with self._lock:
+                    self.hits_disco += 1
+        if programa is None:
+            programa = compilar(codigo)
+            if self.diretorio:
+                salvar_artefato(programa, caminho, codigo)
+        tamanho = programa.tamanho_estimado()
+        if tamanho > self.max_bytes:
+            return programa
+
+        with self._lock:
+            if chave not in self._itens:
+                self._itens[chave] = (programa, tamanho)
+                self._bytes += tamanho
+                self._remover_excesso()
+        return programa
+
+    def _remover_excesso(self):
+        while self._itens and (len(self._itens) > self.max_itens or self._bytes > self.max_bytes):
+            _, (_, tamanho) = self._itens.popitem(last=False)
+            self._bytes -= tamanho
+            self.evictions += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "max_itens": self.max_itens,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hits_disco": self.hits_disco,
+            }
+
+
+cache_compilacao = CacheCompilacao(
+    max_itens=int(os.getenv("LINEX_CACHE_ITENS", "256")),
+    max_bytes=int(os.getenv("LINEX_CACHE_BYTES", str(32 * 1024 * 1024))),
+    diretorio=DIRETORIO_CACHE,
+)
+
+
+# =============================================================================
+# Artefato compilado em disco (.lxc)
+# =============================================================================
+# Formato: cabeçalho fixo + payload `marshal` com a árvore de nós e o code
+# object de cada expressão. Como um .pyc, só deve ser lido de diretórios
+# confiáveis: carregar um artefato executa o código que está nele. Por isso
+# os artefatos ficam só em `LINEX_CACHE_DIR` (`<hash>.lxc`), nunca ao lado
+# dos fontes, que estão em pastas onde os usuários gravam.
+#
+#   "LNXC" | formato (u16) | sha256 do fonte (32 bytes) | tag (u8 + bytes) | payload
+#
+# Mude VERSAO_ARTEFATO sempre que os nós ou as expressões mudarem de forma.
+VERSAO_ARTEFATO = 4
+_MAGICO_ARTEFATO = b"LNXC"
+_TAG_ARTEFATO = f"{sys.implementation.cache_tag}-m{marshal.version}".encode("ascii")
+
+
+def _classes_no():
+    classes = {}
+    pendentes = [No]
+    while pendentes:
+        classe = pendentes.pop()
+        classes[classe.__name__] = classe
+        pendentes.extend(classe.__subclasses__())
+    return classes
+
+
+@functools.lru_cache(maxsize=None)
+def _campos_no(classe):
+    """Todos os `__slots__` da classe, da base `No` até ela."""
+    campos = []
+    for base in reversed(classe.__mro__):
+        campos.extend(base.__dict__.get("__slots__", ()))
+    return tuple(campos)
+
+
+def _codificar(valor):
+    if isinstance(valor, No):
+        campos = _campos_no(type(valor))
+        return {"no": type(valor).__name__, "campos": tuple(_codificar(getattr(valor, c)) for c in campos)}
+    if isinstance(valor, Expressao):
+        funcao = valor.funcao
+        # Subexpressões içadas vivem nos globais próprios da expressão
+        icadas = tuple(
+            (nome, f.__code__) for nome, f in funcao.__globals__.items()
+            if nome.startswith("_i") and nome not in _GLOBAIS_EXPRESSAO
+        )
+        constante = valor.constante
+        if not (constante is None or isinstance(constante, (bool, int, float, str))):
+            constante = _INDEFINIDO
+        return {
+            "expr": valor.fonte, "codigo": funcao.__code__, "leituras": valor.leituras, "icadas": icadas,
+            "constante": () if constante is _INDEFINIDO else (constante,),
+        }
+    if isinstance(valor, list):
+        return [_codificar(v) for v in valor]
+    if isinstance(valor, tuple):
+        return tuple(_codificar(v) for v in valor)
+    return valor
+
+
+def _decodificar(valor, classes):
+    if isinstance(valor, dict):
+        if "no" in valor:
+            classe = classes[valor["no"]]
+            no = classe.__new__(classe)
+            for campo, dado in zip(_campos_no(classe), valor["campos"]):
+                setattr(no, campo, _decodificar(dado, classes))
+            return no
+        globais = _GLOBAIS_EXPRESSAO
+        if valor["icadas"]:
+            globais = dict(_GLOBAIS_EXPRESSAO, _INDEFINIDO=_INDEFINIDO)
+            for nome, codigo in valor["icadas"]:
+                globais[nome] = types.FunctionType(codigo, _GLOBAIS_EXPRESSAO)
+        constante = valor["constante"][0] if valor["constante"] else _INDEFINIDO
+        funcao = types.FunctionType(valor["codigo"], globais)
+        return Expressao(valor["expr"], funcao, valor["leituras"], None, constante)
+    if isinstance(valor, list):
+        return [_decodificar(v, classes) for v in valor]
+    if isinstance(valor, tuple):
+        return tuple(_decodificar(v, classes) for v in valor)
+    return valor
+
+
+def serializar(programa, codigo):
+    """Bytes do artefato de `programa`, compilado a partir de `codigo`."""
+    payload = marshal.dumps((programa.tabela.nomes, programa.tamanho_fonte, programa.fins, _codificar(programa.nos)))
+    return b"".join((
+        _MAGICO_ARTEFATO,
+        struct.pack("<H", VERSAO_ARTEFATO),
+        hashlib.sha256(codigo.encode("utf-8")).digest(),
+        struct.pack("<B", len(_TAG_ARTEFATO)),
+        _TAG_ARTEFATO,
+        payload,
+    ))
+
+
+def desserializar(dados, codigo=None):
+    """Reconstrói o `ProgramaLinex` de um artefato.
+
+    Levanta ValueError se o artefato for de outro formato/versão do Python
+    ou, quando `codigo` é informado, de outro código-fonte.
+    """
+    dados = memoryview(dados)
+    if bytes(dados[:4]) != _MAGICO_ARTEFATO or len(dados) < 39:
+        raise ValueError("Artefato Linex inválido.")
+    (formato,) = struct.unpack_from("<H", dados, 4)
+    tamanho_tag = dados[38]
+    if formato != VERSAO_ARTEFATO or bytes(dados[39:39 + tamanho_tag]) != _TAG_ARTEFATO:
+        raise ValueError("Artefato Linex de outra versão.")
+    if codigo is not None and bytes(dados[6:38]) != hashlib.sha256(codigo.encode("utf-8")).digest():
+        raise ValueError("Artefato Linex de outro código-fonte.")
+    nomes, tamanho_fonte, fins, nos = marshal.loads(dados[39 + tamanho_tag:])
+    tabela = TabelaSimbolos()
+    for nome in nomes:
+        tabela.slot(nome)
+    return ProgramaLinex(_decodificar(nos, _classes_no()), tabela, tamanho_fonte, fins)
+
+
+def salvar_artefato(programa, caminho, codigo):
+    """Grava o artefato de forma atômica; falhas de disco são ignoradas."""
+    try:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "wb") as f:
+            f.write(serializar(programa, codigo))
+        os.replace(temporario, caminho)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def carregar_artefato(caminho, codigo):
+    """Programa do artefato em `caminho` (uma única leitura), ou None se
+    não existir, estiver corrompido ou não corresponder a `codigo`."""
+    try:
+        with open(caminho, "rb") as f:
+            dados = f.read()
+        return desserializar(dados, codigo)
+    except (OSError, ValueError, EOFError, TypeError, KeyError):
+        return None
+
+
+def caminho_artefato(codigo, diretorio_cache):
+    """`<cache>/<hash>.lxc`: o mesmo caminho que o `CacheCompilacao` consulta."""
+    return os.path.join(diretorio_cache, f"{CacheCompilacao.chave(codigo)}.lxc")
+
+
+def compilar_arquivo(caminho_fonte, diretorio_cache=None):
+    """Compila um .lx reaproveitando (ou gerando) o artefato em `diretorio_cache`.
+
+    Sem pasta (nem `LINEX_CACHE_DIR`) levanta `ValueError`.
+    """
+    diretorio_cache = diretorio_cache or DIRETORIO_CACHE
+    if not diretorio_cache:
+        raise ValueError("Defina LINEX_CACHE_DIR (ou passe a pasta) para gravar artefatos .lxc.")
+    with open(caminho_fonte, encoding="utf-8") as f:
+        codigo = f.read()
+    caminho = caminho_artefato(codigo, diretorio_cache)
+    programa = carregar_artefato(caminho, codigo)
+    if programa is None:
+        programa = compilar(codigo)
+        salvar_artefato(programa, caminho, codigo)
+    return programa
+
+
+# =============================================================================
+# Motor de bytecode (VM)
+# =============================================================================
+# Cada instrução é uma tupla (opcode, argumento, linha). Os blocos if/loop/func
+# viram saltos com endereços resolvidos na compilação.
+LOAD = 0            # avalia a Expressao do argumento e empilha o valor
+STORE = 1           # desempilha e grava no slot (slot, nome) do argumento
+PRINT = 2           # desempilha e imprime ("📢 ...")
+CALC = 3            # desempilha e imprime ("🧮 Resultado: ...")
+TEST = 4            # avalia a condição de um if e empilha o booleano
+JUMP_IF_FALSE = 5   # desempilha; salta para o argumento se for falso
+JUMP = 6            # salta para o argumento
+LOOP_INIT = 7       # zera os invariantes içados (vezes, slots) e empilha o contador
+LOOP_COUNTER = 8    # contador zerado: desempilha e salta; senão decrementa
+CALL = 9            # chama a função cujo nome é o argumento
+RET = 10            # volta para quem chamou a função
+DEF_FUNC = 11       # registra a função (nome, endereço de entrada)
+OUTPUT = 12         # acrescenta o texto do argumento à saída
+EXEC = 13           # executa um nó simples da árvore (input, http, json, save, load, var s = s + ...)
+HALT = 14           # fim do programa principal
+FOR_INIT = 15       # avalia a lista/objeto do `for each` (expr, slots içados) e empilha o iterador
+FOR_NEXT = 16       # próximo item para o slot (slot); esgotado: desempilha e salta para o argumento
+
+NOMES_OPCODES = (
+    "LOAD", "STORE", "PRINT", "CALC", "TEST", "JUMP_IF_FALSE", "JUMP", "LOOP_INIT",
+    "LOOP_COUNTER", "CALL", "RET", "DEF_FUNC", "OUTPUT", "EXEC", "HALT", "FOR_INIT", "FOR_NEXT",
+)
+
+
+class Bytecode:
+    """Lista plana de instruções produzida por `gerar_bytecode`."""
+
+    def __init__(self, instrucoes):
+        self.instrucoes = instrucoes
+
+    def listar(self):
+        """Desmontagem legível, útil para depuração."""
+        linhas = []
+        for endereco, (op, arg, linha) in enumerate(self.instrucoes):
+            if isinstance(arg, Expressao):
+                arg = arg.fonte
+            elif isinstance(arg, tuple):
+                arg = tuple(a.fonte if isinstance(a, Expressao) else a for a in arg)
+            elif isinstance(arg, No):
+                arg = type(arg).__name__
+            linhas.append(f"{endereco:4d}  {NOMES_OPCODES[op]:<14} {'' if arg is None else arg!r}  (linha {linha})")
+        return "\n".join(linhas)
+
+
+class _GeradorBytecode:
+    def __init__(self):
+        self.codigo = []
+        self.funcoes_pendentes = []  # (posição do DEF_FUNC, nó func)
+
+    def emitir(self, op, arg, linha):
+        self.codigo.append((op, arg, linha))
+        return len(self.codigo) - 1
+
+    def corrigir(self, posicao, destino):
+        op, _, linha = self.codigo[posicao]
+        self.codigo[posicao] = (op, destino, linha)
+
+    def bloco(self, nos):
+        for no in nos:
+            self.no(no)
+
+    def no(self, no):
+        linha = no.linha
+        if isinstance(no, NoAnexar):
+            self.emitir(EXEC, no, linha)
+        elif isinstance(no, NoVar):
+            self.emitir(LOAD, no.expr, linha)
+            self.emitir(STORE, (no.slot, no.nome), linha)
+        elif isinstance(no, NoPrint):
+            self.emitir(LOAD, no.expr, linha)
+            self.emitir(PRINT, None, linha)
+        elif isinstance(no, NoCalc):
+            self.emitir(LOAD, no.expr, linha)
+            self.emitir(CALC, None, linha)
+        elif isinstance(no, NoIf) and no.decidido is not None:
+            # Condição conhecida na compilação: só o ramo que sobrou, sem teste
+            if no.decidido:
+                self.emitir(OUTPUT, "✅ Condição verdadeira. Executando bloco 'if'...", linha)
+                self.bloco(no.corpo_if)
+            else:
+                self.emitir(OUTPUT, "❌ Condição falsa. Pulando para o bloco 'else'...", linha)
+                self.bloco(no.corpo_else)
+        elif isinstance(no, NoIf):
+            self.emitir(TEST, no.condicao, linha)
+            salto_else = self.emitir(JUMP_IF_FALSE, None, linha)
+            self.emitir(OUTPUT, "✅ Condição verdadeira. Executando bloco 'if'...", linha)
+            self.bloco(no.corpo_if)
+            salto_fim = self.emitir(JUMP, None, linha)
+            self.corrigir(salto_else, len(self.codigo))
+            self.emitir(OUTPUT, "❌ Condição falsa. Pulando para o bloco 'else'...", linha)
+            self.bloco(no.corpo_else)
+            self.corrigir(salto_fim, len(self.codigo))
+        elif isinstance(no, NoLoop):
+            self.emitir(OUTPUT, f"🔄 Iniciando loop por {no.vezes} vezes...", linha)
+            self.emitir(LOOP_INIT, (no.vezes, no.icados), linha)
+            inicio = self.emitir(LOOP_COUNTER, None, linha)
+            self.bloco(no.corpo)
+            self.emitir(JUMP, inicio, linha)
+            self.corrigir(inicio, len(self.codigo))
+            self.emitir(OUTPUT, "✅ Loop finalizado.", linha)
+        elif isinstance(no, NoForEach):
+            self.emitir(FOR_INIT, (no.iteravel, no.icados), linha)
+            inicio = self.emitir(FOR_NEXT, None, linha)
+            self.bloco(no.corpo)
+            self.emitir(JUMP, inicio, linha)
+            self.codigo[inicio] = (FOR_NEXT, (no.slot, len(self.codigo)), linha)
+            self.emitir(OUTPUT, "✅ For each finalizado.", linha)
+        elif isinstance(no, NoFunc):
+            posicao = self.emitir(DEF_FUNC, None, linha)
+            self.funcoes_pendentes.append((posicao, no))
+        elif isinstance(no, NoCall):
+            self.emitir(CALL, no.nome, linha)
+        else:
+            self.emitir(EXEC, no, linha)
+
+    def gerar(self, nos):
+        self.bloco(nos)
+        self.emitir(HALT, None, nos[-1].linha if nos else 0)
+        # Corpos das funções ficam depois do HALT; cada um termina em RET.
+        while self.funcoes_pendentes:
+            posicao, no = self.funcoes_pendentes.pop(0)
+            self.corrigir(posicao, (no.nome, len(self.codigo)))
+            self.bloco(no.corpo)
+            self.emitir(RET, None, no.linha)
+        return Bytecode(self.codigo)
+
+
+def gerar_bytecode(nos):
+    """Rebaixa a árvore de nós para um `Bytecode` com saltos resolvidos."""
+    return _GeradorBytecode().gerar(nos)
+
+
+def _executar_bytecode(interp, bytecode):
+    """Laço de despacho da VM; os erros recebem a linha da instrução que falhou."""
+    codigo = bytecode.instrucoes
+    slots = interp.slots
+    output = interp.output
+    funcoes = interp.funcoes
+    silencioso = interp.silencioso
+    max_profundidade = interp.max_profundidade
+    pilha = []
+    retornos = []
+    pc = 0
+    linha = 0
+    # Orçamento contado por instrução; o contador local é sincronizado com o
+    # interpretador só nas verificações periódicas.
+    passos = interp.passos
+    proxima_verificacao = interp._proxima_verificacao
+    try:
+        while True:
+            op, arg, linha = codigo[pc]
+            pc += 1
+            passos += 1
+            if passos >= proxima_verificacao:
+                interp.passos = passos
+                interp._verificar_limites()
+                proxima_verificacao = interp._proxima_verificacao
+            if op == LOAD:
+                pilha.append(arg.avaliar(slots))
+            elif op == STORE:
+                slot, nome = arg
+                slots[slot] = pilha.pop()
+                if not silencioso:
+                    output.append(f"✅ Variável '{nome}' criada/atualizada.")
+            elif op == LOOP_COUNTER:
+                if pilha[-1] <= 0:
+                    pilha.pop()
+                    pc = arg
+                else:
+                    pilha[-1] -= 1
+            elif op == JUMP:
+                pc = arg
+            elif op == PRINT:
+                output.append(f"📢 {pilha.pop()}")
+            elif op == TEST:
+                try:
+                    pilha.append(bool(arg.avaliar(slots)))
+                except Exception as e:
+                    erro = type(e)(f"Erro na condição do 'if': {e} (linha {linha})")
+                    erro.linha_linex = linha
+                    raise erro
+            elif op == JUMP_IF_FALSE:
+                if not pilha.pop():
+                    pc = arg
+            elif op == OUTPUT:
+                if not silencioso:
+                    output.append(arg)
+            elif op == CALC:
+                output.append(f"🧮 Resultado: {pilha.pop()}")
+            elif op == LOOP_INIT:
+                vezes, icados = arg
+                for slot in icados:
+                    slots[slot] = _INDEFINIDO
+                pilha.append(vezes)
+            elif op == CALL:
+                if arg not in funcoes:
+                    raise NameError(f"Função '{arg}' não definida.")
+                if len(retornos) >= max_profundidade:
+                    raise LimiteExcedido(f"Profundidade máxima de chamadas ({max_profundidade}) excedida em '{arg}'.")
+                if not silencioso:
+                    output.append(f"➡️ Chamando função '{arg}'...")
+                retornos.append((pc, arg))
+                pc = funcoes[arg]
+            elif op == RET:
+                pc, nome = retornos.pop()
+                if not silencioso:
+                    output.append(f"⬅️ Finalizado função '{nome}'.")
+            elif op == DEF_FUNC:
+                nome, entrada = arg
+                funcoes[nome] = entrada
+                if not silencioso:
+                    output.append(f"📦 Função '{nome}' definida.")
+            elif op == FOR_NEXT:
+                slot, fim = arg
+                item = next(pilha[-1], _INDEFINIDO)
+                if item is _INDEFINIDO:
+                    pilha.pop()
+                    pc = fim
+                else:
+                    slots[slot] = item
+            elif op == FOR_INIT:
+                expressao, icados = arg
+                iterador, quantidade = _iterador_for(expressao.avaliar(slots), expressao.fonte)
+                if not silencioso:
+                    output.append(f"🔄 Percorrendo {quantidade} itens de '{expressao.fonte}'...")
+                for slot in icados:
+                    slots[slot] = _INDEFINIDO
+                pilha.append(iterador)
+            elif op == EXEC:
+                arg.executar(interp)
+            elif op == HALT:
+                interp.passos = passos
+                return
+    except Exception as e:
+        interp.passos = passos
+        raise _anotar_erro(e, linha)
+
+
+# =============================================================================
+# Execução com saída em streaming
+# =============================================================================
+class SaidaFila:
+    """Saída que repassa cada linha para uma fila limitada.
+
+    A fila cheia bloqueia o interpretador até o consumidor ler (backpressure),
+    e o total de bytes é limitado para não segurar megabytes na memória.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024, max_linhas_fila=256):
+        self.fila = queue.Queue(maxsize=max_linhas_fila)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.cancelado = threading.Event()
+
+    def colocar(self, item):
+        while not self.cancelado.is_set():
+            try:
+                self.fila.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise ExecucaoCancelada("Execução cancelada pelo cliente.")
+
+    def append(self, linha):
+        self.bytes += len(linha.encode("utf-8"))
+        if self.bytes > self.max_bytes:
+            raise LimiteExcedido(f"Limite de saída de {self.max_bytes} bytes excedido.")
+        self.colocar(linha)
+
+
+_FIM_STREAM = object()
+
+
+def executar_codigo_lineax_stream(codigo, input_data=None, motor=None, max_bytes=1024 * 1024, silencioso=False,
+                                  diretorio_arquivos=None):
+    """Gera as linhas de saída à medida que o programa executa.
+
+    O interpretador roda em uma thread própria; se o gerador for fechado
+    (cliente desconectou), a execução é cancelada na próxima linha emitida.
+    """
+    saida = SaidaFila(max_bytes=max_bytes)
+
+    def rodar():
+        try:
+            interpretador = LinexInterpreter(motor, silencioso=silencioso, diretorio_arquivos=diretorio_arquivos)
+            resultado = interpretador.executar_codigo_lineax(codigo, input_data, saida=saida)
+            if resultado is not saida:
+                # Erro: as linhas já enviadas ficam, e a mensagem de erro vai no fim.
+                for linha in resultado:
+                    saida.colocar(linha)
+            saida.colocar(_FIM_STREAM)
+        except ExecucaoCancelada:
+            pass
+
+    threading.Thread(target=rodar, daemon=True).start()
+    try:
+        while True:
+            linha = saida.fila.get()
+            if linha is _FIM_STREAM:
+                return
+            yield linha
+    finally:
+        saida.cancelado.set()
+
+
+def executar_codigo_lineax(codigo, input_data=None, motor=None, silencioso=False, diretorio_arquivos=None):
+    # Cada execução tem seu próprio interpretador; o único estado
+    # compartilhado (cache de compilação) é protegido por lock próprio.
+    # `diretorio_arquivos`: pasta onde os `save` são gravados no fim (opcional).
+    interpretador = LinexInterpreter(motor, silencioso=silencioso, diretorio_arquivos=diretorio_arquivos)
+    return interpretador.executar_codigo_lineax(codigo, input_data)
+
+
+def perfilar_codigo_lineax(codigo, input_data=None, silencioso=False, diretorio_arquivos=None):
+    """Executa com o perfil ligado; devolve (linhas de saída, relatório do perfil).
+
+    O relatório é None se o código nem chegou a executar (erro de compilação).
+    """
+    interpretador = LinexInterpreter(silencioso=silencioso, perfilar=True, diretorio_arquivos=diretorio_arquivos)
+    saida = interpretador.executar_codigo_lineax(codigo, input_data)
+    perfil = interpretador.perfil.relatorio() if interpretador.perfil is not None else None
+    return saida, perfil
+
+
+# =============================================================================
+# Execução em lote (correção de exercícios de uma turma)
+# =============================================================================
+def executar_lote(programas, motor=None, silencioso=False, max_passos=MAX_PASSOS, tempo_limite=TEMPO_LIMITE):
+    """Executa vários programas e devolve a saída de cada um, na mesma ordem.
+
+    `programas` é uma sequência de pares (codigo, input_data). Cada programa
+    roda num interpretador próprio, com seu orçamento de passos e de tempo;
+    fontes iguais são compiladas uma única vez e o `ProgramaLinex` é
+    compartilhado entre as execuções. Para usar vários núcleos, veja
+    `PoolExecucao.executar_linex_lote`.
+    """
+    compilados = {}
+    resultados = []
+    for codigo, input_data in programas:
+        if codigo not in compilados:
+            compilados[codigo] = _compilar_ou_erro(codigo)
+        programa, erro = compilados[codigo]
+        if erro is not None:
+            resultados.append(list(erro))
+            continue
+        interpretador = LinexInterpreter(motor, silencioso=silencioso, max_passos=max_passos,
+                                         tempo_limite=tempo_limite)
+        resultados.append(interpretador.executar_programa(programa, input_data))
+    return resultados
+
+
+# =============================================================================
+# Reexecução incremental (IDE): retoma do primeiro comando alterado
+# =============================================================================
+# Checkpoints guardados por documento e sessões mantidas (LRU)
+MAX_CHECKPOINTS = int(os.getenv("LINEX_MAX_CHECKPOINTS", "512"))
+MAX_SESSOES_INCREMENTAIS = int(os.getenv("LINEX_SESSOES_INCREMENTAIS", "128"))
+# Total estimado (saída gravada + cópias das variáveis) dos checkpoints de um
+# documento, e de todos os documentos juntos
+MAX_BYTES_CHECKPOINTS = int(os.getenv("LINEX_MAX_BYTES_CHECKPOINTS", str(8 * 1024 * 1024)))
+MAX_BYTES_SESSOES_INCREMENTAIS = int(os.getenv("LINEX_MAX_BYTES_SESSOES_INCREMENTAIS", str(256 * 1024 * 1024)))
+
+
+def _hashes_prefixos(codigo, fins, input_data, silencioso):
+    """Hash do fonte até o fim de cada comando do nível principal.
+
+    A entrada simulada e o modo silencioso entram na chave, porque mudam o
+    estado e a saída produzidos pelo mesmo prefixo.
+    """
+    # Sem o fim de linha: acrescentar uma linha no fim não muda a anterior
+    linhas = codigo.splitlines()
+    h = hashlib.sha256(json.dumps([input_data or [], bool(silencioso)], default=str).encode("utf-8"))
+    hashes = []
+    lidas = 0
+    for fim in fins:
+        for linha in linhas[lidas:fim]:
+            h.update(linha.encode("utf-8") + b"\n")
+        lidas = max(lidas, fim)
+        hashes.append(h.copy().hexdigest())
+    return hashes
+
+
+def _caminhos_funcoes(nos, prefixo=()):
+    """id(corpo) -> caminho do `NoFunc` na árvore, para remapear `funcoes`."""
+    caminhos = {}
+    for i, no in enumerate(nos):
+        caminho = prefixo + (i,)
+        if isinstance(no, NoFunc):
+            caminhos[id(no.corpo)] = caminho
+        for atributo in ("corpo", "corpo_if", "corpo_else"):
+            filhos = getattr(no, atributo, None)
+            if filhos:
+                caminhos.update(_caminhos_funcoes(filhos, caminho + (atributo,)))
+    return caminhos
+
+
+def _no_no_caminho(nos, caminho):
+    no = nos[caminho[0]]
+    for i in range(1, len(caminho), 2):
+        no = getattr(no, caminho[i])[caminho[i + 1]]
+    return no
+
+
+class _SaidaGravada:
+    """Repassa a saída e grava as linhas do comando atual (para o checkpoint).
+
+    O trecho de cada comando é uma `SaidaLimitada` com os mesmos limites do
+    destino: o que ela descarta seria descartado de qualquer jeito. Acima de
+    `max_bytes` gravados no total (contando as cópias das variáveis, ver
+    `_copiar_estado`), não há mais checkpoints nesta execução.
+    """
+
+    def __init__(self, destino, max_bytes):
+        self.destino = destino
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.gravando = True
+        self.novo_trecho()
+
+    def novo_trecho(self):
+        self.trecho = SaidaLimitada(self.destino.max_linhas, self.destino.max_bytes)
+
+    def append(self, linha):
+        self.destino.append(linha)
+        if self.gravando:
+            self.trecho.append(linha)
+
+    def fechar_trecho(self):
+        """(linhas, descartadas) do comando que terminou, ou None se parou de gravar."""
+        trecho = self.trecho
+        self.novo_trecho()
+        if not self.gravando:
+            return None
+        self.bytes += trecho._bytes
+        if self.bytes > self.max_bytes:
+            self.gravando = False
+            return None
+        return tuple(trecho._linhas), trecho.descartadas
+
+    def reproduzir(self, saida):
+        linhas, descartadas = saida
+        for linha in linhas:
+            self.destino.append(linha)
+        self.destino.descartadas += descartadas
+
+
+_NOS_SEM_EFEITO = (NoPrint, NoVar, NoInput, NoCalc, NoSave, NoLoad, NoJsonLoad,
+                   NoHttpGet, NoCall, NoFunc, NoIf, NoLoop, NoForEach)
+
+
+def _comandos_que_alteram(nos):
+    """Para cada comando do nível principal: ele pode alterar um valor no lugar?
+
+    Atribuir troca o valor da variável; só uma chamada com efeito
+    (`lista.append(x)`, `obj.update(...)`) muda um objeto que já existia.
+    `call` conta se alguma função do programa tem uma; nós de plugin sempre.
+    """
+    def altera(no):
+        if not isinstance(no, _NOS_SEM_EFEITO):
+            return True
+        if isinstance(no, NoFunc):
+            return False  # definir não executa; o corpo conta no `call`
+        if isinstance(no, NoCall) and funcoes_alteram:
+            return True
+        if any(_tem_efeito(expressao.arvore) for _, expressao in _expressoes_do_no(no)):
+            return True
+        return any(altera(filho) for atributo in ("corpo", "corpo_if", "corpo_else")
+                   for filho in getattr(no, atributo, ()))
+
+    def funcoes(nos):
+        for no in nos:
+            if isinstance(no, NoFunc):
+                yield no
+            for atributo in ("corpo", "corpo_if", "corpo_else"):
+                yield from funcoes(getattr(no, atributo, ()))
+
+    funcoes_alteram = False
+    funcoes_alteram = any(altera(filho) for no in funcoes(nos) for filho in no.corpo)
+    return [altera(no) for no in nos]
+
+
+def _copiar_estado(interp, copiados, gravador):
+    """(cópia das variáveis, bytes novos) para um checkpoint, ou (None, 0).
+
+    `copiados` é o memo do deepcopy, mantido entre os checkpoints de uma
+    execução: um valor que não mudou desde o checkpoint anterior reaproveita
+    a cópia de lá (e variáveis que apontam para o mesmo objeto continuam
+    apontando depois de restaurar). Só o que é novo conta no orçamento de
+    bytes do gravador; estourou, a execução não grava mais checkpoints.
+    """
+    variaveis = interp.variaveis
+    restante = gravador.max_bytes - gravador.bytes
+    tamanho = 0
+    for valor in variaveis.values():
+        if id(valor) not in copiados:
+            tamanho += _tamanho_valor(valor, restante - tamanho)
+            if tamanho > restante:
+                gravador.gravando = False
+                return None, 0
+    gravador.bytes += tamanho
+    copia = copy.deepcopy(variaveis, copiados)
+    # Textos e números não entram no memo (a cópia é o próprio objeto); sem
+    # isto seriam contados de novo em todo checkpoint.
+    vivos = copiados.setdefault(id(copiados), [])
+    for nome, valor in variaveis.items():
+        if id(valor) not in copiados:
+            copiados[id(valor)] = copia[nome]
+            vivos.append(valor)
+    return copia, tamanho
+
+
+class _Checkpoint:
+    """Estado do interpretador entre dois comandos do nível principal."""
+    __slots__ = ("variaveis", "funcoes", "arquivos", "alterados", "entrada_index", "passos", "saida", "tamanho")
+
+    def __init__(self, interp, caminhos, saida, variaveis, tamanho):
+        # Cópia feita por `_copiar_estado`; pode dividir valores com os
+        # checkpoints anteriores, por isso nunca é alterada (`restaurar` copia).
+        self.variaveis = variaveis
+        # Corpos de função são da árvore desta execução; guarda onde estão.
+        self.funcoes = {nome: caminhos[id(corpo)] for nome, corpo in interp.funcoes.items()}
+        self.arquivos = dict(interp.arquivos.arquivos)
+        self.alterados = set(interp.arquivos._alterados)
+        self.entrada_index = interp.entrada_index
+        self.passos = interp.passos
+        self.saida = saida  # (linhas, descartadas) emitidas só por este comando
+        self.tamanho = tamanho + sum(len(linha) for linha in saida[0])  # bytes estimados
+
+    def restaurar(self, interp, programa):
+        for nome, valor in copy.deepcopy(self.variaveis).items():
+            interp.definir(nome, valor)
+        interp.funcoes = {nome: _no_no_caminho(programa.nos, caminho).corpo for nome, caminho in self.funcoes.items()}
+        interp.arquivos.arquivos = dict(self.arquivos)
+        interp.arquivos.bytes = sum(len(t) for t in self.arquivos.values())
+        interp.arquivos._alterados = set(self.alterados)
+        interp.entrada_index = self.entrada_index
+        interp.passos = self.passos
+
+
+class SessoesIncrementais:
+    """Checkpoints da última execução de cada documento (chave livre, ex.: usuário + arquivo)."""
+
+    def __init__(self, max_sessoes=MAX_SESSOES_INCREMENTAIS, max_bytes=MAX_BYTES_SESSOES_INCREMENTAIS):
+        self.max_sessoes = max_sessoes
+        self.max_bytes = max_bytes
+        self._sessoes = OrderedDict()  # chave -> (checkpoints, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            sessao = self._sessoes.get(chave)
+            if sessao is None:
+                return None
+            self._sessoes.move_to_end(chave)
+            return sessao[0]
+
+    def guardar(self, chave, checkpoints):
+        tamanho = sum(checkpoint.tamanho for checkpoint in checkpoints.values())
+        with self._lock:
+            self._remover(chave)
+            self._sessoes[chave] = (checkpoints, tamanho)
+            self._bytes += tamanho
+            while len(self._sessoes) > self.max_sessoes or (self._bytes > self.max_bytes and len(self._sessoes) > 1):
+                self._remover(next(iter(self._sessoes)))
+
+    def descartar(self, chave):
+        with self._lock:
+            self._remover(chave)
+
+    def _remover(self, chave):
+        sessao = self._sessoes.pop(chave, None)
+        if sessao is not None:
+            self._bytes -= sessao[1]
+
+
+sessoes_incrementais = SessoesIncrementais()
+
+
+def executar_codigo_lineax_incremental(chave, codigo, input_data=None, silencioso=False, diretorio_arquivos=None):
+    """Executa `codigo` retomando do primeiro comando alterado desde a última
+    execução com a mesma `chave`. Devolve (linhas de saída, comandos reaproveitados).
+
+    Comandos `http get`, loops longos etc. que ficam antes da alteração não
+    são executados de novo: o estado deles vem do checkpoint.
+    """
+    programa, erro = _compilar_ou_erro(codigo)
+    if erro is not None:
+        return erro, 0
+    interpretador = LinexInterpreter(silencioso=silencioso, diretorio_arquivos=diretorio_arquivos)
+    saida, checkpoints, reaproveitados = interpretador.executar_incremental(
+        programa, codigo, input_data, sessoes_incrementais.obter(chave)
+    )
+    sessoes_incrementais.guardar(chave, checkpoints)
+    return saida, reaproveitados
+
+
+# =============================================================================
+# Sessões interativas (terminal da IDE): o estado fica no servidor
+# =============================================================================
+MAX_SESSOES_REPL = int(os.getenv("LINEX_SESSOES_REPL", "128"))
+# Segundos sem comandos até a sessão ser descartada
+REPL_TEMPO_OCIOSO = float(os.getenv("LINEX_REPL_OCIOSO", "900"))
+# Memória estimada (variáveis, arquivos e fonte) acima da qual a sessão é reiniciada
+MAX_BYTES_SESSAO_REPL = int(os.getenv("LINEX_MAX_BYTES_SESSAO_REPL", str(32 * 1024 * 1024)))
+
+
+_AMOSTRA_TAMANHO = 256  # itens de uma lista/objeto grande medidos para estimar o todo
+
+
+def _tamanho_valor(valor, limite):
+    """Estimativa em bytes de `valor` e do que ele contém.
+
+    Roda depois de cada comando (terminal e checkpoints), então listas e
+    objetos grandes são estimados por uma amostra dos itens, e a conta para
+    assim que passa de `limite` (só interessa saber se passou).
+    """
+    total = 0
+    vistos = set()
+    pendentes = [(valor, 1.0)]
+    while pendentes and total <= limite:
+        valor, peso = pendentes.pop()
+        if id(valor) in vistos:
+            continue
+        vistos.add(id(valor))
+        tipo = type(valor)
+        if tipo is _Corda:
+            total += peso * sum(sys.getsizeof(parte) for parte in valor.partes)
+        elif tipo is _JsonPreguicoso:
+            pendentes.append((valor.texto if valor.dados is _INDEFINIDO else valor.dados, peso))
+        elif tipo is Vetor:
+            total += peso * (getattr(valor.dados, "nbytes", None) or sys.getsizeof(valor.dados))
+        elif tipo in (dict, list, tuple, set):
+            total += peso * sys.getsizeof(valor)
+            itens = itertools.chain.from_iterable(valor.items()) if tipo is dict else valor
+            quantidade = len(valor) * (2 if tipo is dict else 1)
+            if quantidade > _AMOSTRA_TAMANHO:
+                peso_item = peso * quantidade / _AMOSTRA_TAMANHO
+                itens = itertools.islice(itens, _AMOSTRA_TAMANHO)
+            else:
+                peso_item = peso
+            pendentes.extend((item, peso_item) for item in itens)
+        else:
+            total += peso * sys.getsizeof(valor)
+    return int(total)
+
+
+class _SessaoRepl:
+    __slots__ = ("interpretador", "ultimo_uso", "bytes_fonte", "lock")
+
+    def __init__(self, interpretador):
+        self.interpretador = interpretador
+        self.ultimo_uso = time.monotonic()
+        self.bytes_fonte = 0  # fonte de todos os comandos: a árvore das funções fica na memória
+        self.lock = threading.Lock()
+
+    def tamanho_estimado(self, limite):
+        interp = self.interpretador
+        total = interp.arquivos.bytes + self.bytes_fonte + _tamanho_valor(interp._extras, limite)
+        for valor in interp.slots:
+            if total > limite:
+                break
+            if valor is not _INDEFINIDO:
+                total += _tamanho_valor(valor, limite - total)
+        return total
+
+
+class SessoesRepl:
+    """Interpretadores do terminal por chave (ex.: usuário), com variáveis e funções vivas.
+
+    Sessões sem uso há mais de `tempo_ocioso` segundos são descartadas na
+    próxima consulta; acima de `max_sessoes`, sai a usada há mais tempo.
+    """
+
+    def __init__(self, max_sessoes=MAX_SESSOES_REPL, tempo_ocioso=REPL_TEMPO_OCIOSO,
+                 max_bytes=MAX_BYTES_SESSAO_REPL):
+        self.max_sessoes = max_sessoes
+        self.tempo_ocioso = tempo_ocioso
+        self.max_bytes = max_bytes
+        self._sessoes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessoes)
+
+    def _descartar_ociosas(self, agora):
+        # A mais antiga fica no começo: para na primeira que ainda está em uso
+        while self._sessoes:
+            sessao = next(iter(self._sessoes.values()))
+            if agora - sessao.ultimo_uso <= self.tempo_ocioso:
+                break
+            self._sessoes.popitem(last=False)
+
+    def obter(self, chave, criar):
+        """Sessão de `chave`; se não existir (ou expirou), cria com `criar()`."""
+        agora = time.monotonic()
+        with self._lock:
+            self._descartar_ociosas(agora)
+            sessao = self._sessoes.get(chave)
+            if sessao is None:
+                sessao = self._sessoes[chave] = _SessaoRepl(criar())
+                while len(self._sessoes) > self.max_sessoes:
+                    self._sessoes.popitem(last=False)
+            else:
+                self._sessoes.move_to_end(chave)
+            sessao.ultimo_uso = agora
+            return sessao
+
+    def descartar(self, chave):
+        with self._lock:
+            self._sessoes.pop(chave, None)
+
+
+sessoes_repl = SessoesRepl()
+
+
+def executar_repl_lineax(chave, codigo, input_data=None, silencioso=False, diretorio_arquivos=None,
+                         reiniciar=False):
+    """Executa só `codigo` sobre o estado que a sessão `chave` já tem.
+
+    Não precisa do `linex init project`: cada chamada é a continuação da
+    anterior. `reiniciar` começa uma sessão vazia. Se o estado passar de
+    `MAX_BYTES_SESSAO_REPL`, a sessão é descartada e a saída avisa.
+    Devolve as linhas de saída.
+    """
+    if reiniciar:
+        sessoes_repl.descartar(chave)
+    sessao = sessoes_repl.obter(
+        chave, lambda: LinexInterpreter(silencioso=silencioso, diretorio_arquivos=diretorio_arquivos)
+    )
+    # Dois comandos da mesma sessão não rodam juntos: o segundo é recusado
+    if not sessao.lock.acquire(blocking=False):
+        return ["⏳ O comando anterior desta sessão ainda está em execução."]
+    try:
+        interp = sessao.interpretador
+        interp.silencioso = silencioso
+        saida = interp.executar_trecho(codigo, input_data)
+        sessao.bytes_fonte += len(codigo)
+        if sessao.tamanho_estimado(sessoes_repl.max_bytes) > sessoes_repl.max_bytes:
+            sessoes_repl.descartar(chave)
+            saida.append(f"⚠️ A sessão passou de {sessoes_repl.max_bytes / (1024 * 1024):g} MiB "
+                         f"de memória e foi reiniciada.")
+        return saida
+    finally:
+        sessao.lock.release()
+
+
+# =============================================================================
+# Diagnósticos para a IDE: sintaxe, blocos abertos e nomes não definidos
+# =============================================================================
+# Documentos da IDE com análise guardada entre edições, e o tamanho máximo
+# (em caracteres) de um documento analisado
+MAX_DOCUMENTOS_DIAGNOSTICO = int(os.getenv("LINEX_DOCUMENTOS_DIAGNOSTICO", "256"))
+MAX_CARACTERES_DIAGNOSTICO = int(os.getenv("LINEX_MAX_CARACTERES_DIAGNOSTICO", str(256 * 1024)))
+
+_NOMES_BLOCOS = ("func", "if", "loop", "for")
+
+
+class _LinhaAnalisada:
+    """O que uma linha do fonte declara, independente das linhas vizinhas.
+
+    Só depende do texto da linha, então pode ser reaproveitada quando a
+    linha não muda (mesmo que mude de posição no documento).
+    """
+    __slots__ = ("tipo", "bloco", "nome", "inicia", "erro", "leituras", "escritas", "chamada", "carrega")
+
+    def __init__(self, tipo="vazia"):
+        self.tipo = tipo  # vazia, abre, else, fim ou comando
+        self.bloco = None  # func/if/loop/for para `abre` e `fim`
+        self.nome = None  # nome da função em `func <nome> begin`
+        self.inicia = False  # é a linha `linex init project`
+        self.erro = None
+        self.leituras = ()
+        self.escritas = ()
+        self.chamada = None
+        self.carrega = False  # `load` pode criar qualquer variável
+
+
+class _TabelaLeituras(TabelaSimbolos):
+    """Tabela para a análise das linhas: só os nomes lidos, sem gerar código.
+
+    As `Expressao` devolvidas não têm `funcao`; servem para o parser validar
+    o comando e para `leituras`.
+    """
+
+    def expressao(self, fonte, arvore=None):
+        original = _validar_expressao(fonte) if arvore is None else arvore
+        leituras = []
+        pendentes = [original.body]
+        while pendentes:
+            node = pendentes.pop()
+            if isinstance(node, ast.Name) and node.id not in _GLOBAIS_EXPRESSAO:
+                slot = self.slot(node.id)
+                if slot not in leituras:
+                    leituras.append(slot)
+            # Na ordem do fonte, como o `_ParaSlots`
+            pendentes.extend(reversed(list(ast.iter_child_nodes(node))))
+        constante = original.body.value if isinstance(original.body, ast.Constant) else _INDEFINIDO
+        return Expressao(fonte.strip(), None, tuple(leituras), original, constante)
+
+
+def _sem_linha(mensagem):
+    return mensagem[:-len(" (linha 0)")] if mensagem.endswith(" (linha 0)") else mensagem
+
+
+def _analisar_linha(texto):
+    """Analisa uma linha (já sem espaços nas pontas) com o mesmo parser da compilação."""
+    if not texto or texto.startswith("#"):
+        return _LinhaAnalisada()
+    partes = texto.split(maxsplit=1)
+    comando = partes[0].lower()
+    argumentos = partes[1] if len(partes) > 1 else ""
+
+    if comando == "else":
+        return _LinhaAnalisada("else")
+    if comando == "end":
+        bloco = argumentos.split(maxsplit=1)[0].lower() if argumentos else ""
+        if bloco in _NOMES_BLOCOS:
+            linha = _LinhaAnalisada("fim")
+            linha.bloco = bloco
+            return linha
+
+    tabela = _TabelaLeituras()
+    parser = _Parser((), tabela)
+    if comando in _NOMES_BLOCOS:
+        # Só o cabeçalho: o corpo são as próximas linhas
+        linha = _LinhaAnalisada("abre")
+        linha.bloco = comando
+        match = {"func": _RE_FUNC, "if": _RE_IF, "loop": _RE_LOOP, "for": _RE_FOR}[comando].match(argumentos)
+        if not match:
+            linha.erro = _USO_BLOCOS[comando]
+        elif comando == "func":
+            linha.nome = match.group(1)
+        elif comando in ("if", "for"):
+            try:
+                expressao = parser.expressao(match.groups()[-1], 0)
+                linha.leituras = tuple(tabela.nomes[i] for i in expressao.leituras)
+            except SyntaxError as e:
+                linha.erro = _sem_linha(str(e))
+            if comando == "for":
+                linha.escritas = (match.group(1),)
+        return linha
+
+    linha = _LinhaAnalisada("comando")
+    linha.inicia = texto.lower().startswith("linex init project")
+    try:
+        no = parser.parse_comando(0, texto)
+    except SyntaxError as e:
+        linha.erro = _sem_linha(str(e))
+        return linha
+    expr = getattr(no, "expr", None)
+    if expr is not None:
+        linha.leituras = tuple(tabela.nomes[i] for i in expr.leituras)
+    if isinstance(no, (NoVar, NoInput)):
+        linha.escritas = (no.nome,)
+    elif isinstance(no, NoJsonLoad):
+        linha.leituras = (no.origem,)
+        linha.escritas = (no.destino,)
+    elif isinstance(no, NoHttpGet):
+        linha.escritas = tuple(nome for _, nome, _ in no.pedidos)
+    elif isinstance(no, NoCall):
+        linha.chamada = no.nome
+    elif isinstance(no, NoLoad):
+        linha.carrega = True
+    return linha
+
+
+class _Funcao:
+    """Efeitos do corpo de uma função, para quem a chama."""
+    __slots__ = ("linha", "escritas", "chamadas", "carrega")
+
+    def __init__(self, linha):
+        self.linha = linha
+        self.escritas = set()
+        self.chamadas = set()
+        self.carrega = False
+
+
+def _efeitos_chamada(funcoes, nome, escritas, vistas):
+    """Variáveis escritas por `call nome` (incluindo as funções que ela chama).
+
+    Devolve False se alguma delas fizer `load`.
+    """
+    if nome in vistas or nome not in funcoes:
+        return True
+    vistas.add(nome)
+    funcao = funcoes[nome]
+    escritas.update(funcao.escritas)
+    sem_load = not funcao.carrega
+    for chamada in funcao.chamadas:
+        sem_load = _efeitos_chamada(funcoes, chamada, escritas, vistas) and sem_load
+    return sem_load
+
+
+def _diagnosticar_analises(analises):
+    """Junta as análises das linhas: blocos, cabeçalho e uso de nomes.
+
+    Devolve uma lista de {"linha", "severidade", "mensagem"} ordenada por linha.
+    """
+    diagnosticos = []
+
+    def reportar(indice, severidade, mensagem):
+        diagnosticos.append({"linha": indice + 1, "severidade": severidade, "mensagem": mensagem})
+
+    def nao_fechado(aberto):
+        bloco, indice, nome = aberto[0], aberto[1], aberto[2]
+        descricao = f"Bloco da função '{nome}'" if bloco == "func" and nome else f"Bloco '{bloco}'"
+        reportar(indice, "erro", f"{descricao} não fechado com 'end {bloco}'")
+
+    # 1ª passada: estrutura dos blocos e o que cada função faz
+    funcoes = {}
+    dono = [None] * len(analises)  # função (nível mais externo) que contém a linha
+    todas_escritas = set()
+    algum_load = False
+    pilha = []  # [bloco, indice, nome, ja_teve_else]
+    funcao = None  # só muda quando um bloco abre ou fecha
+    cabecalho = False
+    for i, a in enumerate(analises):
+        if a.tipo == "vazia":
+            continue
+        if not cabecalho:
+            cabecalho = True
+            if a.inicia:
+                continue
+            reportar(i, "erro", "O projeto deve começar com 'linex init project'.")
+        if a.erro:
+            reportar(i, "erro", a.erro)
+        dono[i] = funcao
+        if a.tipo == "abre":
+            if a.bloco == "func" and a.nome and a.nome not in funcoes:
+                funcoes[a.nome] = _Funcao(i)
+            pilha.append([a.bloco, i, a.nome, False])
+            if funcao is None and a.bloco == "func":
+                funcao = a.nome or ""
+        elif a.tipo == "else":
+            if pilha and pilha[-1][0] == "if" and not pilha[-1][3]:
+                pilha[-1][3] = True
+            else:
+                reportar(i, "erro", "'else' fora de um bloco 'if'")
+        elif a.tipo == "fim":
+            posicao = next((p for p in range(len(pilha) - 1, -1, -1) if pilha[p][0] == a.bloco), None)
+            if posicao is None:
+                reportar(i, "erro", f"'end {a.bloco}' sem bloco '{a.bloco}' aberto")
+            else:
+                for aberto in pilha[posicao + 1:]:
+                    nao_fechado(aberto)
+                del pilha[posicao:]
+                funcao = next((aberto[2] or "" for aberto in pilha if aberto[0] == "func"), None)
+        if a.escritas:
+            todas_escritas.update(a.escritas)
+        algum_load = algum_load or a.carrega
+        if funcao in funcoes:
+            efeitos = funcoes[funcao]
+            efeitos.escritas.update(a.escritas)
+            efeitos.carrega = efeitos.carrega or a.carrega
+            if a.chamada:
+                efeitos.chamadas.add(a.chamada)
+    for aberto in pilha:
+        nao_fechado(aberto)
+    if not cabecalho:
+        reportar(0, "erro", "O projeto deve começar com 'linex init project'.")
+
+    # 2ª passada: variáveis e funções usadas antes de existir
+    definidas = set()
+    conhecidas = True  # vira False depois de um `load` no fluxo principal
+    for i, a in enumerate(analises):
+        if a.tipo == "vazia":
+            continue
+        no_principal = dono[i] is None
+        for nome in a.leituras:
+            if no_principal and (nome in definidas or not conhecidas):
+                continue
+            if nome not in todas_escritas:
+                # num corpo de função, um `load` em qualquer lugar pode ter criado a variável
+                if no_principal or not algum_load:
+                    reportar(i, "erro", f"Variável '{nome}' não definida.")
+            elif no_principal:
+                reportar(i, "aviso", f"Variável '{nome}' usada antes de ser definida.")
+        if a.chamada:
+            if a.chamada not in funcoes:
+                reportar(i, "erro", f"Função '{a.chamada}' não definida.")
+            elif no_principal and funcoes[a.chamada].linha > i:
+                reportar(i, "aviso", f"Função '{a.chamada}' chamada antes de ser definida.")
+        if no_principal:
+            definidas.update(a.escritas)
+            if a.carrega or (a.chamada and not _efeitos_chamada(funcoes, a.chamada, definidas, set())):
+                conhecidas = False
+
+    diagnosticos.sort(key=lambda d: d["linha"])
+    return diagnosticos
+
+
+class DocumentoLinex:
+    """Análise de um documento aberto na IDE, reaproveitada entre as edições.
+
+    A cada atualização só as linhas entre o prefixo e o sufixo que não
+    mudaram são analisadas de novo; as passadas de blocos e de nomes
+    trabalham sobre as análises já prontas e são lineares.
+    """
+
+    def __init__(self):
+        self.codigo = None
+        self.linhas = []
+        self.analises = []
+        self.diagnosticos = []
+        self.reanalisadas = 0  # linhas analisadas na última atualização
+        self._lock = threading.Lock()
+
+    def atualizar(self, codigo):
+        with self._lock:
+            if codigo == self.codigo:
+                return self.diagnosticos
+            linhas = [linha.strip() for linha in codigo.splitlines()]
+            antigas = self.linhas
+            limite = min(len(linhas), len(antigas))
+            inicio = 0
+            while inicio < limite and linhas[inicio] == antigas[inicio]:
+                inicio += 1
+            fim = 0
+            while fim < limite - inicio and linhas[-1 - fim] == antigas[-1 - fim]:
+                fim += 1
+            alteradas = [_analisar_linha(texto) for texto in linhas[inicio:len(linhas) - fim]]
+            self.analises = self.analises[:inicio] + alteradas + self.analises[len(antigas) - fim:]
+            self.linhas = linhas
+            self.codigo = codigo
+            self.reanalisadas = len(alteradas)
+            self.diagnosticos = _diagnosticar_analises(self.analises)
+            return self.diagnosticos
+
+
+class DocumentosDiagnostico:
+    """Documentos da IDE por chave (ex.: usuário + arquivo), em LRU."""
+
+    def __init__(self, max_documentos=MAX_DOCUMENTOS_DIAGNOSTICO):
+        self.max_documentos = max_documentos
+        self._documentos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            documento = self._documentos.get(chave)
+            if documento is None:
+                documento = self._documentos[chave] = DocumentoLinex()
+                while len(self._documentos) > self.max_documentos:
+                    self._documentos.popitem(last=False)
+            else:
+                self._documentos.move_to_end(chave)
+            return documento
+
+    def descartar(self, chave):
+        with self._lock:
+            self._documentos.pop(chave, None)
+
+
+documentos_diagnostico = DocumentosDiagnostico()
+
+
+def diagnosticar_codigo_lineax(chave, codigo):
+    """Erros e avisos de `codigo` para a IDE, sem executar nada.
+
+    Chamadas seguidas com a mesma `chave` reaproveitam a análise das linhas
+    que não mudaram desde a chamada anterior. Documentos acima de
+    `MAX_CARACTERES_DIAGNOSTICO` não são analisados nem guardados.
+    """
+    if len(codigo) > MAX_CARACTERES_DIAGNOSTICO:
+        documentos_diagnostico.descartar(chave)
+        return [{"linha": 1, "severidade": "aviso",
+                 "mensagem": f"Documento com mais de {MAX_CARACTERES_DIAGNOSTICO} caracteres: diagnósticos desligados."}]
+    return documentos_diagnostico.obter(chave).atualizar(codigo)
+
+
+# =============================================================================
+# Linha de comando: pré-compilação de uma pasta de .lx
+# =============================================================================
+def precompilar_pasta(pasta, diretorio_cache=None):
+    """Gera em `diretorio_cache` (ou `LINEX_CACHE_DIR`) o artefato de todos
+    os .lx da pasta (recursivo), para o `cache_compilacao` do servidor achar.
+
+    Devolve (quantidade compilada, lista de (arquivo, erro)). Levanta
+    `ValueError` se a pasta de artefatos não for confiável ou ficar dentro
+    de `pasta` (que tem fontes gravados por usuários).
+    """
+    diretorio_cache = diretorio_cache or DIRETORIO_CACHE
+    if not diretorio_cache:
+        raise ValueError("Defina LINEX_CACHE_DIR ou use --cache-dir.")
+    cache_real = os.path.realpath(diretorio_cache)
+    pasta_real = os.path.realpath(pasta)
+    if os.path.commonpath([cache_real, pasta_real]) == pasta_real:
+        raise ValueError(f"A pasta de artefatos '{diretorio_cache}' não pode ficar dentro de '{pasta}'.")
+    if not diretorio_cache_confiavel(diretorio_cache):
+        raise ValueError(f"A pasta de artefatos '{diretorio_cache}' não é do servidor ou é gravável por outros.")
+    compilados = 0
+    erros = []
+    for raiz, _, arquivos in os.walk(pasta):
+        for arquivo in sorted(arquivos):
+            if not arquivo.endswith(".lx"):
+                continue
+            caminho = os.path.join(raiz, arquivo)
+            try:
+                compilar_arquivo(caminho, diretorio_cache)
+                compilados += 1
+            except (SyntaxError, OSError, UnicodeDecodeError) as e:
+                erros.append((caminho, str(e)))
+    return compilados, erros
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m lineax.compiler", description="Ferramentas do compilador Linex.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    pre = comandos.add_parser("precompilar", help="gera os artefatos .lxc de uma pasta de arquivos .lx")
+    pre.add_argument("pasta")
+    pre.add_argument("--cache-dir", default=DIRETORIO_CACHE,
+                     help="pasta dos <hash>.lxc, a mesma de LINEX_CACHE_DIR do servidor (padrão: LINEX_CACHE_DIR)")
+    args = parser.parse_args(argv)
+
+    try:
+        compilados, erros = precompilar_pasta(args.pasta, args.cache_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    for caminho, erro in erros:
+        print(f"❌ {caminho}: {erro}", file=sys.stderr)
+    print(f"✅ {compilados} arquivo(s) compilado(s), {len(erros)} com erro.")
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,514 @@
+"""
+Pool de processos pré-aquecidos para executar código de usuário.
+
+Em vez de abrir um `sys.executable` novo (e um arquivo temporário) a cada
+requisição, mantemos alguns workers já iniciados e com o interpretador
+Linex importado. Para cada job o worker faz um `fork`: o código do
+usuário roda num processo filho novo, com os limites de CPU e memória
+(rlimit) aplicados só nele, e que termina junto com o job. Assim nada que
+um job altere (builtins, módulos importados, globais) chega ao próximo,
+mesmo de outro usuário; a reciclagem do worker depois de N execuções é só
+higiene, não isolamento.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource  # Só existe em sistemas POSIX
+except ImportError:
+    resource = None
+
+# Sem `fork` (Windows), cada worker atende um único job e é trocado por outro.
+_FORK = hasattr(os, "fork")
+
+
+def _aplicar_limite_memoria(limite_memoria_mb):
+    if resource is None or not limite_memoria_mb:
+        return
+    limite = limite_memoria_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+
+
+def _aplicar_limite_cpu(limite_cpu_s):
+    """RLIMIT_CPU é acumulado no processo: conta a partir do uso atual."""
+    if resource is None or not limite_cpu_s:
+        return
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    gasto = int(uso.ru_utime + uso.ru_stime)
+    _, maximo = resource.getrlimit(resource.RLIMIT_CPU)
+    suave = gasto + int(limite_cpu_s) + 1
+    if maximo != resource.RLIM_INFINITY:
+        suave = min(suave, maximo)
+    resource.setrlimit(resource.RLIMIT_CPU, (suave, maximo))
+
+
+class _EscritorPipe(io.TextIOBase):
+    """stdout/stderr do worker em modo streaming: envia blocos pelo pipe.
+
+    Se o processo pai não estiver lendo, `send` bloqueia quando o buffer do
+    pipe enche, o que segura o código do usuário (backpressure).
+    """
+
+    def __init__(self, conexao, canal, tamanho_bloco=4096):
+        self.conexao = conexao
+        self.canal = canal
+        self.tamanho_bloco = tamanho_bloco
+        self._buffer = []
+        self._tamanho = 0
+
+    def writable(self):
+        return True
+
+    def write(self, texto):
+        if not texto:
+            return 0
+        self._buffer.append(texto)
+        self._tamanho += len(texto)
+        if "\n" in texto or self._tamanho >= self.tamanho_bloco:
+            self.flush()
+        return len(texto)
+
+    def flush(self):
+        if self._buffer:
+            self.conexao.send(("saida", self.canal, "".join(self._buffer)))
+            self._buffer = []
+            self._tamanho = 0
+
+
+def _rodar_python(codigo, conexao=None):
+    if conexao is None:
+        saida, erros = io.StringIO(), io.StringIO()
+    else:
+        saida, erros = _EscritorPipe(conexao, "stdout"), _EscritorPipe(conexao, "stderr")
+    ok = True
+    escopo = {"__name__": "__main__", "__builtins__": __builtins__}
+    entrada_original = sys.stdin
+    sys.stdin = io.StringIO("")
+    try:
+        with contextlib.redirect_stdout(saida), contextlib.redirect_stderr(erros):
+            try:
+                exec(compile(codigo, "<codigo>", "exec"), escopo)
+            except SystemExit as e:
+                ok = e.code in (None, 0)
+            except BaseException:
+                ok = False
+                # Omite o frame do próprio worker no traceback mostrado ao usuário
+                tipo, valor, tb = sys.exc_info()
+                traceback.print_exception(tipo, valor, tb.tb_next)
+    finally:
+        sys.stdin = entrada_original
+    if conexao is not None:
+        saida.flush()
+        erros.flush()
+        return {"ok": ok}
+    return {"ok": ok, "stdout": saida.getvalue(), "stderr": erros.getvalue()}
+
+
+def _rodar_linex(codigo, input_data, conexao=None):
+    from lineax.compiler import executar_codigo_lineax
+    if conexao is None:
+        return {"ok": True, "output": executar_codigo_lineax(codigo, input_data)}
+
+    class _SaidaPipe:
+        def append(self, linha):
+            conexao.send(("saida", "linex", linha))
+
+    saida = _SaidaPipe()
+    from lineax.compiler import LinexInterpreter
+    resultado = LinexInterpreter().executar_codigo_lineax(codigo, input_data, saida=saida)
+    if resultado is not saida:
+        for linha in resultado:
+            saida.append(linha)
+    return {"ok": True}
+
+
+def _rodar_linex_lote(fontes, itens, opcoes):
+    """Roda uma parte de um lote; `itens` são (indice, posicao_em_fontes, input_data)."""
+    from lineax.compiler import executar_lote
+    saidas = executar_lote([(fontes[k], input_data) for _, k, input_data in itens], **opcoes)
+    return {"ok": True, "resultados": [(indice, saida) for (indice, _, _), saida in zip(itens, saidas)]}
+
+
+def _rodar_job(job):
+    tipo = job[0]
+    if tipo == "python":
+        return _rodar_python(job[1])
+    if tipo == "linex":
+        return _rodar_linex(job[1], job[2])
+    if tipo == "python_stream":
+        return _rodar_python(job[1], job[2])
+    if tipo == "linex_stream":
+        return _rodar_linex(job[1], job[2], job[3])
+    if tipo == "linex_lote":
+        return _rodar_linex_lote(job[1], job[2], job[3])
+    return {"ok": False, "stderr": f"Tipo de job desconhecido: {tipo}"}
+
+
+def _executar_job(conexao, job, limite_memoria_mb, limite_cpu_s):
+    """Roda um job no processo atual (o filho do fork) e envia o resultado."""
+    _aplicar_limite_memoria(limite_memoria_mb)
+    # Um lote tem o limite de CPU de um job para cada programa dele
+    _aplicar_limite_cpu(limite_cpu_s * (len(job[2]) if job[0] == "linex_lote" else 1))
+    if job[0].endswith("_stream"):
+        job = job + (conexao,)
+    try:
+        resultado = _rodar_job(job)
+    except MemoryError:
+        resultado = {"ok": False, "stderr": "MemoryError: limite de memória excedido."}
+    conexao.send(("fim", resultado))
+
+
+def _laco_worker(conexao, limite_memoria_mb, limite_cpu_s):
+    """Loop principal do processo worker: recebe jobs pelo pipe e responde.
+
+    O worker só importa o interpretador e faz `fork`; quem roda o código é
+    o filho. O filho manda primeiro o próprio pid (para o pool poder matá-lo
+    por tempo) e depois a saída e o resultado. Se ele morrer sem mandar o
+    resultado (rlimit de CPU, memória), o worker avisa com ("morto", ...).
+    """
+    # Pré-importa o interpretador para que nenhum job pague o custo.
+    import lineax.compiler  # noqa: F401
+    while True:
+        try:
+            job = conexao.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        if not _FORK:
+            _executar_job(conexao, job, limite_memoria_mb, limite_cpu_s)
+            return
+        pid = os.fork()
+        if pid == 0:
+            codigo_saida = 1
+            try:
+                conexao.send(("pid", os.getpid()))
+                _executar_job(conexao, job, limite_memoria_mb, limite_cpu_s)
+                codigo_saida = 0
+            finally:
+                # Sem atexit nem finalizadores herdados do worker
+                os._exit(codigo_saida)
+        _, status = os.waitpid(pid, 0)
+        if status != 0:
+            conexao.send(("morto", "Execução interrompida: limite de CPU ou memória excedido."))
+
+
+class _Worker:
+    def __init__(self, contexto, limite_memoria_mb, limite_cpu_s):
+        self.conexao, conexao_filho = contexto.Pipe()
+        self.processo = contexto.Process(
+            target=_laco_worker,
+            args=(conexao_filho, limite_memoria_mb, limite_cpu_s),
+            daemon=True,
+        )
+        self.processo.start()
+        conexao_filho.close()
+        self.jobs = 0
+        self.filho = None  # pid do processo que está rodando o job atual
+
+    def enviar(self, job):
+        try:
+            self.conexao.send(job)
+        except OSError:
+            raise TempoExcedido("Execução interrompida: o processo de execução caiu.")
+
+    def receber(self, timeout):
+        """Próxima mensagem do job (saída ou fim), ou None se o tempo acabar.
+
+        Levanta `TempoExcedido` se o processo do job morreu sem terminar.
+        """
+        prazo = time.monotonic() + timeout
+        while True:
+            restante = prazo - time.monotonic()
+            try:
+                if restante <= 0 or not self.conexao.poll(restante):
+                    return None
+                mensagem = self.conexao.recv()
+            except (EOFError, OSError):
+                # Worker morto (rlimit, kill, falha ao subir): o pipe fecha ou é resetado
+                raise TempoExcedido("Execução interrompida: limite de CPU ou memória excedido.")
+            if mensagem[0] == "pid":
+                self.filho = mensagem[1]
+            elif mensagem[0] == "morto":
+                self.filho = None
+                raise TempoExcedido(mensagem[1])
+            else:
+                if mensagem[0] == "fim":
+                    self.filho = None
+                return mensagem
+
+    def encerrar(self, forcar=False):
+        if self.filho is not None:
+            # O filho do fork não morre junto com o worker
+            try:
+                os.kill(self.filho, signal.SIGKILL)
+            except OSError:
+                pass
+            self.filho = None
+        if not forcar:
+            try:
+                self.conexao.send(None)
+            except OSError:
+                pass
+            self.processo.join(timeout=1)
+        if self.processo.is_alive():
+            self.processo.kill()
+            self.processo.join(timeout=1)
+        self.conexao.close()
+
+
+class TempoExcedido(Exception):
+    """O job não terminou dentro do tempo limite (parede ou CPU)."""
+
+
+class PoolExecucao:
+    """Pool de workers pré-iniciados com limites por job e reciclagem.
+
+    Os lotes (`executar_linex_lote`), somados, usam no máximo
+    `max_workers_lote` workers e os devolvem a cada `programas_por_parte`
+    programas, para não deixar as execuções interativas sem worker; cada lote
+    tem no total `tempo_lote` segundos. Quem espera um worker livre desiste
+    depois de `espera_worker` segundos.
+    """
+
+    def __init__(self, tamanho=2, max_jobs_por_worker=50, timeout=15,
+                 limite_cpu_s=15, limite_memoria_mb=512, max_workers_lote=None,
+                 programas_por_parte=10, espera_worker=10, tempo_lote=120):
+        self.tamanho = tamanho
+        self.max_jobs_por_worker = max_jobs_por_worker if _FORK else 1
+        self.timeout = timeout
+        self.limite_cpu_s = limite_cpu_s
+        self.limite_memoria_mb = limite_memoria_mb
+        self.max_workers_lote = max_workers_lote or max(1, tamanho // 2)
+        self.programas_por_parte = programas_por_parte
+        self.espera_worker = espera_worker
+        self.tempo_lote = tempo_lote
+        # Vagas de worker para lotes, divididas entre todos os lotes em andamento
+        self._vagas_lote = threading.BoundedSemaphore(self.max_workers_lote)
+        metodos = multiprocessing.get_all_start_methods()
+        self._contexto = multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+        self._livres = queue.Queue()
+        self._lock = threading.Lock()
+        self._iniciado = False
+
+    def _novo_worker(self):
+        return _Worker(self._contexto, self.limite_memoria_mb, self.limite_cpu_s)
+
+    def iniciar(self):
+        """Sobe os workers (pré-aquecimento). Chamado sob demanda se esquecido."""
+        with self._lock:
+            if self._iniciado:
+                return
+            for _ in range(self.tamanho):
+                self._livres.put(self._novo_worker())
+            self._iniciado = True
+
+    def encerrar(self):
+        with self._lock:
+            while True:
+                try:
+                    self._livres.get_nowait().encerrar()
+                except queue.Empty:
+                    break
+            self._iniciado = False
+
+    def _pegar_worker(self):
+        try:
+            return self._livres.get(timeout=self.espera_worker)
+        except queue.Empty:
+            raise TempoExcedido(f"Servidor ocupado: nenhum worker livre em {self.espera_worker:g} segundos.")
+
+    def executar(self, job, timeout=None):
+        """Envia um job para um worker livre e espera o resultado.
+
+        Levanta `TempoExcedido` se o job passar do tempo; o worker é
+        descartado e substituído por um novo nesse caso.
+        """
+        if not self._iniciado:
+            self.iniciar()
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._pegar_worker()
+        reutilizar = False
+        falhou = True
+        try:
+            worker.enviar(job)
+            mensagem = worker.receber(timeout)
+            if mensagem is None:
+                raise TempoExcedido(f"Tempo de execução excedido ({timeout} segundos).")
+            _, resultado = mensagem
+            falhou = False
+            worker.jobs += 1
+            reutilizar = worker.jobs < self.max_jobs_por_worker
+            return resultado
+        finally:
+            self._devolver(worker, reutilizar, falhou)
+
+    def _devolver(self, worker, reutilizar, falhou):
+        if reutilizar:
+            self._livres.put(worker)
+        else:
+            worker.encerrar(forcar=falhou)
+            self._livres.put(self._novo_worker())
+
+    def executar_stream(self, job, timeout=None, max_bytes=1024 * 1024):
+        """Versão em streaming de `executar`: gera tuplas (evento, canal, texto).
+
+        Eventos: ("saida", canal, texto) a cada bloco recebido, ("erro", None,
+        mensagem) se estourar tempo/limites e ("fim", None, ok) no final.
+        O worker só é lido quando o consumidor pede o próximo item, então um
+        cliente lento segura o worker em vez de acumular saída na memória.
+        """
+        if not self._iniciado:
+            self.iniciar()
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            worker = self._pegar_worker()
+        except TempoExcedido as e:
+            yield ("erro", None, str(e))
+            return
+        reutilizar = False
+        falhou = True
+        try:
+            try:
+                worker.enviar(job)
+            except TempoExcedido as e:
+                yield ("erro", None, str(e))
+                return
+            prazo = time.monotonic() + timeout
+            total = 0
+            while True:
+                try:
+                    mensagem = worker.receber(prazo - time.monotonic())
+                except TempoExcedido as e:
+                    yield ("erro", None, str(e))
+                    return
+                if mensagem is None:
+                    yield ("erro", None, f"Tempo de execução excedido ({timeout} segundos).")
+                    return
+                if mensagem[0] == "fim":
+                    falhou = False
+                    worker.jobs += 1
+                    reutilizar = worker.jobs < self.max_jobs_por_worker
+                    yield ("fim", None, mensagem[1]["ok"])
+                    return
+                _, canal, texto = mensagem
+                total += len(texto.encode("utf-8"))
+                if total > max_bytes:
+                    yield ("erro", None, f"Limite de saída de {max_bytes} bytes excedido.")
+                    return
+                yield ("saida", canal, texto)
+        finally:
+            # Inclui o caso do consumidor fechar o gerador no meio do job.
+            self._devolver(worker, reutilizar, falhou)
+
+    def executar_python(self, codigo, timeout=None):
+        return self.executar(("python", codigo), timeout)
+
+    def executar_linex(self, codigo, input_data=None, timeout=None):
+        return self.executar(("linex", codigo, input_data), timeout)
+
+    def executar_python_stream(self, codigo, timeout=None, max_bytes=1024 * 1024):
+        return self.executar_stream(("python_stream", codigo), timeout, max_bytes)
+
+    def executar_linex_stream(self, codigo, input_data=None, timeout=None, max_bytes=1024 * 1024):
+        return self.executar_stream(("linex_stream", codigo, input_data), timeout, max_bytes)
+
+    def executar_linex_lote(self, programas, silencioso=False, max_passos=None, tempo_limite=None):
+        """Executa N pares (codigo, input_data) em paralelo nos workers.
+
+        Devolve a lista de saídas na ordem de `programas`. Os programas são
+        agrupados pelo fonte antes de serem divididos em partes de até
+        `programas_por_parte`, então cada parte compila cada fonte distinto
+        uma vez só. As partes rodam em até `max_workers_lote` workers ao mesmo
+        tempo. Se uma parte falhar (tempo, CPU, memória ou nenhum worker
+        livre), os programas dela recebem a mensagem de erro; o mesmo vale
+        para as partes que não terminaram dentro de `tempo_lote`.
+        """
+        from lineax.compiler import MAX_PASSOS, TEMPO_LIMITE
+        if not programas:
+            return []
+        if not self._iniciado:
+            self.iniciar()
+        opcoes = {
+            "silencioso": silencioso,
+            "max_passos": MAX_PASSOS if max_passos is None else max_passos,
+            "tempo_limite": TEMPO_LIMITE if tempo_limite is None else tempo_limite,
+        }
+        grupos = {}
+        for indice, (codigo, input_data) in enumerate(programas):
+            grupos.setdefault(codigo, []).append((indice, input_data))
+
+        # Partes pequenas, seguindo a ordem dos grupos: o worker volta para o
+        # pool entre uma parte e outra e nenhuma parte tem um prazo enorme.
+        por_parte = self.programas_por_parte
+        partes = []
+        for codigo, itens in grupos.items():
+            for indice, input_data in itens:
+                if not partes or len(partes[-1][1]) >= por_parte:
+                    partes.append(([], []))
+                fontes, itens_parte = partes[-1]
+                if not fontes or fontes[-1] is not codigo:
+                    fontes.append(codigo)
+                itens_parte.append((indice, len(fontes) - 1, input_data))
+
+        prazo = time.monotonic() + self.tempo_lote
+
+        def rodar(parte):
+            fontes, itens_parte = parte
+            # Cada programa já tem o próprio tempo limite; a parte toda tem a
+            # soma deles, mas nunca passa do prazo do lote inteiro.
+            timeout = self.timeout + len(itens_parte) * (opcoes["tempo_limite"] or self.timeout)
+            if not self._vagas_lote.acquire(timeout=max(0, prazo - time.monotonic())):
+                resultado = {"ok": False, "stderr": f"Tempo total do lote ({self.tempo_lote:g} segundos) excedido."}
+            else:
+                try:
+                    restante = prazo - time.monotonic()
+                    if restante <= 0:
+                        raise TempoExcedido(f"Tempo total do lote ({self.tempo_lote:g} segundos) excedido.")
+                    resultado = self.executar(("linex_lote", fontes, itens_parte, opcoes), min(timeout, restante))
+                except Exception as e:
+                    resultado = {"ok": False, "stderr": str(e)}
+                finally:
+                    self._vagas_lote.release()
+            if not resultado["ok"]:  # ex.: MemoryError no filho
+                return [(indice, [f"❌ Erro na execução: {resultado['stderr']}"]) for indice, _, _ in itens_parte]
+            return resultado["resultados"]
+
+        resultados = [None] * len(programas)
+        with ThreadPoolExecutor(max_workers=min(len(partes), self.max_workers_lote)) as executor:
+            for resultados_parte in executor.map(rodar, partes):
+                for indice, saida in resultados_parte:
+                    resultados[indice] = saida
+        return resultados
+
+
+_pool_padrao = None
+_pool_padrao_lock = threading.Lock()
+
+
+def pool_padrao():
+    """Pool compartilhado do processo, configurado por variáveis de ambiente."""
+    global _pool_padrao
+    with _pool_padrao_lock:
+        if _pool_padrao is None:
+            _pool_padrao = PoolExecucao(
+                tamanho=int(os.getenv("EXECUCAO_POOL_TAMANHO", str(min(4, os.cpu_count() or 1)))),
+                max_jobs_por_worker=int(os.getenv("EXECUCAO_POOL_MAX_JOBS", "50")),
+                timeout=float(os.getenv("EXECUCAO_TIMEOUT", "15")),
+                limite_cpu_s=int(os.getenv("EXECUCAO_LIMITE_CPU", "15")),
+                limite_memoria_mb=int(os.getenv("EXECUCAO_LIMITE_MEMORIA_MB", "512")),
+                max_workers_lote=int(os.getenv("EXECUCAO_POOL_MAX_LOTE", "0")) or None,
+                programas_por_parte=int(os.getenv("EXECUCAO_PROGRAMAS_POR_PARTE", "10")),
+                espera_worker=float(os.getenv("EXECUCAO_ESPERA_WORKER", "10")),
+                tempo_lote=float(os.getenv("EXECUCAO_TEMPO_LOTE", "120")),
+            )
+        return _pool_padrao
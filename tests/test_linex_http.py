@@ -0,0 +1,98 @@
+"""
+Testes do `http get` da Linex contra um servidor HTTP local (sem rede externa).
+
+    python -m pytest tests/
+"""
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lineax.compiler import LinexInterpreter
+
+_ATRASO = 0.3  # segundos que a rota /lento demora para responder
+
+
+class _Servidor(BaseHTTPRequestHandler):
+    acessos = {}
+    cookies_recebidos = []
+
+    def do_GET(self):
+        caminho = self.path
+        _Servidor.acessos[caminho] = _Servidor.acessos.get(caminho, 0) + 1
+        _Servidor.cookies_recebidos.append(self.headers.get("Cookie"))
+        if caminho.startswith("/lento"):
+            time.sleep(_ATRASO)
+        corpo = f'{{"caminho": "{caminho}"}}'.encode("utf-8")
+        self.send_response(200)
+        if caminho == "/login":
+            self.send_header("Set-Cookie", "sessao=SEGREDO_DO_USUARIO_A; Path=/")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpGet(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Servidor)
+        cls.url = f"http://127.0.0.1:{cls.servidor.server_address[1]}"
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        _Servidor.acessos = {}
+        _Servidor.cookies_recebidos = []
+
+    def executar(self, codigo, **opcoes):
+        interpretador = LinexInterpreter(silencioso=True, **opcoes)
+        return interpretador.executar_codigo_lineax("linex init project\n" + codigo)
+
+    def test_lote_baixa_em_paralelo(self):
+        inicio = time.monotonic()
+        saida = self.executar(
+            f'http get "{self.url}/lento/a" to a, "{self.url}/lento/b" to b\n'
+            f'json load a to ja\njson load b to jb\n'
+            f'linex print ja.caminho + " " + jb.caminho'
+        )
+        decorrido = time.monotonic() - inicio
+        self.assertIn("📢 /lento/a /lento/b", saida)
+        self.assertEqual(_Servidor.acessos, {"/lento/a": 1, "/lento/b": 1})
+        self.assertLess(decorrido, 2 * _ATRASO)
+
+    def test_lote_com_url_repetida_baixa_uma_vez(self):
+        saida = self.executar(f'http get "{self.url}/x" to a, "{self.url}/x" to b\ncalc a == b')
+        self.assertIn("🧮 Resultado: True", saida)
+        self.assertEqual(_Servidor.acessos, {"/x": 1})
+
+    def test_cache_com_ttl(self):
+        codigo = f'http get "{self.url}/c" to a\nhttp get "{self.url}/c" to b\ncalc a == b'
+        self.assertIn("🧮 Resultado: True", self.executar(codigo, http_cache_ttl=60))
+        self.assertEqual(_Servidor.acessos, {"/c": 1})
+
+        _Servidor.acessos = {}
+        self.executar(codigo, http_cache_ttl=0)
+        self.assertEqual(_Servidor.acessos, {"/c": 2})
+
+    def test_cache_nao_passa_de_uma_execucao_para_outra(self):
+        codigo = f'http get "{self.url}/c" to a'
+        self.executar(codigo, http_cache_ttl=60)
+        self.executar(codigo, http_cache_ttl=60)
+        self.assertEqual(_Servidor.acessos, {"/c": 2})
+
+    def test_cookies_nao_passam_entre_execucoes(self):
+        self.executar(f'http get "{self.url}/login" to resposta')
+        self.executar(f'http get "{self.url}/eco" to resposta')
+        self.assertEqual(_Servidor.cookies_recebidos, [None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()